@@ -0,0 +1,201 @@
+"""Record / replay of upstream HTTP traffic for offline scanner runs.
+
+    HTTP_FIXTURES_MODE=record HTTP_FIXTURES_DIR=fixtures/ ...   # capture real responses
+    HTTP_FIXTURES_MODE=replay HTTP_FIXTURES_DIR=fixtures/ ...   # serve them back, no network
+
+install() wraps every adapter mounted on a requests.Session, so the retry
+and pooling setup of the session stays in place while recording;
+wrap_async() does the same for one httpx transport of the async scan
+engine. Both engines read and write the same fixtures. Fixtures
+are one JSON file per (method, host, path, query, Range); credentials in
+query strings and headers are never written.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+# Query parameters that carry credentials; dropped from keys and stored URLs
+SECRET_PARAMS = ("key", "api_key", "apikey", "token")
+# Response headers worth keeping (the rest is noise for replay)
+KEEP_HEADERS = ("content-type", "content-range", "retry-after", "content-encoding")
+
+def _clean_url(url):
+    parts = urlsplit(url)
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if k.lower() not in SECRET_PARAMS])
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+def fixture_key(method, url, headers=None):
+    rng = (headers or {}).get("Range", "")
+    return hashlib.sha1(f"{method.upper()} {_clean_url(str(url))} {rng}".encode()).hexdigest()
+
+class FixtureStore:
+    """Directory of <key>.json fixtures."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.served = 0
+        self.missing = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def save(self, request, response, elapsed_ms):
+        key = fixture_key(request.method, request.url, request.headers)
+        entry = {
+            "method": request.method,
+            "url": _clean_url(str(request.url)),
+            "range": request.headers.get("Range"),
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() in KEEP_HEADERS},
+            "elapsed_ms": round(elapsed_ms, 1),
+            "body": base64.b64encode(response.content or b"").decode("ascii"),
+        }
+        tmp = f"{self._path(key)}.tmp.{threading.get_ident()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self.saved += 1
+
+    def load(self, request):
+        key = fixture_key(request.method, request.url, request.headers)
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.missing += 1
+            return None
+        with self._lock:
+            self.served += 1
+        return entry
+
+    def stats(self):
+        return {"dir": self.directory, "saved": self.saved, "served": self.served, "missing": self.missing}
+
+class RecordingAdapter(BaseAdapter):
+    """Passes requests to the wrapped adapter and stores every response it gets."""
+
+    def __init__(self, inner, store):
+        super().__init__()
+        self.inner = inner
+        self.store = store
+
+    def send(self, request, **kwargs):
+        t0 = time.perf_counter()
+        response = self.inner.send(request, **kwargs)
+        response.content  # read streamed bodies so they can be stored (and still iterated later)
+        try:
+            self.store.save(request, response, (time.perf_counter() - t0) * 1000)
+        except OSError as e:
+            logger.warning(f"[Fixtures] Could not record {request.url}: {e}")
+        return response
+
+    def close(self):
+        self.inner.close()
+
+class ReplayAdapter(BaseAdapter):
+    """Answers from the fixture store; an unrecorded request raises ConnectionError.
+
+    `speed` scales the recorded latency (0 = answer immediately, 1 = as recorded).
+    """
+
+    def __init__(self, store, speed=0.0):
+        super().__init__()
+        self.store = store
+        self.speed = speed
+
+    def send(self, request, **kwargs):
+        entry = self.store.load(request)
+        if entry is None:
+            raise requests.ConnectionError(f"No fixture for {request.method} {_clean_url(request.url)}", request=request)
+        if self.speed > 0:
+            time.sleep(entry.get("elapsed_ms", 0) / 1000.0 * self.speed)
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        response._content = base64.b64decode(entry.get("body") or "")
+        response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        return response
+
+    def close(self):
+        pass
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    """httpx counterpart of RecordingAdapter."""
+
+    def __init__(self, inner, store):
+        self.inner = inner
+        self.store = store
+
+    async def handle_async_request(self, request):
+        t0 = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        await response.aread()  # stored whole; the client then reads it from memory, streamed or not
+        try:
+            self.store.save(request, response, (time.perf_counter() - t0) * 1000)
+        except OSError as e:
+            logger.warning(f"[Fixtures] Could not record {request.url}: {e}")
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """httpx counterpart of ReplayAdapter; an unrecorded request raises httpx.ConnectError."""
+
+    def __init__(self, store, speed=0.0):
+        self.store = store
+        self.speed = speed
+
+    async def handle_async_request(self, request):
+        entry = self.store.load(request)
+        if entry is None:
+            raise httpx.ConnectError(f"No fixture for {request.method} {_clean_url(str(request.url))}", request=request)
+        if self.speed > 0:
+            await asyncio.sleep(entry.get("elapsed_ms", 0) / 1000.0 * self.speed)
+        # Bodies are stored decoded, so the recorded Content-Encoding must not be applied again
+        headers = {k: v for k, v in (entry.get("headers") or {}).items() if k.lower() != "content-encoding"}
+        return httpx.Response(entry["status"], headers=headers, content=base64.b64decode(entry.get("body") or ""),
+                              request=request)
+
+def install(session, mode, directory, speed=0.0):
+    """Wrap every adapter mounted on `session` for `mode` ("record" | "replay"); returns the FixtureStore."""
+    if mode not in MODES:
+        raise ValueError(f"HTTP fixtures mode must be one of {MODES}, got {mode!r}")
+    if mode == "off":
+        return None
+    store = FixtureStore(directory)
+    for prefix, adapter in list(session.adapters.items()):
+        session.adapters[prefix] = RecordingAdapter(adapter, store) if mode == "record" else ReplayAdapter(store, speed)
+    logger.info(f"[Fixtures] {mode} mode, fixtures in {directory}")
+    return store
+
+def wrap_async(transport, store, mode, speed=0.0):
+    """Wrap one httpx transport for `mode`, sharing the FixtureStore returned by install()."""
+    if store is None or mode == "off":
+        return transport
+    return AsyncRecordingTransport(transport, store) if mode == "record" else AsyncReplayTransport(store, speed)
@@ -0,0 +1,130 @@
+"""Check that only one of several scanner processes scans per interval.
+
+    python leader_check.py                         # 4 workers, 1s interval, 3s lease
+    python leader_check.py --workers 8 --seconds 20
+
+Starts N processes importing mints_scanner on one shared CACHE_DIR (what N
+gunicorn workers do), with scan_transactions() replaced by a stub that
+logs "<pid> <start>" to a shared file. Halfway through, the process holding
+the lease is killed with SIGKILL (no clean release), so the takeover after
+lease expiry is exercised as well.
+
+Pass criteria: every scan in a phase comes from one process, consecutive
+scans are at least half an interval apart, and after the kill another
+process resumes scanning within lease + 2 intervals.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+READY_PREFIX = "LEADER_CHECK_READY "
+
+def _run_worker(args):
+    """Child process: one 'gunicorn worker' with a stub scan that only logs."""
+    import logging
+    logging.disable(logging.WARNING)
+    import mints_scanner
+    mints_scanner.mint_store.set_meta("bootstrapped", int(time.time()))
+
+    def fake_scan(initial=False, txs=None):
+        line = f"{os.getpid()} {time.time():.3f}\n".encode()
+        fd = os.open(args.log, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        time.sleep(args.scan_ms / 1000.0)
+
+    mints_scanner.scan_transactions = fake_scan
+    print(READY_PREFIX + str(os.getpid()), flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def _read_scans(path, since=0.0, until=float("inf")):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [l.split() for l in f if l.strip()]
+    except OSError:
+        return []
+    return [(int(pid), float(t)) for pid, t in rows if since <= float(t) < until]
+
+def _check_phase(label, scans, interval):
+    pids = sorted({pid for pid, _ in scans})
+    gaps = [b[1] - a[1] for a, b in zip(scans, scans[1:])]
+    ok = len(pids) == 1 and all(g >= interval / 2 for g in gaps) and len(scans) >= 2
+    print(f"  {label:<12} {len(scans)} scans from {len(pids)} process(es) {pids}, "
+          f"gap min {min(gaps, default=0):.2f}s max {max(gaps, default=0):.2f}s  {'OK' if ok else 'FAIL'}")
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run N scanner workers on one store and check one scan per interval.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=1.0, help="SCAN_INTERVAL_SECS")
+    parser.add_argument("--lease", type=float, default=3.0, help="SCANNER_LEASE_SECS")
+    parser.add_argument("--seconds", type=float, default=10.0, help="observation time per phase")
+    parser.add_argument("--scan-ms", type=float, default=200.0, help="duration of the stub scan")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--log", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return _run_worker(args)
+
+    cache_dir = tempfile.mkdtemp(prefix="leader_check_")
+    log = os.path.join(cache_dir, "scans.log")
+    env = dict(os.environ, CACHE_DIR=cache_dir, MINTS_WATCH_MODE="poll", SCANNER_ROLE="auto",
+               SCAN_INTERVAL_SECS=str(args.interval), SCANNER_LEASE_SECS=str(args.lease),
+               JSONBIN_SYNC_DEBOUNCE_SECS="3600")
+    env.pop("BITCOIN_ADDRESS", None)
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", "--log", log, "--scan-ms", str(args.scan_ms)]
+    print(f"Leader check: {args.workers} workers, scan every {args.interval:g}s, lease {args.lease:g}s, "
+          f"store in {cache_dir}")
+    procs = [subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, text=True) for _ in range(args.workers)]
+    try:
+        for p in procs:
+            line = p.stdout.readline()
+            if not line.startswith(READY_PREFIX):
+                print(f"  worker {p.pid} failed to start (exit {p.poll()})")
+                return 1
+        t0 = time.time()
+        time.sleep(args.seconds)
+        first = _read_scans(log, t0)
+        ok = _check_phase("steady", first, args.interval)
+        if not first:
+            return 1
+
+        leader = first[-1][0]
+        killed_at = time.time()
+        os.kill(leader, signal.SIGKILL)
+        print(f"  killed leader {leader}")
+        time.sleep(args.seconds + args.lease)
+        after = _read_scans(log, killed_at)
+        took_over = [s for s in after if s[0] != leader]
+        resumed = took_over[0][1] - killed_at if took_over else None
+        print(f"  takeover     first scan by a new leader {resumed:.2f}s after the kill" if took_over
+              else "  takeover     no process took over")
+        ok = ok and took_over and resumed <= args.lease + 2 * args.interval
+        ok = _check_phase("after kill", [s for s in after if s[0] != leader], args.interval) and ok
+        ok = ok and not [s for s in after if s[0] == leader and s[1] > killed_at + 0.5]
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.send_signal(signal.SIGINT)
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Check that a 429 from an upstream on an explicit port pauses that host's limiter.
+
+    python limiter_check.py
+    python limiter_check.py --retry-after 2
+
+Points MEMPOOL_API at a local server on 127.0.0.1:<port> that answers
+every request 429 with Retry-After, then fetches one tx detail through each
+engine: the threaded path (requests session, 429s seen by urllib3's Retry)
+and the async path (httpx, 429s seen by AsyncUpstream.get).
+
+Pass criteria: both paths find the limiter host_limiter(MEMPOOL) returns
+(same key for the URL and for the urllib3 pool), every 429 adds a
+penalty to its token bucket, and right after the fetch the bucket holds
+back the next request for about Retry-After.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _TooManyRequests(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    retry_after = 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = b"rate limited"
+        self.send_response(429)
+        self.send_header("Retry-After", str(self.retry_after))
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def _check_path(label, fetch, bucket, retries, retry_after):
+    before = bucket.penalties
+    result = fetch()
+    penalties = bucket.penalties - before
+    wait = bucket._take()
+    ok = result is None and penalties >= retries and retry_after * 0.5 < wait <= retry_after
+    print(f"  {label:<8} {penalties} penalties, next request held back {wait:.2f}s  {'OK' if ok else 'FAIL'}")
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that 429s from a host:port upstream reach its limiter.")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with every 429")
+    args = parser.parse_args(argv)
+
+    _TooManyRequests.retry_after = args.retry_after
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TooManyRequests)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="always-429", daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update({"CACHE_DIR": tempfile.mkdtemp(prefix="limiter_check_"), "MINTS_WATCH_MODE": "poll",
+                       "MEMPOOL_API": f"{url}/api", "CONTENT_HOSTS": f"{url}/content", "HTTP_FIXTURES_MODE": "off"})
+
+    import logging
+    logging.disable(logging.ERROR)  # every fetch here is expected to fail
+    import mints_scanner
+    mints_scanner.scheduler.shutdown(wait=False)
+
+    print(f"Limiter check: upstream {url} answers 429 (Retry-After: {args.retry_after})")
+    limiter = mints_scanner.host_limiter(mints_scanner.MEMPOOL)
+    pool = mints_scanner.session.get_adapter(url).poolmanager.connection_from_url(url)
+    key = mints_scanner._limiter_key(pool.scheme, pool.host, pool.port)
+    ok = key == mints_scanner._url_limiter_key(mints_scanner.MEMPOOL) and mints_scanner._host_limiters.get(key) is limiter
+    print(f"  key      urllib3 pool -> {key!r}, MEMPOOL_API -> {mints_scanner._url_limiter_key(mints_scanner.MEMPOOL)!r}"
+          f"  {'OK' if ok else 'FAIL'}")
+    txid = "00" * 32
+    ok = _check_path("threads", lambda: mints_scanner.fetch_tx_detail_mempool(txid), limiter.bucket,
+                     mints_scanner.retries.total, args.retry_after) and ok
+    ok = _check_path("async", lambda: mints_scanner.async_upstream.run(mints_scanner.fetch_tx_detail_mempool_async(txid)),
+                     limiter.bucket, mints_scanner.AsyncUpstream.RETRIES, args.retry_after) and ok
+    server.shutdown()
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
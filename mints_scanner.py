@@ -1,47 +1,507 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, Response, send_from_directory, abort, render_template
+from markupsafe import Markup
 import os
 import json
 import requests
+import httpx
+import websocket
 from apscheduler.schedulers.background import BackgroundScheduler
 from tenacity import retry, stop_after_attempt, wait_exponential
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import logging
 import time
-import zlib
 import re
+import bisect
+from png_chunks import PNG_SIG, decode_text_chunk, parse_png_text
+from ord_envelope import inscriptions_from_reveal_tx, parse_raw_tx
+from trait_index import get_trait_index, rarity_for, CATEGORIES as TRAIT_CATEGORIES
+from sprite_atlas import ATLAS_DIR, ATLAS_MANIFEST, atlas_manifest
+import http_fixtures
+import hashlib
+import functools
+import random
+import asyncio
+import atexit
+import contextvars
+import socket
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from urllib.parse import urlparse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# Templates draw Singles from the sprite atlases: {{ sprite_style(mint.imageFile, 32) }}
+app.add_template_global(atlas_manifest.style, "sprite_style")
 
 # Configuration
 BITCOIN_ADDRESS = os.getenv("BITCOIN_ADDRESS")
 BLOCKCHAIR_API_KEY = os.getenv("BLOCKCHAIR_API_KEY")
 # Use /latest for reading
-JSONBIN_BASE_URL = "https://api.jsonbin.io/v3/b/68e4bbccae596e708f08e631"
+JSONBIN_API = os.getenv("JSONBIN_API", "https://api.jsonbin.io/v3")
+JSONBIN_BIN_ID = "68e4bbccae596e708f08e631"
+JSONBIN_BASE_URL = f"{JSONBIN_API}/b/{JSONBIN_BIN_ID}"
 JSONBIN_URL_LATEST = f"{JSONBIN_BASE_URL}/latest"
-JSONBIN_URL_WRITE = JSONBIN_BASE_URL  # PUT here to update bin
 JSONBIN_MASTER_KEY = os.getenv("JSONBIN_MASTER_KEY", "$2a$10$tWgX8avz4dzMiP.ulPMuu.wdShbGcrGy9M1Z4FUBVNSHTBpjfg/mq")
 SINGLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'Singles')
 os.makedirs(SINGLES_DIR, exist_ok=True)
-MEMPOOL = "https://mempool.space/api"
-BLOCKCHAIR = "https://api.blockchair.com/bitcoin"
+# Local state (indexes, caches, checkpoints) lives here, outside of /static
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+os.makedirs(CACHE_DIR, exist_ok=True)
+SINGLES_INDEX_FILE = os.path.join(CACHE_DIR, 'singles_index.json')
+SINGLES_INDEX_CHECK_SECS = float(os.getenv("SINGLES_INDEX_CHECK_SECS", "5"))
+SCAN_CHECKPOINT_FILE = os.path.join(CACHE_DIR, 'scan_checkpoint.json')
+SCAN_CURSOR_FILE = os.path.join(CACHE_DIR, 'scan_cursor.json')
+RARITY_TABLE_FILE = os.path.join(CACHE_DIR, 'rarity_table.json')
+MINT_STORE_FILE = os.getenv("MINT_STORE_FILE", os.path.join(CACHE_DIR, 'mints.sqlite3'))
+# JSONBin is a replica of the local store: pushed once changes settle for DEBOUNCE secs (at most MAX_DELAY late)
+JSONBIN_SYNC_DEBOUNCE_SECS = float(os.getenv("JSONBIN_SYNC_DEBOUNCE_SECS", "5"))
+JSONBIN_SYNC_MAX_DELAY_SECS = float(os.getenv("JSONBIN_SYNC_MAX_DELAY_SECS", "60"))
+# The main bin holds a manifest; mints live in segment bins of SEGMENT_SIZE in insertion order, so
+# a sync only rewrites the open (last) segment plus whatever else actually changed
+JSONBIN_SEGMENT_SIZE = int(os.getenv("JSONBIN_SEGMENT_SIZE", "250"))
+# "auto": every process (gunicorn worker) runs the scheduler, but only the holder of the scanner
+# lease (kept in the mint store) scans and syncs JSONBin; "web": never scan, only serve the store
+SCANNER_ROLE = os.getenv("SCANNER_ROLE", "auto")
+SCANNER_LEASE_SECS = float(os.getenv("SCANNER_LEASE_SECS", "60"))
+SCAN_INTERVAL_SECS = float(os.getenv("SCAN_INTERVAL_SECS", "30"))
+MEMPOOL = os.getenv("MEMPOOL_API", "https://mempool.space/api")
+MEMPOOL_WS = os.getenv("MEMPOOL_WS", "wss://mempool.space/api/v1/ws")
+# "websocket" subscribes to address updates and polls only while the socket is down; "poll" always polls
+MINTS_WATCH_MODE = os.getenv("MINTS_WATCH_MODE", "websocket")
+BLOCKCHAIR = os.getenv("BLOCKCHAIR_API", "https://api.blockchair.com/bitcoin")
 SCAN_SINCE_UNIX = int(os.getenv("SCAN_SINCE_UNIX", "1759795200"))  # Oct 7, 2025 00:00:00 UTC
+# Txs that could not be hydrated or resolved are retried on this many later scans, then given up on
+SCAN_RETRY_MAX = int(os.getenv("SCAN_RETRY_MAX", "10"))
 PNG_TEXT_KEY_HINT = os.getenv("PNG_TEXT_KEY_HINT", "Serial")
-CONTENT_HOSTS = [
+CONTENT_HOSTS = [h.strip() for h in os.getenv("CONTENT_HOSTS", "").split(",") if h.strip()] or [
     "https://static.unisat.io/content",
     "https://ordinals.com/content",
     "https://api.hiro.so/ordinals/v1/inscriptions"
 ]
-PNG_SIG = b'\x89PNG\r\n\x1a\n'
+# Content host selection: hosts are tried healthiest first; a second host is raced after
+# CONTENT_HEDGE_MS (0 = no hedging); BREAK_AFTER consecutive errors open a host's circuit
+CONTENT_HEDGE_MS = float(os.getenv("CONTENT_HEDGE_MS", "0"))
+CONTENT_HOST_BREAK_AFTER = int(os.getenv("CONTENT_HOST_BREAK_AFTER", "5"))
+CONTENT_HOST_COOLDOWN_SECS = float(os.getenv("CONTENT_HOST_COOLDOWN_SECS", "30"))
+CONTENT_HOST_EXPLORE = float(os.getenv("CONTENT_HOST_EXPLORE", "0.05"))
+# Inscription content cache (fetch_binary_with_fallback)
+INSCRIPTION_CACHE_DIR = os.path.join(CACHE_DIR, 'inscriptions')
+INSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("INSCRIPTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+INSCRIPTION_CACHE_MEM_BYTES = int(os.getenv("INSCRIPTION_CACHE_MEM_BYTES", str(16 * 1024 * 1024)))
+# "stream" reads only the PNG header chunks (Range + early close); "full" downloads whole bodies
+PNG_FETCH_MODE = os.getenv("PNG_FETCH_MODE", "stream")
+PNG_HEAD_RANGE_BYTES = int(os.getenv("PNG_HEAD_RANGE_BYTES", "4096"))
+# Concurrent tx hydration (fetch_chain_txs)
+HYDRATE_WORKERS = int(os.getenv("HYDRATE_WORKERS", "8"))
+MEMPOOL_MAX_CONCURRENCY = int(os.getenv("MEMPOOL_MAX_CONCURRENCY", "4"))
+MEMPOOL_RATE_PER_SEC = float(os.getenv("MEMPOOL_RATE_PER_SEC", "8"))
+# Blockchair crawl: pages requested ahead of the one being consumed, and the request budget they share
+BLOCKCHAIR_PREFETCH = int(os.getenv("BLOCKCHAIR_PREFETCH", "3"))
+BLOCKCHAIR_RATE_PER_SEC = float(os.getenv("BLOCKCHAIR_RATE_PER_SEC", "4"))
+# Threads per scan_transactions stage (outspends, reveal txs, inscriptions)
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "8"))
+# "threads": stage-by-stage thread pools over the requests session; "async": one asyncio task per
+# commit tx over an httpx client (HTTP/2 where the host offers it)
+SCAN_ENGINE = os.getenv("SCAN_ENGINE", "threads")
+if SCAN_ENGINE not in ("threads", "async"):
+    raise ValueError(f"SCAN_ENGINE must be 'threads' or 'async', got {SCAN_ENGINE!r}")
+# Async engine only: cancel what is still in flight after this many seconds (0 = no limit)
+SCAN_TIMEOUT_SECS = float(os.getenv("SCAN_TIMEOUT_SECS", "0"))
+# /mints/stream: events kept for Last-Event-ID replay, keepalive comment interval
+MINT_EVENTS_REPLAY = int(os.getenv("MINT_EVENTS_REPLAY", "1000"))
+MINT_EVENTS_KEEPALIVE_SECS = int(os.getenv("MINT_EVENTS_KEEPALIVE_SECS", "15"))
+# /mints/poll: longest a long-poll request is held open
+MINT_LONGPOLL_MAX_SECS = int(os.getenv("MINT_LONGPOLL_MAX_SECS", "25"))
+# Sprite atlases (python sprite_atlas.py) are content-hashed, so browsers may keep them for a year
+ATLAS_MAX_AGE = int(os.getenv("ATLAS_MAX_AGE", str(365 * 24 * 3600)))
+
+# ---------------------------
+# Per-host concurrency / rate limiting
+# ---------------------------
+class TokenBucket:
+    """Thread-safe token bucket; `penalize` pauses issuing tokens (e.g. after a 429)."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.penalties = 0
+
+    def _take(self):
+        """Take a token and return 0, or return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while (wait := self._take()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        if self.rate <= 0:
+            return
+        while (wait := self._take()) > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + max(0.0, seconds))
+            self._tokens = 0.0
+            self.penalties += 1
+
+class HostLimiter:
+    """Concurrency cap plus token bucket for one upstream host."""
+
+    def __init__(self, max_concurrency, rate_per_sec):
+        self.max_concurrency = max(1, max_concurrency)
+        self._sem = threading.BoundedSemaphore(self.max_concurrency)
+        self.bucket = TokenBucket(rate_per_sec)
+
+    @contextmanager
+    def slot(self):
+        t0 = time.perf_counter()
+        with self._sem:
+            self.bucket.acquire()
+            metrics.waited(time.perf_counter() - t0)
+            yield
+
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def _limiter_key(scheme, host, port=None):
+    """Key into _host_limiters: "host", or "host:port" when the port is not the scheme's default.
+
+    Built from URL parts (host_limiter, the async engine) and from a urllib3
+    pool (_NotifyingRetry) alike, so upstreams with an explicit port get
+    their 429s too.
+    """
+    host = (host or "").lower()
+    return host if port in (None, _DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+
+def _url_limiter_key(url_or_host):
+    parts = urlparse(url_or_host)
+    return _limiter_key(parts.scheme, parts.hostname, parts.port) if parts.netloc else url_or_host
+
+def host_limiter(url_or_host, max_concurrency=None, rate_per_sec=None):
+    """Return the shared HostLimiter for a URL's host, creating it on first use."""
+    host = _url_limiter_key(url_or_host)
+    with _host_limiters_lock:
+        lim = _host_limiters.get(host)
+        if lim is None:
+            lim = HostLimiter(max_concurrency or 4, rate_per_sec if rate_per_sec is not None else 0)
+            _host_limiters[host] = lim
+        return lim
+
+def _on_upstream_status(host, status, retry_after):
+    if status == 429:
+        lim = _host_limiters.get(host)
+        if lim is not None:
+            delay = retry_after if retry_after is not None else 1.0
+            lim.bucket.penalize(delay)
+            logger.warning(f"[RateLimit] 429 from {host}, pausing {delay:.1f}s")
+
+class _NotifyingRetry(Retry):
+    """urllib3 Retry that reports retried statuses (429s) to the host limiters."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        host = _pool.host if _pool is not None else (urlparse(url or "").netloc or "?")
+        metrics.inc("mints_retries_total", source="urllib3", host=host)
+        if response is not None:
+            if response.status == 429:
+                metrics.inc("mints_http_429_total", host=host)
+            if _pool is not None:
+                try:
+                    _on_upstream_status(_limiter_key(_pool.scheme, _pool.host, _pool.port), response.status,
+                                        self.get_retry_after(response))
+                except Exception:
+                    pass
+        return super().increment(method=method, url=url, response=response, error=error,
+                                 _pool=_pool, _stacktrace=_stacktrace)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)."""
+
+    BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * len(self.BUCKETS_MS)
+        self.total = 0
+        self.sum_ms = 0.0
+
+    def observe(self, seconds):
+        ms = seconds * 1000.0
+        with self._lock:
+            self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+            self.total += 1
+            self.sum_ms += ms
+
+    def quantile(self, q):
+        if not self.total:
+            return 0.0
+        rank = q * self.total
+        seen = 0
+        for bound, c in zip(self.BUCKETS_MS, self.counts):
+            seen += c
+            if seen >= rank:
+                return bound
+        return self.BUCKETS_MS[-1]
+
+    def summary(self):
+        buckets = {("+Inf" if b == float("inf") else f"<={b}ms"): c for b, c in zip(self.BUCKETS_MS, self.counts)}
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 1) if self.total else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p90_ms": self.quantile(0.90),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+# Upstream wait accumulated by the innermost running stage: [seconds], one list per stage call.
+# Asyncio tasks copy the context, so waits inside tasks a stage starts (hedges) count for it too.
+_stage_waits = contextvars.ContextVar("stage_waits", default=None)
+
+class Metrics:
+    """Process-wide counters and latency histograms, rendered as Prometheus text by /metrics.
+
+    `stage(name)` decorates a helper to time every call (and count the
+    exceptions escaping it) under mints_stage_seconds{stage=name}; gauges are
+    callables evaluated at scrape time. Time queued for an upstream slot or
+    token (`waited()`) is its own stage, upstream_wait, and is left out of
+    every stage it happened in, so a stage times the same work whichever
+    scan engine runs it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._timers = {}    # (name, labels) -> LatencyHistogram
+        self._gauges = {}    # name -> fn() returning a number or [(labels, value), ...]
+        self._help = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._timers.get(key)
+            if hist is None:
+                hist = self._timers[key] = LatencyHistogram()
+        hist.observe(seconds)
+
+    def gauge(self, name, fn, help_text=None):
+        self._gauges[name] = fn
+        if help_text:
+            self._help[name] = help_text
+
+    def waited(self, seconds):
+        """Record time spent queued for an upstream (HostLimiter slot, async slot, token bucket)."""
+        self.observe("mints_stage_seconds", seconds, stage="upstream_wait")
+        waits = _stage_waits.get()
+        if waits is not None:
+            waits[0] += seconds
+
+    def _stage_done(self, name, t0, waits, token):
+        _stage_waits.reset(token)
+        outer = _stage_waits.get()
+        if outer is not None:
+            outer[0] += waits[0]
+        self.observe("mints_stage_seconds", max(0.0, time.perf_counter() - t0 - waits[0]), stage=name)
+
+    def stage(self, name):
+        def decorate(fn):
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def timed_async(*args, **kwargs):
+                    t0, waits = time.perf_counter(), [0.0]
+                    token = _stage_waits.set(waits)
+                    try:
+                        return await fn(*args, **kwargs)
+                    except Exception:
+                        self.inc("mints_stage_errors_total", stage=name)
+                        raise
+                    finally:
+                        self._stage_done(name, t0, waits, token)
+                return timed_async
+
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                t0, waits = time.perf_counter(), [0.0]
+                token = _stage_waits.set(waits)
+                try:
+                    return fn(*args, **kwargs)
+                except Exception:
+                    self.inc("mints_stage_errors_total", stage=name)
+                    raise
+                finally:
+                    self._stage_done(name, t0, waits, token)
+            return timed
+        return decorate
+
+    def snapshot(self):
+        """Counters and (count, sum_ms) per timer, for diffing around a scan."""
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {k: (h.total, h.sum_ms) for k, h in self._timers.items()}
+        return counters, timers
+
+    def diff(self, before):
+        """Compact {metric{labels}: delta} of everything that moved since `before`."""
+        c0, t0 = before
+        c1, t1 = self.snapshot()
+        out = {}
+        for key, value in c1.items():
+            delta = value - c0.get(key, 0)
+            if delta:
+                out[self._label(key)] = delta
+        for key, (count, sum_ms) in t1.items():
+            prev = t0.get(key, (0, 0.0))
+            if count - prev[0]:
+                out[self._label(key)] = {"calls": count - prev[0], "ms": round(sum_ms - prev[1], 1)}
+        return out
+
+    @staticmethod
+    def _label(key):
+        name, labels = key
+        return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+    @staticmethod
+    def _fmt_labels(labels, extra=()):
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timers = sorted(self._timers.items(), key=lambda kv: kv[0])
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{self._fmt_labels(labels)} {value}")
+        for (name, labels), hist in timers:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(hist.BUCKETS_MS, hist.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound / 1000:g}"
+                lines.append(f"{name}_bucket{self._fmt_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{self._fmt_labels(labels)} {hist.sum_ms / 1000:.6f}")
+            lines.append(f"{name}_count{self._fmt_labels(labels)} {hist.total}")
+        for name, fn in sorted(self._gauges.items()):
+            try:
+                value = fn()
+            except Exception as e:
+                logger.debug(f"[Metrics] gauge {name} failed: {e}")
+                continue
+            header(name, "gauge")
+            for labels, v in (value if isinstance(value, list) else [({}, value)]):
+                if v is not None:
+                    lines.append(f"{name}{self._fmt_labels(sorted(labels.items()))} {float(v):g}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.describe("mints_stage_seconds", "Time spent per call in each scanner helper, less upstream_wait "
+                 "(time queued for an upstream slot or token, its own stage)")
+metrics.describe("mints_stage_errors_total", "Exceptions escaping a scanner helper")
+metrics.describe("mints_http_requests_total", "Upstream HTTP responses by host and status")
+metrics.describe("mints_http_received_bytes_total", "Upstream response body bytes read")
+metrics.describe("mints_http_sent_bytes_total", "Upstream request body bytes sent")
+metrics.describe("mints_http_429_total", "429 responses from upstreams (retried or not)")
+metrics.describe("mints_retries_total", "Retries by urllib3 Retry and the async engine (per host) and tenacity (per function)")
+metrics.describe("mints_scans_total", "Completed scans by kind (initial / mempool / pushed) and outcome")
+metrics.describe("mints_scan_seconds", "Wall time of one scan_transactions call")
+metrics.describe("mints_scan_txs_total", "Transactions handed to the scanner")
+metrics.describe("mints_scan_pending_txs_total", "Transactions not seen before, i.e. actually processed")
+metrics.describe("mints_new_total", "New mints committed to the store")
+metrics.describe("mints_blockchair_backoff_total", "Blockchair pages answered 429 and retried after backing off")
+metrics.describe("mints_jsonbin_segments_total", "JSONBin segments per sync, written or skipped as unchanged")
+
+def _count_tenacity_retry(retry_state):
+    metrics.inc("mints_retries_total", source="tenacity", fn=getattr(retry_state.fn, "__name__", "?"))
+
+host_limiter(MEMPOOL, MEMPOOL_MAX_CONCURRENCY, MEMPOOL_RATE_PER_SEC)
+host_limiter(BLOCKCHAIR, BLOCKCHAIR_PREFETCH, BLOCKCHAIR_RATE_PER_SEC)
 
 # HTTP session with retries
 session = requests.Session()
-retries = Retry(total=3, backoff_factor=0.4, status_forcelist=[429, 500, 502, 503, 504])
-session.mount('https://', HTTPAdapter(max_retries=retries))
+retries = _NotifyingRetry(total=3, backoff_factor=0.4, status_forcelist=[429, 500, 502, 503, 504])
+session.mount('https://', HTTPAdapter(max_retries=retries, pool_maxsize=max(10, HYDRATE_WORKERS)))
+
+def _count_response(r, *args, **kwargs):
+    host = urlparse(r.url).hostname  # same label urllib3 reports retries under
+    metrics.inc("mints_http_requests_total", host=host, status=r.status_code)
+    if r.status_code == 429:
+        metrics.inc("mints_http_429_total", host=host)
+    body = r.request.body if r.request is not None else None
+    if body:
+        metrics.inc("mints_http_sent_bytes_total", len(body), host=host)
+    if not kwargs.get("stream"):
+        metrics.inc("mints_http_received_bytes_total", len(r.content or b""), host=host)
+
+session.hooks["response"].append(_count_response)
+
+def _mount_host_pool(base, maxsize, max_retries=None):
+    """Give one upstream its own keep-alive pool, sized to how many requests we run against it at once."""
+    session.mount(base, HTTPAdapter(max_retries=max_retries or retries, pool_connections=1, pool_maxsize=maxsize))
+
+_mount_host_pool(MEMPOOL, max(MEMPOOL_MAX_CONCURRENCY, HYDRATE_WORKERS, PIPELINE_WORKERS))
+# 429s from Blockchair reach BlockchairPager, which pauses every prefetching page for Retry-After
+_mount_host_pool(BLOCKCHAIR, max(2, BLOCKCHAIR_PREFETCH), retries.new(status_forcelist=[500, 502, 503, 504]))
+_mount_host_pool(JSONBIN_API, 2)  # main bin and segment bins alike
+for _base in CONTENT_HOSTS:
+    _mount_host_pool(_base, PIPELINE_WORKERS)
+
+# Offline runs: "record" captures upstream responses under HTTP_FIXTURES_DIR, "replay" serves them back
+HTTP_FIXTURES_MODE = os.getenv("HTTP_FIXTURES_MODE", "off")
+HTTP_FIXTURES_DIR = os.getenv("HTTP_FIXTURES_DIR", os.path.join(CACHE_DIR, 'fixtures'))
+HTTP_FIXTURES_SPEED = float(os.getenv("HTTP_FIXTURES_SPEED", "0"))  # replay latency scale (0 = instant)
+http_fixture_store = http_fixtures.install(session, HTTP_FIXTURES_MODE, HTTP_FIXTURES_DIR, HTTP_FIXTURES_SPEED)
 
 # ---------------------------
 # Utils
@@ -72,24 +532,202 @@ def _sanitize_mints_list(mints):
 def _safe_confirmed_at(x):
     return x.get("confirmedAt", 0) if isinstance(x, dict) else 0
 
+def _atomic_write_json(path, obj):
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+# ---------------------------
+# Singles serial -> image index
+# ---------------------------
+class SinglesIndex:
+    """Serial -> filename index over SINGLES_DIR, persisted to disk.
+
+    The directory listing is loaded from SINGLES_INDEX_FILE (or built once) and
+    only re-listed when the directory mtime changes, checked at most every
+    `check_secs`. Exact lookups hit a dict keyed by file stem; substring lookups
+    run a single str.find over a newline-joined blob of all names.
+    """
+
+    def __init__(self, directory, index_file, check_secs=5.0):
+        self.directory = directory
+        self.index_file = index_file
+        self.check_secs = check_secs
+        self._lock = threading.Lock()
+        self._files = []
+        self._by_stem = {}
+        self._blob = ""
+        self._starts = []
+        self._dir_mtime = None
+        self._last_check = 0.0
+        self.build_time = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def _set_files(self, files):
+        files = sorted(files)
+        self._files = files
+        self._by_stem = {os.path.splitext(f)[0]: f for f in files}
+        starts = []
+        pos = 0
+        for f in files:
+            starts.append(pos)
+            pos += len(f) + 1
+        self._starts = starts
+        self._blob = "\n".join(files)
+
+    def _list_dir(self):
+        return [f for f in os.listdir(self.directory) if f.lower().endswith(".png")]
+
+    def load(self):
+        t0 = time.perf_counter()
+        with self._lock:
+            try:
+                mtime = os.stat(self.directory).st_mtime
+            except OSError as e:
+                logger.warning(f"[SinglesIndex] Cannot stat {self.directory}: {e}")
+                return
+            files = None
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                if saved.get("dir") == self.directory and saved.get("dir_mtime") == mtime:
+                    files = saved.get("files") or []
+            except (OSError, ValueError):
+                pass
+            source = "disk"
+            if files is None:
+                files = self._list_dir()
+                source = "listdir"
+            self._set_files(files)
+            self._dir_mtime = mtime
+            self._last_check = time.time()
+            if source == "listdir":
+                self._persist()
+        self.build_time = time.perf_counter() - t0
+        logger.info(f"[SinglesIndex] Loaded {len(self._files)} images from {source} in {self.build_time * 1000:.1f}ms")
+
+    def _persist(self):
+        try:
+            _atomic_write_json(self.index_file, {"dir": self.directory, "dir_mtime": self._dir_mtime, "files": self._files})
+        except OSError as e:
+            logger.warning(f"[SinglesIndex] Could not persist index: {e}")
+
+    def refresh(self, force=False):
+        """Re-list the directory if its mtime moved; apply the diff incrementally."""
+        now = time.time()
+        if not force and now - self._last_check < self.check_secs:
+            return False
+        with self._lock:
+            self._last_check = now
+            try:
+                mtime = os.stat(self.directory).st_mtime
+            except OSError:
+                return False
+            if not force and mtime == self._dir_mtime:
+                return False
+            current = set(self._list_dir())
+            known = set(self._files)
+            added = current - known
+            removed = known - current
+            self._dir_mtime = mtime
+            if added or removed:
+                self._set_files((known - removed) | added)
+                logger.info(f"[SinglesIndex] Refreshed: +{len(added)} -{len(removed)} images")
+            self.refreshes += 1
+            self._persist()
+            return bool(added or removed)
+
+    def lookup(self, serial):
+        """Return the image filename for `serial` (exact stem first, then substring) or None."""
+        if not serial:
+            return None
+        self.refresh()
+        fname = self._by_stem.get(serial)
+        if fname is None and "\n" not in serial:
+            pos = self._blob.find(serial)
+            if pos >= 0:
+                fname = self._files[bisect.bisect_right(self._starts, pos) - 1]
+        if fname is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return fname
+
+    def stats(self):
+        return {
+            "images": len(self._files),
+            "build_ms": round(self.build_time * 1000, 3),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+        }
+
+singles_index = SinglesIndex(SINGLES_DIR, SINGLES_INDEX_FILE, check_secs=SINGLES_INDEX_CHECK_SECS)
+singles_index.load()
+
 # ---------------------------
 # JSONBin helpers (robust)
 # ---------------------------
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def get_jsonbin():
-    try:
-        r = session.get(
-            JSONBIN_URL_LATEST,
-            headers={"X-Master-Key": JSONBIN_MASTER_KEY},
-            timeout=15
-        )
-        r.raise_for_status()
-        data = r.json()
-        logger.debug(f"[JSONBin] Raw type={type(data)} preview={_log_preview(data)}")
+def _jsonbin_record(data):
+    # JSONBin v3 typically returns {"record": ...}
+    return data.get("record") if isinstance(data, dict) else data
+
+@metrics.stage("jsonbin_get")
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=_count_tenacity_retry)
+def jsonbin_read(url):
+    r = session.get(url, headers={"X-Master-Key": JSONBIN_MASTER_KEY}, timeout=15)
+    r.raise_for_status()
+    data = r.json()
+    logger.debug(f"[JSONBin] Raw type={type(data)} preview={_log_preview(data)}")
+    return _jsonbin_record(data)
+
+@metrics.stage("jsonbin_put")
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=_count_tenacity_retry)
+def jsonbin_write(body, bin_id):
+    """PUT `body` (serialized JSON) to an existing bin; returns the bin id."""
+    headers = {"X-Master-Key": JSONBIN_MASTER_KEY, "Content-Type": "application/json"}
+    r = session.put(f"{JSONBIN_API}/b/{bin_id}", headers=headers, data=body, timeout=15)
+    r.raise_for_status()
+    return bin_id
+
+@metrics.stage("jsonbin_create")
+def jsonbin_create(body, name):
+    """POST `body` as a new bin named `name`; returns the new bin id.
 
-        # JSONBin v3 typically returns {"record": ...}
-        record = data.get("record") if isinstance(data, dict) else data
+    Deliberately not retried (urllib3 does not retry POSTs either): a POST
+    the server committed but whose answer was lost would create a second
+    bin. A failed create fails the sync, and the next sync tries again.
+    """
+    headers = {"X-Master-Key": JSONBIN_MASTER_KEY, "Content-Type": "application/json", "X-Bin-Name": name}
+    r = session.post(f"{JSONBIN_API}/b", headers=headers, data=body, timeout=15)
+    r.raise_for_status()
+    return r.json()["metadata"]["id"]
 
+def get_jsonbin():
+    """(mints oldest first, segment manifest entries) from the bin.
+
+    Reads the segment manifest from the main bin and fetches the segments
+    concurrently; a main bin still holding the old single {"mints": [...]}
+    document is read as is (with no segments).
+    """
+    try:
+        record = jsonbin_read(JSONBIN_URL_LATEST)
+        if isinstance(record, dict) and isinstance(record.get("segments"), list):
+            segments = record["segments"]
+            urls = [f"{JSONBIN_API}/b/{seg['bin']}/latest" for seg in segments]
+            with ThreadPoolExecutor(max_workers=min(4, max(1, len(urls)))) as pool:
+                parts = list(pool.map(jsonbin_read, urls))
+            mints = []
+            for seg, part in zip(segments, parts):
+                items = _sanitize_mints_list(part.get("mints") if isinstance(part, dict) else None)
+                if len(items) != seg.get("count"):
+                    raise ValueError(f"segment {seg['bin']} has {len(items)} mints, manifest says {seg.get('count')}")
+                mints.extend(items)
+            logger.info(f"[JSONBin] Loaded {len(mints)} mints from {len(segments)} segments")
+            return mints, segments
         if isinstance(record, dict):
             mints = record.get("mints", [])
         elif isinstance(record, list):
@@ -97,386 +735,2796 @@ def get_jsonbin():
         else:
             logger.warning(f"[JSONBin] Unsupported top-level type: {type(record)}; returning empty list")
             mints = []
+        # Single-document bins were written newest first
+        return sorted(_sanitize_mints_list(mints), key=lambda m: int(_safe_confirmed_at(m) or 0)), []
+    except Exception as e:
+        # Raise instead of returning []: callers must not mistake a failed read
+        # for an empty bin (that would trigger a full rescan / overwrite)
+        logger.error(f"[JSONBin] Error reading bin: {e}")
+        raise
+
+def _jsonbin_segments(rows):
+    """(index, count, body, sha1) for each segment cut from `rows`."""
+    size = max(1, JSONBIN_SEGMENT_SIZE)
+    for k, start in enumerate(range(0, len(rows), size)):
+        chunk = rows[start:start + size]
+        body = '{"segment":%d,"mints":[%s]}' % (k, ",".join(chunk))
+        yield k, len(chunk), body, hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+def _jsonbin_manifest(segments, count):
+    """(json, sha1) of the main-bin manifest listing `segments`."""
+    manifest = json.dumps({"format": "segments", "segment_size": max(1, JSONBIN_SEGMENT_SIZE), "count": count,
+                           "segments": [{"bin": seg["bin"], "count": seg["count"]} for seg in segments]})
+    return manifest, hashlib.sha1(manifest.encode("utf-8")).hexdigest()
+
+def update_jsonbin(rows):
+    """Replicate `rows` (stored mint JSON, insertion order) to the segment bins and the manifest.
+
+    Segments whose content hash matches what was last written are skipped,
+    as is the manifest, so an unchanged store costs no writes at all. Bin
+    ids and hashes are kept in the store's meta table ("jsonbin_segments");
+    bins of segments that no longer exist are kept there for reuse.
+    """
+    try:
+        written = json.loads(mint_store.get_meta("jsonbin_segments", "[]"))
+        segments = []
+        for k, count, body, sha in _jsonbin_segments(rows):
+            prev = written[k] if k < len(written) else None
+            if prev and prev.get("sha") == sha:
+                segments.append(prev)
+                metrics.inc("mints_jsonbin_segments_total", result="unchanged")
+                continue
+            if prev:
+                bin_id = jsonbin_write(body, prev["bin"])
+            else:
+                bin_id = jsonbin_create(body, f"mints-segment-{k:04d}")
+            segments.append({"bin": bin_id, "count": count, "sha": sha})
+            metrics.inc("mints_jsonbin_segments_total", result="written")
+            # Record each write as it lands so a failure later on never creates the same bin twice
+            mint_store.set_meta("jsonbin_segments", json.dumps(segments + written[len(segments):]))
+        manifest, manifest_sha = _jsonbin_manifest(segments, len(rows))
+        if manifest_sha != mint_store.get_meta("jsonbin_manifest_sha"):
+            jsonbin_write(manifest, JSONBIN_BIN_ID)
+            mint_store.set_meta("jsonbin_manifest_sha", manifest_sha)
+            logger.info(f"[JSONBin] Updated manifest: {len(rows)} mints in {len(segments)} segments")
+        else:
+            logger.debug("[JSONBin] No changes to replicate")
+        return True
+    except Exception as e:
+        logger.error(f"[JSONBin] Error updating bin: {e}")
+        return False
+
+# ---------------------------
+# Inscription content cache
+# ---------------------------
+_INSCRIPTION_ID_RE = re.compile(r'^[0-9a-fA-F]{64}i[0-9]+$')
+
+class InscriptionCache:
+    """Two-level (memory + disk) LRU cache of inscription bodies keyed by inscription ID.
+
+    Inscriptions are immutable, so entries never expire; they are only evicted
+    when a level exceeds its byte budget. Disk writes are atomic (tmp + rename).
+    """
+
+    def __init__(self, directory, max_disk_bytes, max_mem_bytes):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_mem_bytes = max_mem_bytes
+        self._lock = threading.Lock()
+        self._mem = OrderedDict()
+        self._mem_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self.mem_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan_disk()
+
+    def _scan_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not _INSCRIPTION_ID_RE.match(name):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _remember(self, key, buf):
+        if len(buf) > self.max_mem_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old)
+        self._mem[key] = buf
+        self._mem_bytes += len(buf)
+        while self._mem_bytes > self.max_mem_bytes and self._mem:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= len(evicted)
+
+    def get(self, key):
+        if not _INSCRIPTION_ID_RE.match(key or ""):
+            return None
+        with self._lock:
+            buf = self._mem.get(key)
+            if buf is not None:
+                self._mem.move_to_end(key)
+                self.mem_hits += 1
+                self.bytes_saved += len(buf)
+                return buf
+            on_disk = key in self._disk
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as f:
+                    buf = f.read()
+                os.utime(self._path(key))
+            except OSError:
+                buf = None
+            with self._lock:
+                if buf is None:
+                    size = self._disk.pop(key, None)
+                    if size is not None:
+                        self._disk_bytes -= size
+                else:
+                    self._disk.move_to_end(key)
+                    self._remember(key, buf)
+                    self.disk_hits += 1
+                    self.bytes_saved += len(buf)
+                    return buf
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, buf):
+        if not _INSCRIPTION_ID_RE.match(key or "") or not buf:
+            return
+        tmp = f"{self._path(key)}.tmp.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(buf)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.warning(f"[InscriptionCache] Could not write {key}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        evict = []
+        with self._lock:
+            self._remember(key, buf)
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_bytes -= old
+            self._disk[key] = len(buf)
+            self._disk_bytes += len(buf)
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                name, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                evict.append(name)
+        for name in evict:
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def stats(self):
+        lookups = self.mem_hits + self.disk_hits + self.misses
+        return {
+            "mem_hits": self.mem_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.mem_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "mem_bytes": self._mem_bytes,
+            "disk_bytes": self._disk_bytes,
+            "disk_entries": len(self._disk),
+        }
+
+inscription_cache = InscriptionCache(INSCRIPTION_CACHE_DIR, INSCRIPTION_CACHE_MAX_BYTES, INSCRIPTION_CACHE_MEM_BYTES)
+
+# ---------------------------
+# Local mint store
+# ---------------------------
+class MintStore:
+    """SQLite-backed mint store; the scanner writes here and routes read from it.
+
+    Reads are served from an in-memory snapshot (sorted newest first) that is
+    rebuilt only when the store `version` changes, so the hot path never touches
+    the network. Other processes sharing the file are picked up by re-reading
+    the version at most every `check_secs`.
+    """
+
+    FIELDS = ("txid", "serial", "buyerAddr", "confirmedAt", "imageFile")
+
+    def __init__(self, path, check_secs=1.0):
+        self.path = path
+        self.check_secs = check_secs
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS mints ("
+            " txid TEXT PRIMARY KEY, confirmed_at INTEGER NOT NULL DEFAULT 0, data TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS mints_confirmed_at ON mints (confirmed_at DESC)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (str(int(time.time())),))
+        self._snapshot = None
+        self._snapshot_version = -1
+        self._txids = set()
+        self._last_check = 0.0
+        self.last_change = 0.0
+        self.dirty_since = 0.0
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def version(self):
+        return int(self.get_meta("version", 0))
+
+    def _bump(self):
+        v = self.version + 1
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(v),))
+        now = time.time()
+        self.last_change = now
+        if not self.dirty_since:
+            self.dirty_since = now
+        return v
+
+    def _reload(self):
+        rows = self._conn.execute("SELECT data FROM mints ORDER BY confirmed_at DESC, txid").fetchall()
+        snapshot = _sanitize_mints_list([json.loads(r[0]) for r in rows])
+        self._snapshot = snapshot
+        self._txids = {m.get("txid") for m in snapshot}
+
+    def all(self):
+        """Return all mints, newest first. The list is shared: callers must not mutate it."""
+        now = time.time()
+        if self._snapshot is not None and now - self._last_check < self.check_secs:
+            return self._snapshot
+        with self._lock:
+            self._last_check = now
+            v = self.version
+            if self._snapshot is None or v != self._snapshot_version:
+                self._reload()
+                self._snapshot_version = v
+            return self._snapshot
+
+    def txids(self):
+        self.all()
+        return set(self._txids)
+
+    def count(self):
+        return len(self.all())
+
+    def rows(self):
+        """Stored JSON of every mint in insertion order (oldest first), exactly as written."""
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT data FROM mints ORDER BY rowid")]
+
+    def head(self):
+        """(epoch, highest rowid). Rowids only grow within an epoch; replace_all starts a new one."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                epoch = int(self._conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0])
+                rowid = self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM mints").fetchone()[0]
+            finally:
+                self._conn.execute("COMMIT")
+        return epoch, rowid
+
+    def rows_after(self, rowid, limit=-1):
+        """(epoch, [(rowid, stored JSON), ...]) for mints inserted after `rowid`, oldest first."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                epoch = int(self._conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0])
+                rows = self._conn.execute("SELECT rowid, data FROM mints WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                                          (rowid, limit)).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        return epoch, rows
+
+    def add_many(self, items):
+        """Insert new mints (existing txids are left untouched); return how many were added."""
+        items = [m for m in _sanitize_mints_list(items) if m.get("txid")]
+        if not items:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO mints (txid, confirmed_at, data) VALUES (?, ?, ?)",
+                    [(m["txid"], int(_safe_confirmed_at(m) or 0), json.dumps(m)) for m in items])
+                added = self._conn.total_changes - before
+                if added:
+                    self._bump()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._snapshot = None
+            return added
+
+    def replace_all(self, items):
+        items = [m for m in _sanitize_mints_list(items) if m.get("txid")]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM mints")
+                # Rowids restart after the DELETE, so event ids from before are meaningless now
+                epoch = max(int(time.time()), int(self.get_meta("epoch", 0)) + 1)
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('epoch', ?)", (str(epoch),))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO mints (txid, confirmed_at, data) VALUES (?, ?, ?)",
+                    [(m["txid"], int(_safe_confirmed_at(m) or 0), json.dumps(m)) for m in items])
+                v = self._bump()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._snapshot = None
+            return v
+
+    def stats(self):
+        return {"mints": self.count(), "version": self.version,
+                "jsonbin_version": int(self.get_meta("jsonbin_version", 0))}
+
+mint_store = MintStore(MINT_STORE_FILE)
+
+def bootstrap_mint_store():
+    """Seed an empty local store from JSONBin once. Returns False if the bin could not be read."""
+    if mint_store.count() or mint_store.get_meta("bootstrapped"):
+        return True
+    try:
+        remote, segments = get_jsonbin()
+    except Exception as e:
+        logger.error(f"[MintStore] Cannot bootstrap from JSONBin: {e}")
+        return False
+    # Adopt the existing segment bins with the hash of what they hold now, taken before rarity is
+    # added locally: a segment that gains rarity then no longer matches and is rewritten by the next sync
+    remote_rows = [json.dumps(m) for m in remote]
+    held = {k: (count, sha) for k, count, _, sha in _jsonbin_segments(remote_rows)}
+    adopted = [{"bin": seg["bin"], "count": seg.get("count"),
+                "sha": held[k][1] if k in held and held[k][0] == seg.get("count") else None}
+               for k, seg in enumerate(segments)]
+    for m in remote:
+        if "rarity" not in m:
+            _attach_rarity(m)
+    v = mint_store.replace_all(remote)
+    mint_store.set_meta("jsonbin_segments", json.dumps(adopted))
+    if adopted and len(adopted) == len(held):
+        mint_store.set_meta("jsonbin_manifest_sha", _jsonbin_manifest(adopted, len(remote))[1])
+    mint_store.set_meta("jsonbin_version", v)
+    mint_store.set_meta("bootstrapped", int(time.time()))
+    mint_store.dirty_since = 0.0
+    logger.info(f"[MintStore] Bootstrapped {len(remote)} mints from JSONBin")
+    return True
+
+def sync_jsonbin_job():
+    """Replicate the local store to JSONBin, batching changes that arrive close together."""
+    if not scanner_lease.held:
+        return  # the scanning process owns the bin
+    try:
+        v = mint_store.version
+        if v == int(mint_store.get_meta("jsonbin_version", 0)):
+            return
+        now = time.time()
+        settled = now - mint_store.last_change >= JSONBIN_SYNC_DEBOUNCE_SECS
+        overdue = mint_store.dirty_since and now - mint_store.dirty_since >= JSONBIN_SYNC_MAX_DELAY_SECS
+        if not (settled or overdue):
+            return
+        if update_jsonbin(mint_store.rows()):
+            mint_store.set_meta("jsonbin_version", v)
+            if mint_store.version == v:
+                mint_store.dirty_since = 0.0
+    except Exception as e:
+        logger.error(f"[JSONBin] Sync job error: {e}")
+
+# ---------------------------
+# Scan checkpoint
+# ---------------------------
+class ScanCheckpoint:
+    """Persistent record of chain-scan progress.
+
+    `block_height` / `txids` cover confirmed txs already processed (the
+    Blockchair walk stops once it reaches them); the crawl cursor (source,
+    offset and txids collected so far) lets an interrupted crawl resume from
+    the page it reached. The cursor is kept in its own small file because it
+    is rewritten after every page. `retry` maps txids whose hydration or
+    resolution failed to the number of scans they failed in: the walk will
+    not list them again once it stops above them, so every scan re-hydrates
+    them until they are processed or have failed `max_retries` times.
+    """
+
+    def __init__(self, path, cursor_path, max_retries=10):
+        self.path = path
+        self.cursor_path = cursor_path
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self.block_height = 0
+        self.txids = set()
+        self.retry = {}
+        self.mint_count = 0
+        self.cursor = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.block_height = int(data.get("block_height") or 0)
+            self.txids = set(data.get("txids") or [])
+            self.retry = {t: int(n) for t, n in (data.get("retry") or {}).items()}
+            self.mint_count = int(data.get("mint_count") or 0)
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.path):
+                logger.warning(f"[Checkpoint] Ignoring unreadable checkpoint: {e}")
+        try:
+            with open(self.cursor_path, "r", encoding="utf-8") as f:
+                cursor = json.load(f)
+            self.cursor = cursor if isinstance(cursor, dict) else None
+        except (OSError, ValueError):
+            self.cursor = None
+
+    def is_empty(self):
+        return not self.txids and not self.block_height
+
+    def save_cursor(self, source, offset, txids):
+        with self._lock:
+            self.cursor = {"source": source, "offset": offset, "txids": list(txids)}
+            try:
+                _atomic_write_json(self.cursor_path, self.cursor)
+            except OSError as e:
+                logger.warning(f"[Checkpoint] Could not save cursor: {e}")
+
+    def resume_cursor(self, source):
+        c = self.cursor
+        if c and c.get("source") == source:
+            return int(c.get("offset") or 0), list(c.get("txids") or [])
+        return 0, []
+
+    def retry_txids(self):
+        with self._lock:
+            return list(self.retry)
+
+    def commit(self, txs, mint_count, failed=(), settled=()):
+        """Record confirmed `txs` as processed, update the retry set and clear the crawl cursor.
+
+        `txs` and `settled` (txids) leave the retry set; `failed` txids
+        enter it or have their attempt count raised. The checkpoint file is
+        only rewritten when something in it changed (mempool scans usually
+        add no confirmed txs).
+        """
+        with self._lock:
+            before = len(self.txids)
+            retry_before = dict(self.retry)
+            for tx in txs:
+                status = tx.get("status") or {}
+                self.retry.pop(tx.get("txid"), None)
+                if status.get("confirmed") and tx.get("txid"):
+                    self.txids.add(tx["txid"])
+                    self.block_height = max(self.block_height, int(status.get("block_height") or 0))
+            for txid in settled:
+                self.retry.pop(txid, None)
+            for txid in failed:
+                attempts = self.retry.get(txid, 0) + 1
+                if attempts > self.max_retries:
+                    self.retry.pop(txid, None)
+                    logger.error(f"[Checkpoint] Giving up on tx {txid} after {self.max_retries} failed scans")
+                else:
+                    self.retry[txid] = attempts
+            changed = (len(self.txids) != before or mint_count != self.mint_count
+                       or self.retry != retry_before)
+            self.mint_count = mint_count
+            had_cursor = self.cursor is not None
+            self.cursor = None
+            if not changed:
+                if had_cursor:
+                    try:
+                        os.remove(self.cursor_path)
+                    except OSError:
+                        pass
+                return
+            try:
+                _atomic_write_json(self.path, {
+                    "block_height": self.block_height,
+                    "txids": sorted(self.txids),
+                    "retry": self.retry,
+                    "mint_count": self.mint_count,
+                    "updated_at": int(time.time()),
+                })
+                if os.path.exists(self.cursor_path):
+                    os.remove(self.cursor_path)
+            except OSError as e:
+                logger.warning(f"[Checkpoint] Could not save checkpoint: {e}")
+
+    def reset(self):
+        with self._lock:
+            self.block_height = 0
+            self.txids = set()
+            self.retry = {}
+            self.mint_count = 0
+            self.cursor = None
+            for path in (self.path, self.cursor_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        return {"block_height": self.block_height, "txids": len(self.txids), "retry": len(self.retry),
+                "mint_count": self.mint_count,
+                "cursor_offset": (self.cursor or {}).get("offset")}
+
+scan_checkpoint = ScanCheckpoint(SCAN_CHECKPOINT_FILE, SCAN_CURSOR_FILE, max_retries=SCAN_RETRY_MAX)
+
+# ---------------------------
+# Bitcoin transaction helpers
+# ---------------------------
+@metrics.stage("mempool_txs")
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=_count_tenacity_retry)
+def fetch_mempool_txs():
+    try:
+        r = session.get(f"{MEMPOOL}/address/{BITCOIN_ADDRESS}/txs/mempool", timeout=15)
+        r.raise_for_status()
+        data = r.json()
+        logger.debug(f"[Mempool] mempool txs type={type(data)} len={len(data) if isinstance(data, list) else 'N/A'}")
+        return data if isinstance(data, list) else []
+    except Exception as e:
+        logger.error(f"[Mempool] Error fetching mempool txs: {e}")
+        return []
+
+@metrics.stage("tx_detail")
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=_count_tenacity_retry)
+def fetch_tx_detail_mempool(txid: str):
+    try:
+        with host_limiter(MEMPOOL).slot():
+            r = session.get(f"{MEMPOOL}/tx/{txid}", timeout=20)
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        logger.error(f"[Mempool] Error fetching tx detail for {txid}: {e}")
+        return None
+
+class BlockchairRateLimited(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__(f"429 from Blockchair (Retry-After: {retry_after})")
+        self.retry_after = retry_after
+
+class BlockchairPager:
+    """Walks an offset-paged Blockchair listing in order while fetching up to `prefetch` pages ahead.
+
+    `fetch(offset)` returns (rows, total or None). Requests go through the
+    Blockchair HostLimiter, whose token bucket is the rate budget. A page
+    answered 429 is retried at the same offset once the whole host has
+    backed off for Retry-After (or an exponential delay), so rate limiting
+    never costs a page. Iteration ends at a short page, `max_pages`, the
+    total reported by the server, or when the consumer stops; pages still
+    in flight are then dropped.
+    """
+
+    MAX_429_RETRIES = 5
+
+    def __init__(self, fetch, limit, max_pages, offset=0, prefetch=None):
+        self.fetch = fetch
+        self.limit = limit
+        self.max_pages = max_pages
+        self.offset = offset
+        self.prefetch = max(1, prefetch or BLOCKCHAIR_PREFETCH)
+
+    def _get(self, offset):
+        lim = host_limiter(BLOCKCHAIR)
+        delay = 1.0
+        for attempt in range(self.MAX_429_RETRIES + 1):
+            with lim.slot():
+                try:
+                    return self.fetch(offset)
+                except BlockchairRateLimited as e:
+                    if attempt == self.MAX_429_RETRIES:
+                        raise
+                    wait_secs = e.retry_after if e.retry_after is not None else delay
+            # Pause the whole host, not just this page: the prefetched ones would hit the same limit
+            metrics.inc("mints_blockchair_backoff_total")
+            lim.bucket.penalize(wait_secs)
+            logger.warning(f"[Blockchair] 429 at offset {offset}, backing off {wait_secs:.1f}s")
+            delay = min(delay * 2, 60.0)
+
+    def __iter__(self):
+        end = self.offset + self.max_pages * self.limit
+        next_offset = self.offset
+        ahead = deque()
+        pool = ThreadPoolExecutor(max_workers=self.prefetch, thread_name_prefix="blockchair")
+
+        def fill():
+            nonlocal next_offset
+            while len(ahead) < self.prefetch and next_offset < end:
+                ahead.append((next_offset, pool.submit(self._get, next_offset)))
+                next_offset += self.limit
+
+        try:
+            fill()
+            while ahead:
+                offset, fut = ahead.popleft()
+                rows, total = fut.result()
+                if total is not None:
+                    end = min(end, total)
+                last = len(rows) < self.limit
+                if not last:
+                    fill()
+                yield offset, rows
+                if last:
+                    break
+        finally:
+            for _, fut in ahead:
+                fut.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+def _blockchair_get(path, params):
+    if BLOCKCHAIR_API_KEY:
+        params["key"] = BLOCKCHAIR_API_KEY
+    r = session.get(f"{BLOCKCHAIR}/{path}", params=params, timeout=30)
+    if r.status_code == 429:
+        value = r.headers.get("Retry-After")
+        try:
+            retry_after = retries.parse_retry_after(value) if value else None
+        except Exception:  # malformed header
+            retry_after = None
+        raise BlockchairRateLimited(retry_after)
+    r.raise_for_status()
+    return r.json()
+
+def _blockchair_time(value):
+    """Unix time of a Blockchair "YYYY-MM-DD HH:MM:SS" (UTC) timestamp, or None."""
+    try:
+        return int(datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+@metrics.stage("blockchair_dashboards")
+def _blockchair_dashboards_page(address, limit, offset):
+    j = _blockchair_get(f"dashboards/address/{address}",
+                        {"limit": limit, "offset": offset, "transaction_details": "true"})
+    metrics.inc("mints_blockchair_pages_total", endpoint="dashboards")
+    data_for_addr = j.get("data", {}).get(address, {})
+    total = (data_for_addr.get("address") or {}).get("transaction_count")
+    rows = [{"hash": t.get("hash"), "block_id": t.get("block_id"), "time": t.get("time")} if isinstance(t, dict)
+            else {"hash": t} for t in data_for_addr.get("transactions", [])]
+    return rows, total
+
+@metrics.stage("blockchair_outputs")
+def _blockchair_outputs_page(address, limit, offset):
+    j = _blockchair_get("outputs", {"q": f"recipient({address})", "limit": limit, "offset": offset})
+    metrics.inc("mints_blockchair_pages_total", endpoint="outputs")
+    total = (j.get("context") or {}).get("total_rows")
+    rows = [{"hash": row.get("transaction_hash"), "block_id": row.get("block_id"), "time": row.get("time")}
+            for row in j.get("data", [])]
+    return rows, total
+
+def _blockchair_txid_pages(source, address, limit=100, max_pages=10, known=None, checkpoint=None):
+    """Yield lists of txids (newest first), page by page, from the dashboards or outputs listing.
+
+    Stops at the first confirmed row whose txid is in `known` (confirmed
+    txids from the checkpoint), at the checkpoint height (outputs only) and
+    at the first confirmed tx older than SCAN_SINCE_UNIX; the crawl cursor
+    is saved after every page so an interrupted crawl resumes. Mempool rows
+    (block_id -1) come first in Blockchair listings and never stop the walk.
+    """
+    known = known or set()
+    fetch = _blockchair_dashboards_page if source == "dashboards" else _blockchair_outputs_page
+    min_height = checkpoint.block_height if checkpoint and source == "outputs" else 0
+    offset, txids = checkpoint.resume_cursor(source) if checkpoint else (0, [])
+    if offset:
+        logger.info(f"[Blockchair] Resuming {source} crawl at offset {offset} ({len(txids)} txids already collected)")
+    if txids:
+        yield list(txids)
+    for page_offset, rows in BlockchairPager(lambda off: fetch(address, limit, off), limit, max_pages, offset):
+        page = []
+        reached = None
+        for i, row in enumerate(rows):
+            t = row.get("hash")
+            block_id = row.get("block_id")
+            confirmed = block_id is None or block_id > 0  # plain txid rows carry no block_id
+            block_id = block_id or -1
+            block_time = _blockchair_time(row.get("time")) if block_id > 0 else None
+            if confirmed and t in known:
+                reached = f"checkpoint at offset {page_offset + i}"
+            elif min_height and 0 < block_id <= min_height:
+                reached = f"checkpoint (block {min_height}) at offset {page_offset + i}"
+            elif block_time is not None and block_time < SCAN_SINCE_UNIX:
+                reached = f"SCAN_SINCE_UNIX at offset {page_offset + i}"
+            if reached:
+                break
+            if t:
+                page.append(t)
+        txids.extend(page)
+        if page:
+            yield page
+        if reached:
+            logger.info(f"[Blockchair] Reached {reached}")
+            return
+        if checkpoint:
+            checkpoint.save_cursor(source, page_offset + limit, txids)
+
+def _blockchair_chain_txids(address, limit=100, max_pages=10, known=None, checkpoint=None):
+    """Yield the address's txids as their pages arrive: dashboards first, outputs if that fails or is empty."""
+    seen = set()
+    try:
+        for page in _blockchair_txid_pages("dashboards", address, limit, max_pages, known, checkpoint):
+            for t in page:
+                if t not in seen:
+                    seen.add(t)
+                    yield t
+        if seen:
+            return
+    except Exception as e:
+        logger.warning(f"[Blockchair] dashboards/address fallback to outputs. Reason: {e}")
+    try:
+        for page in _blockchair_txid_pages("outputs", address, limit, max_pages, known, checkpoint):
+            for t in page:
+                if t not in seen:
+                    seen.add(t)
+                    yield t
+    except Exception as e:
+        logger.error(f"[Blockchair] outputs recipient() error: {e}")
+
+@metrics.stage("chain_txs")
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=_count_tenacity_retry)
+def fetch_chain_txs(pages=100, limit=100, known=None, checkpoint=None, failed=None):
+    """Hydrate the address's chain txs, newest first, stopping at `known` confirmed txids / the checkpoint.
+
+    Txids are handed to the hydration pool as each Blockchair page arrives,
+    so tx details are fetched while later pages are still being paged in.
+    Txids whose details could not be fetched are appended to `failed`.
+    """
+    txids = []
+
+    def stream():
+        for t in _blockchair_chain_txids(BITCOIN_ADDRESS, limit=limit, max_pages=pages,
+                                         known=known, checkpoint=checkpoint):
+            txids.append(t)
+            yield t
+
+    txs = hydrate_txs(stream(), failed=failed)
+    if not txids:
+        logger.info("[Blockchair] No txids found for address.")
+        return []
+    logger.info(f"[Scan] Hydrated {len(txs)} transactions from {len(txids)} txids")
+    return txs
+
+@metrics.stage("hydrate")
+def hydrate_txs(txids, workers=None, failed=None):
+    """Fetch tx details for `txids` on a bounded thread pool, preserving input order.
+
+    `txids` may be a generator: each txid is submitted as soon as it is
+    produced. Per-host concurrency and request rate are enforced by the
+    mempool.space HostLimiter inside fetch_tx_detail_mempool, so `workers`
+    only bounds threads. Txids that could not be fetched are left out of
+    the result and appended to `failed` when given.
+    """
+    workers = max(1, workers or HYDRATE_WORKERS)
+    hist = LatencyHistogram()
+
+    def _one(txid):
+        t0 = time.perf_counter()
+        try:
+            return txid, fetch_tx_detail_mempool(txid)
+        except Exception as e:
+            logger.error(f"[Mempool] Error fetching tx detail for {txid}: {e}")
+            return txid, None
+        finally:
+            hist.observe(time.perf_counter() - t0)
+
+    if workers == 1:
+        results = [_one(t) for t in txids]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hydrate") as pool:
+            results = list(pool.map(_one, txids))
+    logger.info(f"[Scan] Hydration latency: {hist.summary()}")
+    if failed is not None:
+        failed.extend(txid for txid, tx in results if not tx)
+    return [tx for _, tx in results if tx]
+
+@metrics.stage("outspends")
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=_count_tenacity_retry)
+def get_outspends(txid):
+    try:
+        with host_limiter(MEMPOOL).slot():
+            r = session.get(f"{MEMPOOL}/tx/{txid}/outspends", timeout=15)
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        logger.error(f"[Mempool] Error fetching outspends for {txid}: {e}")
+        return None
+
+class ContentMiss(Exception):
+    """A content host answered, but not with the PNG we asked for (404, non-PNG body)."""
+
+class HostHealth:
+    """Rolling latency / error stats and circuit state for one content host."""
+
+    ALPHA = 0.2
+    MAX_COOLDOWN_SECS = 300
+
+    def __init__(self, base, rank):
+        self.base = base
+        self.rank = rank  # position in CONTENT_HOSTS, breaks ties
+        self.latency_ms = None
+        self.error_rate = 0.0
+        self.consecutive_errors = 0
+        self.open_until = 0.0
+        self.cooldown = CONTENT_HOST_COOLDOWN_SECS
+        self.probing = False  # a half-open probe is in flight
+        self.hist = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.misses = 0
+        self.trips = 0
+
+    def score(self):
+        if self.latency_ms is None:
+            return self.rank * 1e-3  # unmeasured hosts get tried (in configured order)
+        return self.latency_ms * (1 + 4 * self.error_rate)
+
+    def state(self, now):
+        if not self.open_until:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+    def record(self, ok, latency_ms, now):
+        self.probing = False
+        self.requests += 1
+        self.hist.observe(latency_ms / 1000.0)
+        self.latency_ms = latency_ms if self.latency_ms is None else (
+            (1 - self.ALPHA) * self.latency_ms + self.ALPHA * latency_ms)
+        self.error_rate = (1 - self.ALPHA) * self.error_rate + self.ALPHA * (0.0 if ok else 1.0)
+        if ok:
+            self.consecutive_errors = 0
+            self.open_until = 0.0
+            self.cooldown = CONTENT_HOST_COOLDOWN_SECS
+            return
+        self.errors += 1
+        self.consecutive_errors += 1
+        if self.open_until and now >= self.open_until:
+            # Failed half-open probe: back off harder
+            self.cooldown = min(self.cooldown * 2, self.MAX_COOLDOWN_SECS)
+            self.open_until = now + self.cooldown
+            self.trips += 1
+        elif not self.open_until and self.consecutive_errors >= CONTENT_HOST_BREAK_AFTER:
+            self.open_until = now + self.cooldown
+            self.trips += 1
+            logger.warning(f"[ContentHosts] Circuit open for {self.base} ({self.consecutive_errors} errors in a row)")
+
+    def record_cancelled(self, latency_ms):
+        """A call cancelled after latency_ms (a hedge that lost): the host is at least that slow.
+
+        Only the latency estimate moves; error rate and circuit state need an actual answer.
+        """
+        self.probing = False
+        if self.latency_ms is None or latency_ms > self.latency_ms:
+            self.latency_ms = latency_ms if self.latency_ms is None else (
+                (1 - self.ALPHA) * self.latency_ms + self.ALPHA * latency_ms)
+
+    def stats(self, now):
+        return {
+            "state": self.state(now),
+            "probing": self.probing,
+            "score": round(self.score(), 1),
+            "ewma_latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "consecutive_errors": self.consecutive_errors,
+            "requests": self.requests,
+            "errors": self.errors,
+            "misses": self.misses,
+            "trips": self.trips,
+            "latency": self.hist.summary(),
+        }
+
+class ContentHostSelector:
+    """Orders CONTENT_HOSTS by health and runs fetches against them.
+
+    Hosts are ranked by EWMA latency weighted by EWMA error rate; a small
+    share of requests (CONTENT_HOST_EXPLORE) swaps the top two so a host
+    that was slow once gets re-measured. Hosts with an open circuit are
+    skipped until their cooldown passes; then order() hands exactly one
+    caller the host first in line as a probe and keeps it out of every
+    other order until that probe is recorded. If no host is usable, all
+    are returned. A ContentMiss or 404 counts as a healthy
+    answer, so probing i0..i5 never trips a breaker.
+    """
+
+    def __init__(self, hosts):
+        self.hosts = [HostHealth(base, i) for i, base in enumerate(hosts)]
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(2, PIPELINE_WORKERS * 2), thread_name_prefix="hedge")
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def order(self):
+        now = time.time()
+        with self._lock:
+            ranked = sorted(self.hosts, key=lambda h: (h.score(), h.rank))
+            usable = [h for h in ranked if h.state(now) == "closed"]
+            if len(usable) > 1 and random.random() < CONTENT_HOST_EXPLORE:
+                usable[0], usable[1] = usable[1], usable[0]
+            probe = next((h for h in ranked if h.state(now) == "half_open" and not h.probing), None)
+            if probe is not None:
+                # First in line so it is actually called; _call -> record() clears the flag
+                probe.probing = True
+                usable.insert(0, probe)
+            return usable or ranked
+
+    def _record(self, host, t0, error=None):
+        miss = isinstance(error, ContentMiss)
+        if isinstance(error, (requests.HTTPError, httpx.HTTPStatusError)):
+            status = error.response.status_code if error.response is not None else None
+            miss = status in (400, 404, 410)
+        with self._lock:
+            host.record(error is None or miss, (time.perf_counter() - t0) * 1000, time.time())
+            if miss:
+                host.misses += 1
+
+    def _call(self, host, fetch_one):
+        t0 = time.perf_counter()
+        try:
+            result = fetch_one(host.base)
+        except Exception as e:
+            self._record(host, t0, e)
+            raise
+        self._record(host, t0)
+        return result
+
+    async def _call_async(self, host, fetch_one):
+        t0 = time.perf_counter()
+        try:
+            result = await fetch_one(host.base)
+        except asyncio.CancelledError:
+            with self._lock:
+                host.record_cancelled((time.perf_counter() - t0) * 1000)
+            raise
+        except Exception as e:
+            self._record(host, t0, e)
+            raise
+        self._record(host, t0)
+        return result
+
+    def fetch(self, fetch_one):
+        """Return fetch_one(base) from the first host that succeeds; raise when all fail."""
+        hosts = self.order()
+        errors = []
+        if CONTENT_HEDGE_MS <= 0 or len(hosts) < 2:
+            for host in hosts:
+                try:
+                    return self._call(host, fetch_one)
+                except Exception as e:
+                    errors.append(f"{host.base}: {e}")
+            raise Exception(f"All content hosts failed: {' | '.join(errors)}")
+
+        # Hedged: start the next host when the current one is slow or fails; first success wins
+        queue = list(hosts)
+        pending = {}
+
+        def launch():
+            host = queue.pop(0)
+            pending[self._pool.submit(self._call, host, fetch_one)] = host
+
+        launch()
+        while pending:
+            done, _ = wait(pending, timeout=CONTENT_HEDGE_MS / 1000 if queue else None, return_when=FIRST_COMPLETED)
+            if not done:
+                with self._lock:
+                    self.hedges += 1
+                launch()
+                continue
+            for fut in done:
+                host = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    errors.append(f"{host.base}: {e}")
+                    if queue:
+                        launch()
+                    continue
+                if host is not hosts[0]:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return result
+        raise Exception(f"All content hosts failed: {' | '.join(errors)}")
+
+    async def fetch_async(self, fetch_one):
+        """fetch() for a coroutine `fetch_one(base)`; hedges still running when one wins are cancelled."""
+        hosts = self.order()
+        errors = []
+        if CONTENT_HEDGE_MS <= 0 or len(hosts) < 2:
+            for host in hosts:
+                try:
+                    return await self._call_async(host, fetch_one)
+                except Exception as e:
+                    errors.append(f"{host.base}: {e}")
+            raise Exception(f"All content hosts failed: {' | '.join(errors)}")
+
+        queue = list(hosts)
+        pending = {}
+
+        def launch():
+            host = queue.pop(0)
+            pending[asyncio.ensure_future(self._call_async(host, fetch_one))] = host
+
+        launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=CONTENT_HEDGE_MS / 1000 if queue else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    with self._lock:
+                        self.hedges += 1
+                    launch()
+                    continue
+                for task in done:
+                    host = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        errors.append(f"{host.base}: {e}")
+                        if queue:
+                            launch()
+                        continue
+                    if host is not hosts[0]:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return result
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        raise Exception(f"All content hosts failed: {' | '.join(errors)}")
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                "order": [h.base for h in sorted(self.hosts, key=lambda h: (h.score(), h.rank))],
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hosts": {h.base: h.stats(now) for h in self.hosts},
+            }
+
+content_hosts = ContentHostSelector(CONTENT_HOSTS)
+
+def fetch_binary_once(url, headers):
+    try:
+        r = session.get(url, headers=headers, timeout=20)
+        r.raise_for_status()
+        return r.content
+    except Exception as e:
+        logger.error(f"[FetchBinary] Error fetching {url}: {e}")
+        raise
+
+def _content_url(base, inscription_id):
+    return f"{base}/{inscription_id}/content" if "hiro.so" in base else f"{base}/{inscription_id}"
+
+@metrics.stage("content_binary")
+def fetch_binary_with_fallback(inscription_id):
+    cached = inscription_cache.get(inscription_id)
+    if cached is not None:
+        return cached
+    headers = {"Accept": "image/png,application/octet-stream;q=0.9,*/*;q=0.8"}
+
+    def _one(base):
+        buf = fetch_binary_once(_content_url(base, inscription_id), headers)
+        if not buf.startswith(PNG_SIG):
+            raise ContentMiss(f"non-PNG from {base}")
+        return buf
+
+    buf = content_hosts.fetch(_one)
+    inscription_cache.put(inscription_id, buf)
+    return buf
+
+class PngTextStreamParser:
+    """Incremental counterpart of parse_png_text for streamed bodies.
+
+    Feed bytes as they arrive; `done` becomes True at the first IDAT or IEND
+    (text chunks normally precede image data), on a bad signature, or when a
+    chunk length is implausible. Non-text chunk bodies are skipped, not buffered.
+    """
+
+    TEXT_TYPES = ("tEXt", "zTXt", "iTXt")
+    MAX_TEXT_CHUNK = 1024 * 1024
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._skip = 0
+        self._have_sig = False
+        self.text = {}
+        self.done = False
+        self.is_png = None
+        self.stop_chunk = None
+        self.bytes_seen = 0
+
+    def feed(self, data):
+        if self.done:
+            return True
+        self.bytes_seen += len(data)
+        if self._skip:
+            n = min(self._skip, len(data))
+            self._skip -= n
+            data = data[n:]
+        self._buf += data
+        if not self._have_sig:
+            if len(self._buf) < 8:
+                return False
+            self.is_png = bytes(self._buf[:8]) == PNG_SIG
+            if not self.is_png:
+                self.done = True
+                return True
+            self._have_sig = True
+            del self._buf[:8]
+        while not self.done and not self._skip and len(self._buf) >= 8:
+            len_chunk = int.from_bytes(self._buf[0:4], "big")
+            type_chunk = bytes(self._buf[4:8]).decode("latin1")
+            if type_chunk in ("IDAT", "IEND"):
+                self.stop_chunk = type_chunk
+                self.done = True
+                break
+            if type_chunk in self.TEXT_TYPES:
+                if len_chunk > self.MAX_TEXT_CHUNK:
+                    self.done = True
+                    break
+                if len(self._buf) < 8 + len_chunk + 4:
+                    break
+                decode_text_chunk(type_chunk, bytes(self._buf[8:8+len_chunk]), self.text)
+                del self._buf[:8+len_chunk+4]
+            else:
+                total = 8 + len_chunk + 4
+                if len(self._buf) >= total:
+                    del self._buf[:total]
+                else:
+                    self._skip = total - len(self._buf)
+                    self._buf.clear()
+        return self.done
+
+    def result(self):
+        return {"ok": bool(self.text), "text": self.text}
+
+def _content_range_total(value):
+    # "bytes 0-4095/12345" -> 12345
+    m = re.match(r'^\s*bytes\s+\d+-\d+/(\d+)\s*$', value or "")
+    return int(m.group(1)) if m else None
+
+def fetch_png_head_once(url, headers):
+    """Stream `url` through a PngTextStreamParser until the first IDAT/IEND.
+
+    Requests PNG_HEAD_RANGE_BYTES at a time with a Range header; hosts that
+    ignore Range (plain 200) are read incrementally and the connection is
+    closed as soon as the parser is done.
+    """
+    parser = PngTextStreamParser()
+    try:
+        while True:
+            start = parser.bytes_seen
+            h = dict(headers)
+            h["Range"] = f"bytes={start}-{start + PNG_HEAD_RANGE_BYTES - 1}"
+            r = session.get(url, headers=h, timeout=20, stream=True)
+            try:
+                if r.status_code == 416 and start > 0:
+                    break
+                r.raise_for_status()
+                partial = r.status_code == 206
+                total = _content_range_total(r.headers.get("Content-Range"))
+                for piece in r.iter_content(chunk_size=2048):
+                    metrics.inc("mints_http_received_bytes_total", len(piece), host=urlparse(url).hostname)
+                    if parser.feed(piece):
+                        break
+            finally:
+                r.close()
+            received = parser.bytes_seen - start
+            if parser.done or not partial or received < PNG_HEAD_RANGE_BYTES:
+                break
+            if total is not None and parser.bytes_seen >= total:
+                break
+        return parser
+    except Exception as e:
+        logger.error(f"[FetchHead] Error fetching {url}: {e}")
+        raise
+
+_png_text_memo = OrderedDict()
+_png_text_memo_lock = threading.Lock()
+_PNG_TEXT_MEMO_MAX = 4096
+
+def _png_text_memo_get(inscription_id):
+    with _png_text_memo_lock:
+        memo = _png_text_memo.get(inscription_id)
+        if memo is not None:
+            _png_text_memo.move_to_end(inscription_id)
+        return memo
+
+def _png_text_memo_put(inscription_id, result):
+    with _png_text_memo_lock:
+        _png_text_memo[inscription_id] = result
+        while len(_png_text_memo) > _PNG_TEXT_MEMO_MAX:
+            _png_text_memo.popitem(last=False)
+
+@metrics.stage("png_text")
+def fetch_png_text(inscription_id):
+    """Return parse_png_text() output for an inscription; raise if no host serves a PNG.
+
+    Uses the inscription cache when the body is already local; otherwise, in
+    "stream" mode, only the chunks before the first IDAT are downloaded.
+    """
+    memo = _png_text_memo_get(inscription_id)
+    if memo is not None:
+        return memo
+    cached = inscription_cache.get(inscription_id)
+    if cached is not None:
+        return parse_png_text(cached)
+    if PNG_FETCH_MODE != "stream":
+        return parse_png_text(fetch_binary_with_fallback(inscription_id))
+
+    headers = {"Accept": "image/png,application/octet-stream;q=0.9,*/*;q=0.8"}
+
+    def _one(base):
+        parser = fetch_png_head_once(_content_url(base, inscription_id), headers)
+        if not parser.is_png:
+            raise ContentMiss(f"non-PNG from {base}")
+        return parser
+
+    parser = content_hosts.fetch(_one)
+    if not parser.text and parser.stop_chunk == "IDAT":
+        # Text chunks may legally follow IDAT; fall back to the whole body
+        return parse_png_text(fetch_binary_with_fallback(inscription_id))
+    result = parser.result()
+    _png_text_memo_put(inscription_id, result)
+    return result
+
+def get_case_insensitive(map_obj, key):
+    keys = map_obj.keys() if map_obj else []
+    k = next((k for k in keys if k.lower() == key.lower()), None)
+    return map_obj.get(k) if k else None
+
+def maybe_serial_from_json_values(text_map):
+    for v in text_map.values():
+        if not isinstance(v, str):
+            continue
+        v = v.strip()
+        if not v:
+            continue
+        try:
+            obj = json.loads(v)
+            s = obj.get("serial") or obj.get("Serial") or (obj.get("name") if re.match(r'^[A-Za-z0-9]{10,24}$', str(obj.get("name", ""))) else None)
+            if s:
+                return str(s)
+        except:
+            continue
+    return None
+
+def find_alnum_token(s):
+    if not isinstance(s, str):
+        return None
+    m = re.search(r'\b[A-Za-z0-9]{10,24}\b', s)
+    return m.group(0) if m else None
+
+@metrics.stage("tx_hex")
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=_count_tenacity_retry)
+def fetch_tx_hex_mempool(txid):
+    try:
+        with host_limiter(MEMPOOL).slot():
+            r = session.get(f"{MEMPOOL}/tx/{txid}/hex", timeout=20)
+        r.raise_for_status()
+        return r.text.strip()
+    except Exception as e:
+        logger.error(f"[Mempool] Error fetching raw tx for {txid}: {e}")
+        return None
+
+@metrics.stage("inscription_probe")
+def find_png_inscription_id(txid, max_index=5):
+    """Blind i0..i{max_index} probe against the content hosts (fallback when witness data is unavailable)."""
+    for i in range(max_index + 1):
+        id = f"{txid}i{i}"
+        try:
+            if PNG_FETCH_MODE == "stream":
+                fetch_png_text(id)  # raises unless a host serves a PNG
+                return id
+            buf = fetch_binary_with_fallback(id)
+            if buf.startswith(PNG_SIG):
+                return id
+        except:
+            continue
+    return None
+
+def _serial_from_text_map(text_map):
+    return (get_case_insensitive(text_map, PNG_TEXT_KEY_HINT) or
+            maybe_serial_from_json_values(text_map) or
+            find_alnum_token(' '.join([str(v) for v in text_map.values() if isinstance(v, str)])))
+
+@metrics.stage("envelopes")
+def _png_inscriptions(reveal_txid, reveal_tx):
+    """(inscription_id, body_or_None) for PNG inscriptions in a reveal tx.
+
+    Bodies come straight from the witness envelopes; only when the reveal tx
+    has no witness data are the content hosts probed (body None).
+    """
+    found = inscriptions_from_reveal_tx(reveal_tx)
+    if found is None and reveal_tx is None:
+        found = _inscriptions_from_raw(reveal_txid, fetch_tx_hex_mempool(reveal_txid))
+    if found is not None:
+        return _png_bodies(found)
+    probed = find_png_inscription_id(reveal_txid)
+    return [(probed, None)] if probed else []
+
+def _inscriptions_from_raw(reveal_txid, raw):
+    if raw:
+        try:
+            return inscriptions_from_reveal_tx(parse_raw_tx(raw))
+        except Exception as e:
+            logger.warning(f"[Envelope] Cannot decode raw tx {reveal_txid}: {e}")
+    return None
+
+def _png_bodies(found):
+    out = []
+    for ins in found:
+        if (ins["content_type"] or "").split(";")[0].strip().lower() != "image/png":
+            continue
+        body = ins["body"] if not ins["content_encoding"] and ins["body"].startswith(PNG_SIG) else None
+        out.append((ins["id"], body))
+    return out
+
+@metrics.stage("png_parse")
+def png_text_for_inscription(inscription_id, body=None):
+    """parse_png_text() output from a witness body when we have one, else from the content hosts."""
+    if body is not None:
+        inscription_cache.put(inscription_id, body)
+        return parse_png_text(body)
+    return fetch_png_text(inscription_id)
+
+def _attach_rarity(mint_item):
+    """Add the precomputed {"score", "rank", "of"} for the mint's image, when known."""
+    try:
+        rarity = rarity_for(RARITY_TABLE_FILE, mint_item.get("imageFile"))
+    except Exception as e:
+        logger.warning(f"[Rarity] Lookup failed for {mint_item.get('imageFile')}: {e}")
+        return mint_item
+    if rarity:
+        mint_item["rarity"] = rarity
+    return mint_item
+
+def _parallel_map(fn, items, workers=None):
+    """Ordered map over a bounded thread pool; host limits are enforced inside `fn`."""
+    items = list(items)
+    workers = max(1, min(workers or PIPELINE_WORKERS, len(items) or 1))
+    if workers == 1:
+        return [fn(x) for x in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+        return list(pool.map(fn, items))
+
+def _reveal_candidates(tx, outspends):
+    """Distinct reveal txids spending the outputs of a commit tx, in vout order."""
+    candidates = []
+    for spent in outspends[:len(tx.get("vout", []))]:
+        reveal_txid = spent.get("txid") if spent.get("spent") else None
+        if reveal_txid and reveal_txid not in candidates:
+            candidates.append(reveal_txid)
+    return candidates
+
+def _serial_from_inscriptions(reveal_txid, reveal_tx):
+    """(inscription_id, serial) for the first PNG inscription in a reveal tx that carries a serial."""
+    for inscription_id, body in _png_inscriptions(reveal_txid, reveal_tx):
+        parsed = png_text_for_inscription(inscription_id, body)
+        serial = _serial_from_text_map(parsed.get("text", {}) or {})
+        if serial:
+            return inscription_id, serial
+    return None
+
+def _resolve_pending_staged(pending, timings):
+    """[(tx, resolved, (inscription_id, serial) or None)] for each pending commit tx.
+
+    `resolved` is False when the outspends could not be fetched or finding
+    the inscription raised; the scan then keeps the txid in the checkpoint's
+    retry set. Each stage runs over its own thread pool and finishes before
+    the next starts.
+    """
+    # Stage 1: outspends of every unseen commit tx
+    t0 = time.perf_counter()
+    outspends_list = _parallel_map(get_outspends, [tx["txid"] for tx in pending])
+    timings["outspends"] = time.perf_counter() - t0
+
+    jobs = []
+    for tx, outspends in zip(pending, outspends_list):
+        if outspends:
+            jobs.append((tx, _reveal_candidates(tx, outspends)))
+
+    # Stage 2: reveal tx details (witness carries the inscription envelopes)
+    t0 = time.perf_counter()
+    reveal_ids = list(dict.fromkeys(r for _, candidates in jobs for r in candidates))
+    reveal_txs = dict(zip(reveal_ids, _parallel_map(fetch_tx_detail_mempool, reveal_ids)))
+    timings["reveal_txs"] = time.perf_counter() - t0
+
+    # Stage 3: PNG inscription + serial for each commit tx
+    def _resolve(job):
+        # (resolved, hit): an exception leaves the tx unresolved so it is retried
+        tx, candidates = job
+        try:
+            for reveal_txid in candidates:
+                hit = _serial_from_inscriptions(reveal_txid, reveal_txs.get(reveal_txid))
+                if hit:
+                    return True, hit
+        except Exception as e:
+            logger.error(f"[Scan] Error processing tx {tx.get('txid')}: {e}")
+            return False, None
+        return True, None
+
+    t0 = time.perf_counter()
+    outcomes = dict(zip((tx["txid"] for tx, _ in jobs), _parallel_map(_resolve, jobs)))
+    timings["inscriptions"] = time.perf_counter() - t0
+    return [(tx, *outcomes.get(tx["txid"], (False, None))) for tx in pending]
+
+# ---------------------------
+# Async scan engine (SCAN_ENGINE=async)
+# ---------------------------
+def _origin(url):
+    parts = urlparse(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def _retry_after_secs(value):
+    """Retry-After as seconds (delta-seconds or HTTP-date), None when absent or unparsable."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class AsyncUpstream:
+    """httpx.AsyncClient on a background event loop, for the async scan engine.
+
+    Each upstream origin gets its own HTTP/2-capable connection pool (mounted
+    like the session's adapters) and an asyncio.Semaphore sized like its
+    HostLimiter (PIPELINE_WORKERS for content hosts). Requests take tokens
+    from the same TokenBuckets as the session, so a 429 seen by either engine
+    pauses both. Retries follow the session's urllib3 Retry: up to RETRIES
+    on transport errors and RETRY_STATUSES, after Retry-After or else
+    BACKOFF * 2**n seconds (none before the first retry). The loop and client
+    live as long as the process, so connections are reused across scans.
+    """
+
+    RETRIES = 3
+    BACKOFF = 0.4
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, pools):
+        self.pools = pools  # origin -> max connections
+        self.hooks = []  # called with every final response, like session.hooks["response"]
+        self._loop = None
+        self._client = None
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def _transport(self, size):
+        transport = httpx.AsyncHTTPTransport(http2=True, limits=httpx.Limits(
+            max_connections=size, max_keepalive_connections=size))
+        return http_fixtures.wrap_async(transport, http_fixture_store, HTTP_FIXTURES_MODE, HTTP_FIXTURES_SPEED)
+
+    def _start(self):
+        with self._lock:
+            if self._loop is None:
+                self._client = httpx.AsyncClient(
+                    transport=self._transport(10), follow_redirects=True,
+                    mounts={origin: self._transport(size) for origin, size in self.pools.items()})
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="scan-async", daemon=True).start()
+            return self._loop
+
+    def run(self, coro):
+        """Run `coro` on the engine's loop and wait for it; cancelling the wait cancels the coroutine."""
+        future = asyncio.run_coroutine_threadsafe(coro, self._start())
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"[AsyncUpstream] Error closing client: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
 
-        mints = _sanitize_mints_list(mints)
-        return mints
-    except Exception as e:
-        logger.error(f"[JSONBin] Error reading bin: {e}")
-        return []
+    def _slot(self, host):
+        # Only touched from the loop thread
+        slot = self._slots.get(host)
+        if slot is None:
+            limiter = _host_limiters.get(host)
+            slot = self._slots[host] = asyncio.Semaphore(limiter.max_concurrency if limiter else PIPELINE_WORKERS)
+        return slot
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def update_jsonbin(mints):
-    try:
-        # write only sanitized dicts
-        safe = _sanitize_mints_list(mints)
-        payload = {"mints": safe}
-        r = session.put(
-            JSONBIN_URL_WRITE,
-            headers={"X-Master-Key": JSONBIN_MASTER_KEY, "Content-Type": "application/json"},
-            json=payload,
-            timeout=15
-        )
-        r.raise_for_status()
-        logger.info("[JSONBin] Updated bin with %d mints", len(safe))
-        return True
-    except Exception as e:
-        logger.error(f"[JSONBin] Error updating bin: {e}")
-        return False
+    def _count(self, r):
+        host = r.url.host
+        metrics.inc("mints_http_requests_total", host=host, status=r.status_code)
+        if r.status_code == 429:
+            metrics.inc("mints_http_429_total", host=host)
+        metrics.inc("mints_http_received_bytes_total", r.num_bytes_downloaded, host=host)
+        for hook in self.hooks:
+            hook(r)
 
-# ---------------------------
-# Bitcoin transaction helpers
-# ---------------------------
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def fetch_mempool_txs():
+    async def get(self, url, headers=None, timeout=20, read=None):
+        """GET `url` under its host's slot and token bucket, retrying like the session.
+
+        Returns the final response with its body read or, when given, the
+        result of `await read(response)` while the body is still streaming.
+        """
+        host = _url_limiter_key(url)
+        limiter = _host_limiters.get(host)
+        for attempt in range(self.RETRIES + 1):
+            status = retry_after = None
+            t_wait = time.perf_counter()
+            async with self._slot(host):
+                if limiter is not None:
+                    await limiter.bucket.acquire_async()
+                metrics.waited(time.perf_counter() - t_wait)
+                try:
+                    async with self._client.stream("GET", url, headers=headers, timeout=timeout) as r:
+                        if r.status_code in self.RETRY_STATUSES and attempt < self.RETRIES:
+                            await r.aread()  # keeps the connection reusable
+                            status, retry_after = r.status_code, _retry_after_secs(r.headers.get("Retry-After"))
+                        else:
+                            if r.status_code == 429:  # out of retries; urllib3 reports this one too
+                                _on_upstream_status(host, 429, _retry_after_secs(r.headers.get("Retry-After")))
+                            try:
+                                if read is not None:
+                                    return await read(r)
+                                await r.aread()
+                                return r
+                            finally:
+                                self._count(r)
+                except httpx.TransportError:
+                    if attempt == self.RETRIES:
+                        raise
+            metrics.inc("mints_retries_total", source="httpx", host=urlparse(url).hostname)
+            if status == 429:
+                metrics.inc("mints_http_429_total", host=urlparse(url).hostname)
+            if status is not None:
+                _on_upstream_status(host, status, retry_after)
+            await asyncio.sleep(retry_after if retry_after is not None else self.BACKOFF * 2 ** attempt if attempt else 0)
+
+def _async_pools():
+    pools = {}
+    for base, size in [(MEMPOOL, max(MEMPOOL_MAX_CONCURRENCY, PIPELINE_WORKERS))] + [(b, PIPELINE_WORKERS) for b in CONTENT_HOSTS]:
+        pools[_origin(base)] = max(size, pools.get(_origin(base), 0))
+    return pools
+
+async_upstream = AsyncUpstream(_async_pools())
+atexit.register(async_upstream.close)
+
+# Coroutine twins of the fetch helpers above: same arguments, results and error contracts
+@metrics.stage("mempool_txs")
+async def fetch_mempool_txs_async():
     try:
-        r = session.get(f"{MEMPOOL}/address/{BITCOIN_ADDRESS}/txs/mempool", timeout=15)
+        r = await async_upstream.get(f"{MEMPOOL}/address/{BITCOIN_ADDRESS}/txs/mempool", timeout=15)
         r.raise_for_status()
         data = r.json()
-        logger.debug(f"[Mempool] mempool txs type={type(data)} len={len(data) if isinstance(data, list) else 'N/A'}")
         return data if isinstance(data, list) else []
     except Exception as e:
         logger.error(f"[Mempool] Error fetching mempool txs: {e}")
         return []
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def fetch_tx_detail_mempool(txid: str):
+@metrics.stage("tx_detail")
+async def fetch_tx_detail_mempool_async(txid):
     try:
-        r = session.get(f"{MEMPOOL}/tx/{txid}", timeout=20)
+        r = await async_upstream.get(f"{MEMPOOL}/tx/{txid}", timeout=20)
         r.raise_for_status()
         return r.json()
     except Exception as e:
         logger.error(f"[Mempool] Error fetching tx detail for {txid}: {e}")
         return None
 
-def _blockchair_fetch_txids_dashboards(address, limit=100, max_pages=10, pause=0.25):
-    txids = []
-    offset = 0
-    for _ in range(max_pages):
-        try:
-            url = f"{BLOCKCHAIR}/dashboards/address/{address}"
-            params = {"limit": limit, "offset": offset}
-            if BLOCKCHAIR_API_KEY:
-                params["key"] = BLOCKCHAIR_API_KEY
-            r = session.get(url, params=params, timeout=30)
-            if r.status_code == 429:
-                time.sleep(1.0); continue
-            r.raise_for_status()
-            j = r.json()
-            data_for_addr = j.get("data", {}).get(address, {})
-            page_txids = data_for_addr.get("transactions", [])
-            if not page_txids:
-                break
-            txids.extend(page_txids)
-            if len(page_txids) < limit:
-                break
-            offset += limit
-            time.sleep(pause)
-        except Exception as e:
-            logger.warning(f"[Blockchair] dashboards/address fallback to outputs. Reason: {e}")
-            return []
-    return txids
-
-def _blockchair_fetch_txids_outputs(address, limit=100, max_pages=10, pause=0.25):
-    txids = []
-    offset = 0
-    for _ in range(max_pages):
-        try:
-            url = f"{BLOCKCHAIR}/outputs"
-            params = {"q": f"recipient({address})", "limit": limit, "offset": offset}
-            if BLOCKCHAIR_API_KEY:
-                params["key"] = BLOCKCHAIR_API_KEY
-            r = session.get(url, params=params, timeout=30)
-            if r.status_code == 429:
-                time.sleep(1.0); continue
-            r.raise_for_status()
-            j = r.json()
-            rows = j.get("data", [])
-            if not rows:
-                break
-            page_txids = [row.get("transaction_hash") for row in rows if row.get("transaction_hash")]
-            if not page_txids:
-                break
-            txids.extend(page_txids)
-            if len(rows) < limit:
-                break
-            offset += limit
-            time.sleep(pause)
-        except Exception as e:
-            logger.error(f"[Blockchair] outputs recipient() error: {e}")
-            break
-    # de-dup preserve order
-    seen = set(); uniq = []
-    for t in txids:
-        if t not in seen:
-            uniq.append(t); seen.add(t)
-    return uniq
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def fetch_chain_txs(pages=100, limit=100):
-    txids = _blockchair_fetch_txids_dashboards(BITCOIN_ADDRESS, limit=limit, max_pages=pages)
-    if not txids:
-        txids = _blockchair_fetch_txids_outputs(BITCOIN_ADDRESS, limit=limit, max_pages=pages)
-    if not txids:
-        logger.info("[Blockchair] No txids found for address.")
-        return []
-    txs = []
-    for txid in txids:
-        tx = fetch_tx_detail_mempool(txid)
-        if tx:
-            txs.append(tx)
-    logger.info(f"[Scan] Hydrated {len(txs)} transactions from {len(txids)} txids")
-    return txs
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def get_outspends(txid):
+@metrics.stage("outspends")
+async def get_outspends_async(txid):
     try:
-        r = session.get(f"{MEMPOOL}/tx/{txid}/outspends", timeout=15)
+        r = await async_upstream.get(f"{MEMPOOL}/tx/{txid}/outspends", timeout=15)
         r.raise_for_status()
         return r.json()
     except Exception as e:
         logger.error(f"[Mempool] Error fetching outspends for {txid}: {e}")
         return None
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def fetch_binary_once(url, headers):
+@metrics.stage("tx_hex")
+async def fetch_tx_hex_mempool_async(txid):
     try:
-        r = session.get(url, headers=headers, timeout=20)
+        r = await async_upstream.get(f"{MEMPOOL}/tx/{txid}/hex", timeout=20)
+        r.raise_for_status()
+        return r.text.strip()
+    except Exception as e:
+        logger.error(f"[Mempool] Error fetching raw tx for {txid}: {e}")
+        return None
+
+async def fetch_binary_once_async(url, headers):
+    try:
+        r = await async_upstream.get(url, headers=headers, timeout=20)
         r.raise_for_status()
         return r.content
     except Exception as e:
         logger.error(f"[FetchBinary] Error fetching {url}: {e}")
         raise
 
-def fetch_binary_with_fallback(inscription_id):
-    errors = []
-    for base in CONTENT_HOSTS:
-        url = f"{base}/{inscription_id}/content" if "hiro.so" in base else f"{base}/{inscription_id}"
-        headers = {"Accept": "image/png,application/octet-stream;q=0.9,*/*;q=0.8"}
-        try:
-            buf = fetch_binary_once(url, headers)
-            if buf.startswith(PNG_SIG):
-                return buf
-            errors.append(f"non-PNG from {base}")
-        except Exception as e:
-            errors.append(f"{base}: {e}")
-    raise Exception(f"All content hosts failed: {' | '.join(errors)}")
-
-def parse_png_text(buf):
-    if not buf.startswith(PNG_SIG):
-        return {"ok": False, "text": None}
-    text = {}
-    off = 8
-    while off + 8 <= len(buf):
-        len_chunk = int.from_bytes(buf[off:off+4], "big")
-        off += 4
-        type_chunk = buf[off:off+4].decode("latin1")
-        off += 4
-        if off + len_chunk > len(buf):
-            break
-        data = buf[off:off+len_chunk]
-        off += len_chunk
-        off += 4  # Skip CRC
-
-        if type_chunk == "tEXt":
-            zero = data.find(b'\x00')
-            if zero >= 0:
-                k = data[:zero].decode("latin1")
-                v = data[zero+1:].decode("latin1")
-                text[k] = v
-        elif type_chunk == "zTXt":
-            zero = data.find(b'\x00')
-            if zero >= 0:
-                k = data[:zero].decode("latin1")
-                comp_method = data[zero+1]
-                comp_data = data[zero+2:]
-                if comp_method == 0:
-                    try:
-                        v = zlib.decompress(comp_data).decode("utf-8")
-                        text[k] = v
-                    except Exception as e:
-                        text[k] = f"<zTXt decompress error: {e}>"
-        elif type_chunk == "iTXt":
-            parts = data.split(b'\x00', 5)
-            if len(parts) >= 5:
-                k, comp_flag, comp_method, _, _, payload = parts[:5]
-                try:
-                    v = zlib.decompress(payload).decode("utf-8") if comp_flag == b'\x01' else payload.decode("utf-8")
-                    text[k.decode("latin1")] = v
-                except Exception as e:
-                    text[k.decode("latin1")] = f"<iTXt error: {e}>"
+@metrics.stage("content_binary")
+async def fetch_binary_with_fallback_async(inscription_id):
+    cached = inscription_cache.get(inscription_id)
+    if cached is not None:
+        return cached
+    headers = {"Accept": "image/png,application/octet-stream;q=0.9,*/*;q=0.8"}
 
-        if type_chunk == "IEND":
-            break
-    return {"ok": bool(text), "text": text}
+    async def _one(base):
+        buf = await fetch_binary_once_async(_content_url(base, inscription_id), headers)
+        if not buf.startswith(PNG_SIG):
+            raise ContentMiss(f"non-PNG from {base}")
+        return buf
 
-def get_case_insensitive(map_obj, key):
-    keys = map_obj.keys() if map_obj else []
-    k = next((k for k in keys if k.lower() == key.lower()), None)
-    return map_obj.get(k) if k else None
+    buf = await content_hosts.fetch_async(_one)
+    inscription_cache.put(inscription_id, buf)
+    return buf
 
-def maybe_serial_from_json_values(text_map):
-    for v in text_map.values():
-        if not isinstance(v, str):
-            continue
-        v = v.strip()
-        if not v:
-            continue
-        try:
-            obj = json.loads(v)
-            s = obj.get("serial") or obj.get("Serial") or (obj.get("name") if re.match(r'^[A-Za-z0-9]{10,24}$', str(obj.get("name", ""))) else None)
-            if s:
-                return str(s)
-        except:
-            continue
-    return None
+async def fetch_png_head_once_async(url, headers):
+    parser = PngTextStreamParser()
 
-def find_alnum_token(s):
-    if not isinstance(s, str):
-        return None
-    m = re.search(r'\b[A-Za-z0-9]{10,24}\b', s)
-    return m.group(0) if m else None
+    async def read(r):
+        # (partial, total) of one ranged response, None when the host has nothing past the end
+        if r.status_code == 416 and parser.bytes_seen > 0:
+            return None
+        r.raise_for_status()
+        async for piece in r.aiter_bytes(2048):
+            if parser.feed(piece):
+                break
+        return r.status_code == 206, _content_range_total(r.headers.get("Content-Range"))
 
-def find_png_inscription_id(txid, max_index=5):
+    try:
+        while True:
+            start = parser.bytes_seen
+            h = dict(headers)
+            h["Range"] = f"bytes={start}-{start + PNG_HEAD_RANGE_BYTES - 1}"
+            got = await async_upstream.get(url, headers=h, timeout=20, read=read)
+            if got is None:
+                break
+            partial, total = got
+            received = parser.bytes_seen - start
+            if parser.done or not partial or received < PNG_HEAD_RANGE_BYTES:
+                break
+            if total is not None and parser.bytes_seen >= total:
+                break
+        return parser
+    except Exception as e:
+        logger.error(f"[FetchHead] Error fetching {url}: {e}")
+        raise
+
+@metrics.stage("png_text")
+async def fetch_png_text_async(inscription_id):
+    memo = _png_text_memo_get(inscription_id)
+    if memo is not None:
+        return memo
+    cached = inscription_cache.get(inscription_id)
+    if cached is not None:
+        return parse_png_text(cached)
+    if PNG_FETCH_MODE != "stream":
+        return parse_png_text(await fetch_binary_with_fallback_async(inscription_id))
+
+    headers = {"Accept": "image/png,application/octet-stream;q=0.9,*/*;q=0.8"}
+
+    async def _one(base):
+        parser = await fetch_png_head_once_async(_content_url(base, inscription_id), headers)
+        if not parser.is_png:
+            raise ContentMiss(f"non-PNG from {base}")
+        return parser
+
+    parser = await content_hosts.fetch_async(_one)
+    if not parser.text and parser.stop_chunk == "IDAT":
+        return parse_png_text(await fetch_binary_with_fallback_async(inscription_id))
+    result = parser.result()
+    _png_text_memo_put(inscription_id, result)
+    return result
+
+@metrics.stage("inscription_probe")
+async def find_png_inscription_id_async(txid, max_index=5):
     for i in range(max_index + 1):
         id = f"{txid}i{i}"
         try:
-            buf = fetch_binary_with_fallback(id)
+            if PNG_FETCH_MODE == "stream":
+                await fetch_png_text_async(id)
+                return id
+            buf = await fetch_binary_with_fallback_async(id)
             if buf.startswith(PNG_SIG):
                 return id
-        except:
+        except Exception:
             continue
     return None
 
+@metrics.stage("envelopes")
+async def _png_inscriptions_async(reveal_txid, reveal_tx):
+    found = inscriptions_from_reveal_tx(reveal_tx)
+    if found is None and reveal_tx is None:
+        found = _inscriptions_from_raw(reveal_txid, await fetch_tx_hex_mempool_async(reveal_txid))
+    if found is not None:
+        return _png_bodies(found)
+    probed = await find_png_inscription_id_async(reveal_txid)
+    return [(probed, None)] if probed else []
+
+async def _serial_from_inscriptions_async(reveal_txid, reveal_tx):
+    for inscription_id, body in await _png_inscriptions_async(reveal_txid, reveal_tx):
+        if body is not None:
+            parsed = png_text_for_inscription(inscription_id, body)
+        else:
+            parsed = await fetch_png_text_async(inscription_id)
+        serial = _serial_from_text_map(parsed.get("text", {}) or {})
+        if serial:
+            return inscription_id, serial
+    return None
+
+def _resolve_pending_async(pending, timings):
+    """Same contract as _resolve_pending_staged, run as asyncio tasks on async_upstream's loop.
+
+    Each commit tx is one task running outspends -> reveal txs -> inscriptions,
+    so no tx waits at a stage barrier for the slowest of its batch; a reveal tx
+    shared by several commit txs is fetched once. All tasks belong to one
+    TaskGroup under SCAN_TIMEOUT_SECS: on timeout every request still in
+    flight is cancelled and the unfinished txs come back unresolved.
+    """
+    t0 = time.perf_counter()
+    results = async_upstream.run(_scan_pending_async(pending))
+    timings["pipeline"] = time.perf_counter() - t0
+    return results
+
+async def _scan_pending_async(pending):
+    outcomes = {}
+    reveal_tasks = {}
+
+    def reveal_tx(reveal_txid):
+        task = reveal_tasks.get(reveal_txid)
+        if task is None:
+            task = reveal_tasks[reveal_txid] = group.create_task(fetch_tx_detail_mempool_async(reveal_txid))
+        return task
+
+    async def one(tx):
+        outspends = await get_outspends_async(tx["txid"])
+        if not outspends:
+            return
+        try:
+            for reveal_txid in _reveal_candidates(tx, outspends):
+                hit = await _serial_from_inscriptions_async(reveal_txid, await reveal_tx(reveal_txid))
+                if hit:
+                    outcomes[tx["txid"]] = (True, hit)
+                    return
+        except Exception as e:
+            logger.error(f"[Scan] Error processing tx {tx.get('txid')}: {e}")
+            outcomes[tx["txid"]] = (False, None)
+            return
+        outcomes[tx["txid"]] = (True, None)
+
+    try:
+        async with asyncio.timeout(SCAN_TIMEOUT_SECS or None):
+            async with asyncio.TaskGroup() as group:
+                for tx in pending:
+                    group.create_task(one(tx))
+    except TimeoutError:
+        logger.warning(f"[Scan] Async scan timed out after {SCAN_TIMEOUT_SECS}s; "
+                       f"{len(pending) - len(outcomes)} txs left for the next scan")
+    return [(tx, *outcomes.get(tx["txid"], (False, None))) for tx in pending]
+
+# ---------------------------
+# Live mint events (SSE fan-out)
+# ---------------------------
+class MintBroker:
+    """Fan-out of newly committed mints, fed from the shared mint store.
+
+    Every process polls the store for rows past the last one it has seen,
+    so all gunicorn workers emit the same events with the same ids,
+    "<store epoch>:<rowid>", whichever process did the scan. The last
+    `replay` events are buffered for Last-Event-ID resumes; older ids are
+    read back from the store. Subscribers just wait on one shared
+    Condition, so an idle viewer holds no per-client buffer. An id from
+    another epoch (the store was replaced), or more than `replay` events
+    behind, can't be resumed: `since` then reports a gap and the client
+    should refetch /mints.
+    """
+
+    def __init__(self, store, replay):
+        self.store = store
+        self.replay = replay
+        self._cond = threading.Condition()
+        self._poll_lock = threading.Lock()
+        self._events = deque(maxlen=replay)
+        self.epoch, self._seq = store.head()
+        self._floor = self._seq  # the buffer holds every event after this rowid
+        self.published = 0
+        self.subscribers = 0
+
+    def poll(self):
+        """Pull rows committed since the last poll (by any process) into the buffer; return how many."""
+        with self._poll_lock:
+            epoch, rows = self.store.rows_after(self._seq)
+            if epoch != self.epoch:
+                epoch, head = self.store.head()
+                with self._cond:
+                    self.epoch, self._seq, self._floor = epoch, head, head
+                    self._events.clear()
+                    self._cond.notify_all()
+                return 0
+            if not rows:
+                return 0
+            with self._cond:
+                for rowid, data in rows:
+                    if len(self._events) == self._events.maxlen:
+                        self._floor = self._events[0][0]
+                    self._events.append((rowid, data))
+                self._seq = rows[-1][0]
+                self.published += len(rows)
+                self._cond.notify_all()
+            return len(rows)
+
+    def event_id(self, cursor):
+        return f"{cursor[0]}:{cursor[1]}"
+
+    def parse_id(self, last_event_id):
+        """(epoch, rowid) cursor to resume after, or None when the id can't be resumed."""
+        try:
+            epoch, seq = (last_event_id or "").split(":")
+            epoch, seq = int(epoch), int(seq)
+        except ValueError:
+            return None
+        if epoch != self.epoch or seq > self._seq:
+            return None
+        return epoch, seq
+
+    @property
+    def head(self):
+        return self.epoch, self._seq
+
+    def since(self, cursor):
+        """(gap, [((epoch, rowid), json), ...]) for events after `cursor`."""
+        with self._cond:
+            epoch = self.epoch
+            if cursor[0] != epoch:
+                return True, []
+            if cursor[1] >= self._floor:
+                return False, [((epoch, r), d) for r, d in self._events if r > cursor[1]]
+        # Older than the buffer: read it back from the store
+        store_epoch, rows = self.store.rows_after(cursor[1], self.replay + 1)
+        if store_epoch != epoch or len(rows) > self.replay:
+            return True, []
+        return False, [((epoch, r), d) for r, d in rows]
+
+    def wait(self, cursor, timeout):
+        """Block until there are events after `cursor` (or timeout); same result as since()."""
+        with self._cond:
+            if cursor[0] == self.epoch and self._seq <= cursor[1]:
+                self._cond.wait(timeout)
+        return self.since(cursor)
+
+    @contextmanager
+    def subscription(self):
+        with self._cond:
+            self.subscribers += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def stats(self):
+        return {"epoch": self.epoch, "head": self._seq, "buffered": len(self._events),
+                "published": self.published, "subscribers": self.subscribers}
+
+mint_broker = MintBroker(mint_store, MINT_EVENTS_REPLAY)
+
 # ---------------------------
 # Scan transactions
 # ---------------------------
-def scan_transactions(initial=False):
-    mints = get_jsonbin() if not initial else []
-    mints = _sanitize_mints_list(mints)  # extra safety
-    seen_set = {m.get("txid") for m in mints if isinstance(m, dict)}
-    txs = []
+_scan_lock = threading.Lock()
+
+# Per-scan summary records (metric deltas over one scan), newest last; served by /metrics/scans
+scan_summaries = deque(maxlen=50)
+
+def scan_transactions(initial=False, txs=None):
+    """Detect new mints and commit them to the local mint store.
+
+    `initial` walks the chain history back to the scan checkpoint (a full
+    crawl only when there is none). `txs` lets a caller (the websocket
+    watcher) hand in already-known transactions instead of polling the
+    mempool endpoint. JSONBin is updated separately by sync_jsonbin_job.
+    """
+    with _scan_lock:
+        before = metrics.snapshot()
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            result = _scan_transactions(initial=initial, txs=txs)
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - t0
+            kind = "pushed" if txs is not None else "initial" if initial else "mempool"
+            summary = {"at": int(time.time()), "kind": kind, "ok": ok, "engine": SCAN_ENGINE,
+                       "seconds": round(elapsed, 3), "metrics": metrics.diff(before)}
+            metrics.observe("mints_scan_seconds", elapsed, kind=kind)
+            metrics.inc("mints_scans_total", kind=kind, ok=ok)
+            scan_summaries.append(summary)
+            logger.info(f"[Scan] Summary: {json.dumps(summary)}")
+
+def _scan_transactions(initial=False, txs=None):
+    seen_set = mint_store.txids()
+    new_items = []
+    processed = []  # txs to record in the scan checkpoint
+    failed = []     # txids to retry next scan (hydration failed or left unresolved)
 
-    if initial:
-        logger.info("[Scan] Performing initial full scan...")
-        chain_txs = fetch_chain_txs(pages=100, limit=100)
+    if txs is not None:
+        logger.info(f"[Scan] Processing {len(txs)} pushed txs...")
+        txs = [t for t in txs if isinstance(t, dict)]
+    elif initial:
+        if scan_checkpoint.is_empty() and not seen_set:
+            logger.info("[Scan] Performing initial full scan...")
+        else:
+            logger.info(f"[Scan] Catch-up scan from checkpoint {scan_checkpoint.stats()}...")
+        # Only confirmed txids may stop the walk: a stored mint still unconfirmed at restart is listed
+        # before everything confirmed while we were down
+        known = set(scan_checkpoint.txids)
+        chain_txs = fetch_chain_txs(pages=100, limit=100, known=known, checkpoint=scan_checkpoint, failed=failed)
         txs = [t for t in chain_txs if isinstance(t, dict) and t.get("status", {}).get("block_time", 0) >= SCAN_SINCE_UNIX]
+        processed.extend(t for t in chain_txs if isinstance(t, dict) and t.get("status", {}).get("block_time", 0) < SCAN_SINCE_UNIX)
     else:
         logger.info("[Scan] Scanning mempool for updates...")
-        txs = fetch_mempool_txs()
+        txs = async_upstream.run(fetch_mempool_txs_async()) if SCAN_ENGINE == "async" else fetch_mempool_txs()
+
+    # Earlier failures: the chain walk stops above them and they may have left the mempool
+    retry = scan_checkpoint.retry_txids()
+    settled = [t for t in retry if t in seen_set]
+    listed = {t.get("txid") for t in txs}
+    todo = [t for t in retry if t not in seen_set and t not in listed and t not in failed]
+    if todo:
+        logger.info(f"[Scan] Retrying {len(todo)} txs that failed in earlier scans")
+        txs = txs + hydrate_txs(todo, failed=failed)
 
     new_mints = 0
+    pending = []
     for tx in txs:
         txid = tx.get("txid")
-        if not txid or txid in seen_set:
+        if txid and txid not in seen_set:
+            pending.append(tx)
+            seen_set.add(txid)
+    metrics.inc("mints_scan_txs_total", len(txs))
+    metrics.inc("mints_scan_pending_txs_total", len(pending))
+    timings = {}
+
+    engine = _resolve_pending_async if SCAN_ENGINE == "async" else _resolve_pending_staged
+    results = engine(pending, timings)
+
+    for tx, resolved, hit in results:
+        if resolved:
+            processed.append(tx)
+        else:
+            failed.append(tx["txid"])
+        if not hit:
             continue
+        inscription_id, serial = hit
+        txid = tx["txid"]
+        vouts = tx.get("vout", [])
+        buyer_addr = next((vout.get("scriptpubkey_address") for vout in vouts if vout.get("scriptpubkey_address")), "")
+        timestamp = tx.get("status", {}).get("block_time", int(time.time()))
+
+        image_file = None
         try:
-            outspends = get_outspends(txid)
-            if not outspends:
-                continue
+            image_file = singles_index.lookup(serial)
+        except Exception as e:
+            logger.warning(f"[Scan] Error looking up image for {serial}: {e}")
 
-            vouts = tx.get("vout", [])
-            candidates = []
-            for idx, spent in enumerate(outspends[:len(vouts)]):
-                if spent.get("spent"):
-                    reveal_txid = spent.get("txid")
-                    if reveal_txid:
-                        candidates.append(reveal_txid)
-
-            uniq_candidates = list(set(candidates))
-            inscription_id = None
-            for reveal_txid in uniq_candidates[:1]:
-                inscription_id = find_png_inscription_id(reveal_txid)
-                if inscription_id:
-                    break
+        mint_item = {
+            "txid": txid,
+            "serial": serial,
+            "buyerAddr": buyer_addr,
+            "confirmedAt": timestamp,
+            "imageFile": image_file
+        }
+        _attach_rarity(mint_item)
+        new_items.append(mint_item)
+        new_mints += 1
+        logger.debug(f"[Scan] Added mint: {serial} for tx {txid}")
 
-            if not inscription_id:
-                continue
+    logger.info("[Scan] Stage timings: " + ", ".join(
+        f"{k}={v * 1000:.0f}ms" for k, v in timings.items()) + f" ({len(pending)} txs, {SCAN_ENGINE} engine)")
+    logger.info(f"[Scan] Processed {len(txs)} txs, found {new_mints} new mints")
+    logger.info(f"[Scan] Singles index: {singles_index.stats()}")
+    logger.info(f"[Scan] Inscription cache: {inscription_cache.stats()}")
+    metrics.inc("mints_new_total", new_mints)
+    mint_store.add_many(new_items)
+    if processed or initial or failed or settled:
+        scan_checkpoint.commit(processed, mint_store.count(), failed=failed, settled=settled)
+    if new_items:
+        mint_broker.poll()
+    return mint_store.all()
 
-            buf = fetch_binary_with_fallback(inscription_id)
-            parsed = parse_png_text(buf)
-            text_map = parsed.get("text", {}) or {}
-            serial = (get_case_insensitive(text_map, PNG_TEXT_KEY_HINT) or
-                      maybe_serial_from_json_values(text_map) or
-                      find_alnum_token(' '.join([str(v) for v in text_map.values() if isinstance(v, str)])))
-            if not serial:
-                continue
+# ---------------------------
+# Mempool websocket watcher
+# ---------------------------
+class MempoolWatcher:
+    """Subscribes to mempool.space `track-address` pushes and feeds new txs to scan_transactions.
+
+    Txs that entered the mempool while the socket was down are never
+    pushed, so after every (re)subscribe the watcher runs `on_connect` (one
+    mempool scan); pushes are only relied on, i.e. `live` is True and the
+    polling job skips its mempool scan, once such a scan has completed on
+    the current connection. `on_connect` may return False to leave that
+    scan to the polling job, which then calls mark_synced(). When the socket
+    drops the watcher reconnects with exponential backoff and polling
+    resumes in the meantime.
+    """
+
+    PING_SECS = 30
+    MAX_BACKOFF = 60
+
+    def __init__(self, url, address, on_txs, on_connect=None):
+        self.url = url
+        self.address = address
+        self.on_txs = on_txs
+        self.on_connect = on_connect
+        self.connected = False
+        self.synced = False
+        self.connections = 0
+        self.pushed_txs = 0
+        self.reconnects = 0
+        self.resyncs = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._ws = None
 
-            buyer_addr = next((vout.get("scriptpubkey_address") for vout in vouts if vout.get("scriptpubkey_address")), "")
-            timestamp = tx.get("status", {}).get("block_time", int(time.time()))
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mempool-watcher", daemon=True)
+        self._thread.start()
 
-            image_file = None
-            if os.path.exists(SINGLES_DIR):
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                self._session()
+                backoff = 1
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning(f"[Watcher] Socket error: {e}; polling until reconnect in {backoff}s")
+            finally:
+                self.connected = False
+                self.synced = False
+                self._ws = None
+            if self._stop.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+            self.reconnects += 1
+
+    def _session(self):
+        ws = websocket.create_connection(self.url, timeout=self.PING_SECS)
+        self._ws = ws
+        try:
+            ws.send(json.dumps({"track-address": self.address}))
+            self.connections += 1
+            self.connected = True
+            logger.info(f"[Watcher] Tracking {self.address} via {self.url}")
+            self._resync(self.connections)
+            while not self._stop.is_set():
                 try:
-                    for fname in os.listdir(SINGLES_DIR):
-                        if fname.lower().endswith(".png") and serial in fname:
-                            image_file = fname
-                            break
-                except Exception as e:
-                    logger.warning(f"[Scan] Error scanning SINGLES_DIR: {e}")
-
-            mint_item = {
-                "txid": txid,
-                "serial": serial,
-                "buyerAddr": buyer_addr,
-                "confirmedAt": timestamp,
-                "imageFile": image_file
-            }
-            mints.append(mint_item)
-            seen_set.add(txid)
-            new_mints += 1
-            logger.debug(f"[Scan] Added mint: {serial} for tx {txid}")
+                    raw = ws.recv()
+                except websocket.WebSocketTimeoutException:
+                    ws.send(json.dumps({"action": "ping"}))
+                    continue
+                if not raw:
+                    raise ConnectionError("socket closed by server")
+                self._handle(raw)
+        finally:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    @property
+    def live(self):
+        """True when pushes can be relied on: subscribed, and the mempool scanned since subscribing."""
+        return self.connected and self.synced
+
+    def connection_id(self):
+        """Id of the current subscription (None while disconnected), for mark_synced()."""
+        return self.connections if self.connected else None
+
+    def mark_synced(self, connection_id):
+        """Record a mempool scan that started after subscription `connection_id` was made."""
+        if connection_id is not None and self.connected and connection_id == self.connections:
+            if not self.synced:
+                self.resyncs += 1
+            self.synced = True
+
+    def _resync(self, connection_id):
+        if self.on_connect is None:
+            self.mark_synced(connection_id)
+            return
+        try:
+            if self.on_connect():
+                self.mark_synced(connection_id)
         except Exception as e:
-            logger.error(f"[Scan] Error processing tx {txid}: {e}")
+            logger.error(f"[Watcher] Catch-up scan after subscribing failed: {e}; polling until one succeeds")
 
-    logger.info(f"[Scan] Processed {len(txs)} txs, found {new_mints} new mints")
-    # SAFE sort and write
-    mints = _sanitize_mints_list(mints)
-    mints.sort(key=_safe_confirmed_at, reverse=True)
-    if mints:
-        update_jsonbin(mints)
-    return mints
+    def _handle(self, raw):
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            return
+        if not isinstance(msg, dict):
+            return
+        txs = []
+        for key in ("address-transactions", "block-transactions"):
+            items = msg.get(key)
+            if isinstance(items, list):
+                txs.extend(t for t in items if isinstance(t, dict) and t.get("txid"))
+        if not txs:
+            return
+        self.pushed_txs += len(txs)
+        logger.info(f"[Watcher] {len(txs)} tx(s) pushed for {self.address}")
+        try:
+            self.on_txs(txs)
+        except Exception as e:
+            logger.error(f"[Watcher] Error processing pushed txs: {e}")
+
+    def stats(self):
+        return {"connected": self.connected, "synced": self.synced, "pushed_txs": self.pushed_txs,
+                "reconnects": self.reconnects, "resyncs": self.resyncs}
+
+def _watcher_catch_up():
+    """Mempool scan right after the watcher (re)subscribes; False leaves it to update_mints_job."""
+    if not (scanner_lease.held and _caught_up):
+        return False  # not past the startup chain scan yet
+    logger.info("[Watcher] Subscribed; scanning the mempool for txs missed while disconnected")
+    scan_transactions(initial=False)
+    return True
+
+mempool_watcher = MempoolWatcher(MEMPOOL_WS, BITCOIN_ADDRESS, lambda txs: scan_transactions(txs=txs),
+                                 on_connect=_watcher_catch_up)
 
 # ---------------------------
 # Scheduler
 # ---------------------------
+class ScannerLease:
+    """Leader election over the shared mint store: one process at a time holds the scanner lease.
+
+    Every scheduling process calls renew() every ttl/3 seconds; a lease not
+    renewed for `ttl` seconds (holder killed or hung) is taken over by the
+    next process that asks. Locally the lease counts as held for only 2/3
+    of the ttl, so a holder that stalls stops scanning before anyone else
+    is allowed to start.
+    """
+
+    def __init__(self, path, name="scanner", ttl=60.0):
+        self.name = name
+        self.ttl = ttl
+        self._token = os.urandom(4).hex()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL, acquired_at REAL NOT NULL)")
+        self._held_until = 0.0
+        self.acquired = 0
+        self.errors = 0
+
+    @property
+    def holder_id(self):
+        # pid is read on every call so workers forked after import (gunicorn --preload) differ
+        return f"{socket.gethostname()}:{os.getpid()}:{self._token}"
+
+    @property
+    def held(self):
+        return time.time() < self._held_until
+
+    def renew(self):
+        """Take the lease if it is free or expired, or extend ours; True while this process holds it."""
+        me = self.holder_id
+        with self._lock:
+            now = time.time()
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute(
+                        "SELECT holder, expires_at, acquired_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+                    mine = row is not None and row[0] == me
+                    ok = row is None or mine or row[1] <= now
+                    if ok:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO leases (name, holder, expires_at, acquired_at) VALUES (?, ?, ?, ?)",
+                            (self.name, me, now + self.ttl, row[2] if mine else now))
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                # Keep what we have: the lease still runs out on its own if this persists
+                self.errors += 1
+                logger.warning(f"[Lease] Could not renew {self.name} lease: {e}")
+                return self.held
+            if ok:
+                if not mine:
+                    self.acquired += 1
+                self._held_until = now + self.ttl * 2 / 3
+            else:
+                self._held_until = 0.0
+            return ok
+
+    def release(self):
+        """Give the lease up now (clean shutdown) instead of letting it expire."""
+        with self._lock:
+            self._held_until = 0.0
+            try:
+                self._conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder_id))
+            except sqlite3.Error as e:
+                logger.warning(f"[Lease] Could not release {self.name} lease: {e}")
+
+    def stats(self):
+        with self._lock:
+            row = self._conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+        return {"name": self.name, "me": self.holder_id, "held": self.held, "holder": row[0] if row else None,
+                "expires_in": round(row[1] - time.time(), 1) if row else None,
+                "acquired": self.acquired, "errors": self.errors}
+
+scanner_lease = ScannerLease(MINT_STORE_FILE, ttl=SCANNER_LEASE_SECS)
+_leading = False
+_caught_up = False
+
+def scanner_lease_job():
+    """Renew the scanner lease and start / stop this process's scanning side on a change of leader."""
+    global _leading, _caught_up
+    held = scanner_lease.renew()
+    if held and not _leading:
+        logger.info(f"[Scheduler] Acquired scanner lease as {scanner_lease.holder_id}; this process scans")
+        # Another process may have scanned since we loaded the checkpoint
+        scan_checkpoint.load()
+        _caught_up = False
+        if MINTS_WATCH_MODE == "websocket" and BITCOIN_ADDRESS:
+            mempool_watcher.start()
+    elif _leading and not held:
+        logger.warning("[Scheduler] Lost scanner lease; scanning stops in this process")
+        mempool_watcher.stop()
+    _leading = held
+
+def relay_store_mints_job():
+    """Turn rows committed by any process (usually the scanning one) into this process's /mints/stream events."""
+    mint_broker.poll()
+
 def update_mints_job():
+    global _caught_up
+    if not scanner_lease.held:
+        logger.debug("[Scheduler] Not holding the scanner lease, skipping")
+        return
     try:
+        if _caught_up and mempool_watcher.live and not scan_checkpoint.retry:
+            logger.debug("[Scheduler] Watcher connected, skipping mempool poll")
+            return
         logger.info("[Scheduler] Running mints update job...")
-        existing_mints = get_jsonbin()
-        if not existing_mints:
-            logger.info("[Scheduler] JSONBin empty, performing initial scan...")
+        if not bootstrap_mint_store():
+            logger.error("[Scheduler] Local store empty and JSONBin unreadable, skipping this run")
+            return
+        have_mints = mint_store.count() > 0
+        if not have_mints and scan_checkpoint.mint_count:
+            logger.warning(f"[Scheduler] Mint store empty but checkpoint recorded {scan_checkpoint.mint_count} mints; "
+                           "resetting checkpoint for a full rescan")
+            scan_checkpoint.reset()
+        if not have_mints or not _caught_up:
+            logger.info("[Scheduler] Performing chain scan from checkpoint...")
             scan_transactions(initial=True)
         else:
             logger.info("[Scheduler] Performing mempool scan...")
+            subscription = mempool_watcher.connection_id()
             scan_transactions(initial=False)
+            # Subscribed before this scan started: from here on the pushes cover everything
+            mempool_watcher.mark_synced(subscription)
+        _caught_up = True
     except Exception as e:
         logger.error(f"[Scheduler] Error in update job: {e}")
 
+if SCANNER_ROLE not in ("auto", "web"):
+    raise ValueError(f"SCANNER_ROLE must be 'auto' or 'web', got {SCANNER_ROLE!r}")
 scheduler = BackgroundScheduler(daemon=True)
-scheduler.add_job(update_mints_job, 'interval', seconds=30, max_instances=1, coalesce=True, misfire_grace_time=10)
+scheduler.add_job(relay_store_mints_job, 'interval', seconds=2, max_instances=1, coalesce=True)
+if SCANNER_ROLE == "auto":
+    scanner_lease_job()
+    atexit.register(scanner_lease.release)
+    scheduler.add_job(scanner_lease_job, 'interval', seconds=max(1, SCANNER_LEASE_SECS / 3), max_instances=1, coalesce=True)
+    scheduler.add_job(update_mints_job, 'interval', seconds=SCAN_INTERVAL_SECS, max_instances=1, coalesce=True, misfire_grace_time=10)
+    scheduler.add_job(sync_jsonbin_job, 'interval', seconds=max(1, JSONBIN_SYNC_DEBOUNCE_SECS), max_instances=1, coalesce=True)
 scheduler.start()
-logger.info("[Scheduler] Started: updating JSONBin every 30s")
+if SCANNER_ROLE == "auto":
+    logger.info(f"[Scheduler] Started: scanning every {SCAN_INTERVAL_SECS:g}s while holding the scanner lease "
+                f"({'held' if _leading else 'held by another process'})")
+else:
+    logger.info("[Scheduler] Started in web role: serving the shared mint store, not scanning")
+
+# ---------------------------
+# /mints query + response cache
+# ---------------------------
+MINTS_MAX_LIMIT = int(os.getenv("MINTS_MAX_LIMIT", "1000"))
+_MINTS_RESPONSE_CACHE_MAX = 512
+
+class MintQueryIndex:
+    """Lookup structures over one MintStore snapshot (sorted newest first)."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.by_serial = {}
+        self.by_buyer = {}
+        self.pos_by_txid = {}
+        # Ascending keys for bisect; the snapshot itself is confirmedAt DESC
+        self.neg_confirmed = []
+        for i, m in enumerate(snapshot):
+            self.by_serial.setdefault(str(m.get("serial") or ""), []).append(i)
+            self.by_buyer.setdefault(str(m.get("buyerAddr") or ""), []).append(i)
+            self.pos_by_txid[m.get("txid")] = i
+            self.neg_confirmed.append(-int(_safe_confirmed_at(m) or 0))
+
+    def select(self, serial=None, buyer=None, since=None, until=None):
+        """Return snapshot positions matching all given filters, in snapshot order."""
+        lo, hi = 0, len(self.snapshot)
+        if until is not None:
+            lo = bisect.bisect_left(self.neg_confirmed, -until)
+        if since is not None:
+            hi = bisect.bisect_right(self.neg_confirmed, -since)
+        candidates = None
+        for idx, key in ((self.by_serial, serial), (self.by_buyer, buyer)):
+            if key is None:
+                continue
+            positions = idx.get(key, [])
+            candidates = positions if candidates is None else sorted(set(candidates) & set(positions))
+        if candidates is None:
+            return range(lo, max(lo, hi))
+        return [i for i in candidates if lo <= i < hi]
+
+class MintsResponseCache:
+    """Serialized /mints responses keyed by (store version, normalized query).
+
+    Entries are dropped wholesale when the store version moves, i.e. only
+    when the scanner commits new mints.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = None
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _sync(self, snapshot, version):
+        if version != self._version or self._index is None or self._index.snapshot is not snapshot:
+            self._version = version
+            self._index = MintQueryIndex(snapshot)
+            self._entries.clear()
+
+    def get(self, key, build):
+        snapshot = mint_store.all()
+        version = mint_store.version
+        with self._lock:
+            self._sync(snapshot, version)
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return hit
+            index = self._index
+        body = build(index).encode("utf-8")
+        entry = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        with self._lock:
+            self.misses += 1
+            if self._version == version:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "version": self._version}
+
+mints_response_cache = MintsResponseCache(_MINTS_RESPONSE_CACHE_MAX)
+
+def _encode_cursor(m):
+    return f"{int(_safe_confirmed_at(m) or 0)}:{m.get('txid')}"
+
+def _int_arg(args, name):
+    v = args.get(name)
+    if v is None or v == "":
+        return None
+    return int(v)
+
+def _build_mints_payload(index, q):
+    positions = index.select(serial=q["serial"], buyer=q["buyerAddr"], since=q["since"], until=q["until"])
+    snapshot = index.snapshot
+    total = len(positions)
+    if q["limit"] is None and q["cursor"] is None and not q["offset"]:
+        return app.json.dumps({"ok": True, "mints": [snapshot[i] for i in positions], "total": total})
+    start = q["offset"] or 0
+    if q["cursor"] is not None:
+        _, _, txid = q["cursor"].partition(":")
+        pos = index.pos_by_txid.get(txid)
+        if pos is None:
+            raise ValueError("unknown cursor")
+        start = bisect.bisect_right(positions, pos) if isinstance(positions, list) else max(pos + 1 - positions.start, 0)
+    limit = min(q["limit"] or MINTS_MAX_LIMIT, MINTS_MAX_LIMIT)
+    page = [snapshot[i] for i in positions[start:start + limit]]
+    next_cursor = _encode_cursor(page[-1]) if page and start + limit < total else None
+    return app.json.dumps({"ok": True, "mints": page, "total": total, "offset": start, "limit": limit,
+                           "nextCursor": next_cursor})
+
+# ---------------------------
+# /history rendering
+# ---------------------------
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "100"))
+_MINT_FRAGMENT_CACHE_MAX = 50000
+
+@app.template_filter("datetimeformat")
+def datetimeformat(value, fmt="%Y-%m-%d %H:%M:%S UTC"):
+    """Unix seconds -> UTC string; unconfirmed (0/None) mints show as pending."""
+    try:
+        ts = int(value or 0)
+    except (TypeError, ValueError):
+        return str(value)
+    if ts <= 0:
+        return "pending"
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(fmt)
+
+def _truncate_addr(addr, head=6, tail=4):
+    addr = addr or ""
+    return addr if len(addr) <= head + tail + 1 else f"{addr[:head]}…{addr[-tail:]}"
+
+class MintFragmentCache:
+    """Rendered _mint_row.html per txid.
+
+    A row is rendered once and reused until its mint fields or the sprite
+    atlas change, so after a scan commit only the new mints are rendered and
+    a history page costs O(page size) regardless of collection size.
+    """
+
+    TEMPLATE = "_mint_row.html"
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, mints):
+        atlas_version = atlas_manifest.version
+        out = []
+        template = None
+        for m in mints:
+            txid = m.get("txid")
+            sig = (atlas_version,) + tuple(m.get(k) for k in MintStore.FIELDS) + (m.get("rarity") and m["rarity"].get("rank"),)
+            with self._lock:
+                hit = self._entries.get(txid)
+                if hit is not None and hit[0] == sig:
+                    self._entries.move_to_end(txid)
+                    self.hits += 1
+                    out.append(hit[1])
+                    continue
+            if template is None:
+                template = app.jinja_env.get_template(self.TEMPLATE)
+            html = Markup(template.render(mint=dict(m, buyerAddrTruncated=_truncate_addr(m.get("buyerAddr")))))
+            with self._lock:
+                self.misses += 1
+                self._entries[txid] = (sig, html)
+                self._entries.move_to_end(txid)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            out.append(html)
+        return out
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+mint_fragments = MintFragmentCache(_MINT_FRAGMENT_CACHE_MAX)
+
+# ---------------------------
+# /metrics gauges (read at scrape time)
+# ---------------------------
+def _content_host_gauge(field):
+    def read():
+        hosts = content_hosts.stats()["hosts"]
+        return [({"host": base}, h[field]) for base, h in hosts.items()]
+    return read
+
+metrics.gauge("mints_store_mints", mint_store.count, "Mints in the local store")
+metrics.gauge("mints_checkpoint_block_height", lambda: scan_checkpoint.block_height, "Scan checkpoint block height")
+metrics.gauge("mints_inscription_cache_bytes", lambda: [({"tier": "mem"}, inscription_cache.stats()["mem_bytes"]),
+                                                       ({"tier": "disk"}, inscription_cache.stats()["disk_bytes"])])
+metrics.gauge("mints_content_host_latency_ms", _content_host_gauge("ewma_latency_ms"), "EWMA latency per content host")
+metrics.gauge("mints_content_host_error_rate", _content_host_gauge("error_rate"), "EWMA error rate per content host")
+metrics.gauge("mints_content_host_open", lambda: [({"host": base}, 1 if h["state"] == "open" else 0)
+                                                  for base, h in content_hosts.stats()["hosts"].items()],
+              "1 while a content host's circuit is open")
+metrics.gauge("mints_stream_subscribers", lambda: mint_broker.subscribers, "Connected /mints/stream clients")
+metrics.gauge("mints_scanner_leader", lambda: 1 if scanner_lease.held else 0, "1 in the process holding the scanner lease")
+metrics.gauge("mints_watcher_connected", lambda: 1 if mempool_watcher.connected else 0, "Mempool websocket connected")
 
 # ---------------------------
 # Routes
 # ---------------------------
 @app.route('/mints')
 def mints():
+    """All mints, newest first.
+
+    Optional query args: `limit` with `offset` or `cursor` (the `nextCursor`
+    of the previous page), and filters `serial`, `buyerAddr`, `since` / `until`
+    (inclusive confirmedAt bounds, unix seconds). Responses carry a strong
+    ETag and honour If-None-Match.
+    """
     try:
-        m = get_jsonbin()
-        return jsonify({"ok": True, "mints": m, "total": len(m)})
+        args = request.args
+        q = {
+            "serial": args.get("serial") or None,
+            "buyerAddr": args.get("buyerAddr") or None,
+            "since": _int_arg(args, "since"),
+            "until": _int_arg(args, "until"),
+            "limit": _int_arg(args, "limit"),
+            "offset": _int_arg(args, "offset"),
+            "cursor": args.get("cursor") or None,
+        }
+        if (q["limit"] is not None and q["limit"] < 1) or (q["offset"] or 0) < 0:
+            raise ValueError("limit must be >= 1 and offset >= 0")
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"bad query: {e}"}), 400
+    try:
+        key = tuple(sorted(q.items()))
+        body, etag = mints_response_cache.get(key, lambda index: _build_mints_payload(index, q))
+        if etag in (h.strip() for h in request.headers.get("If-None-Match", "").split(",")):
+            return Response(status=304, headers={"ETag": etag})
+        return Response(body, mimetype="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"bad query: {e}"}), 400
     except Exception as e:
         logger.error(f"[Mints] Error serving mints: {e}")
         return jsonify({"ok": False, "error": str(e)}), 500
 
+_minted_bits_cache = {"version": None, "bits": 0, "by_image": {}}
+
+def _minted_trait_bits(index):
+    """Bitset of minted cats (by imageFile) plus imageFile -> mints, cached per store version."""
+    version = mint_store.version
+    cached = _minted_bits_cache
+    if cached["version"] != version:
+        by_image = {}
+        for m in mint_store.all():
+            if m.get("imageFile"):
+                by_image.setdefault(m["imageFile"], []).append(m)
+        _minted_bits_cache.update(version=version, bits=index.bits_for_names(by_image), by_image=by_image)
+    return _minted_bits_cache["bits"], _minted_bits_cache["by_image"]
+
+@app.route('/mints/stream')
+def mints_stream():
+    """Server-Sent Events: one `mint` event per newly committed mint.
+
+    Event ids come from the shared store, so the Last-Event-ID header (or
+    ?lastEventId=) resumes on any worker. When that isn't possible a `reset`
+    event tells the client to reload /mints before following the stream.
+
+    Each open stream holds a worker thread for as long as the client stays
+    connected, so serve this with gthread (threads >= expected viewers) or
+    gevent workers; a sync worker is tied up by a single viewer. Clients
+    that can't rely on that should use /mints/poll.
+    """
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    mint_broker.poll()  # another worker may have relayed the client's last id already
+    start = mint_broker.parse_id(last_id) if last_id else mint_broker.head
+    reset = last_id is not None and start is None
+    if start is None:
+        start = mint_broker.head
+
+    def stream():
+        with mint_broker.subscription():
+            yield "retry: 5000\n\n"
+            cursor = start
+            gap, events = mint_broker.since(cursor)
+            if reset or gap:
+                yield f"id: {mint_broker.event_id(mint_broker.head)}\nevent: reset\ndata: {{}}\n\n"
+                cursor, events = mint_broker.head, []
+            while True:
+                for event_cursor, data in events:
+                    yield f"id: {mint_broker.event_id(event_cursor)}\nevent: mint\ndata: {data}\n\n"
+                    cursor = event_cursor
+                gap, events = mint_broker.wait(cursor, MINT_EVENTS_KEEPALIVE_SECS)
+                if gap:
+                    # Fell behind the replay buffer while sending
+                    yield f"id: {mint_broker.event_id(mint_broker.head)}\nevent: reset\ndata: {{}}\n\n"
+                    cursor, events = mint_broker.head, []
+                elif not events:
+                    yield ": keepalive\n\n"
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/mints/poll')
+def mints_poll():
+    """Long-poll variant of /mints/stream for deployments without gthread/gevent workers.
+
+    `after` is the last event id seen (omit it to start from now); the
+    request returns as soon as there are events, or after `timeout`
+    seconds (capped at MINT_LONGPOLL_MAX_SECS) with none. Pass the returned
+    `lastEventId` as the next `after`. `reset: true` means the id can't be
+    resumed: reload /mints first.
+    """
+    try:
+        after = request.args.get("after") or None
+        timeout = _int_arg(request.args, "timeout")
+        timeout = MINT_LONGPOLL_MAX_SECS if timeout is None else min(max(timeout, 0), MINT_LONGPOLL_MAX_SECS)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"bad query: {e}"}), 400
+    mint_broker.poll()
+    cursor = mint_broker.parse_id(after) if after else mint_broker.head
+    if cursor is None:
+        return jsonify({"ok": True, "reset": True, "lastEventId": mint_broker.event_id(mint_broker.head), "events": []})
+    with mint_broker.subscription():
+        gap, events = mint_broker.since(cursor)
+        if not gap and not events and timeout:
+            gap, events = mint_broker.wait(cursor, timeout)
+    if gap:
+        return jsonify({"ok": True, "reset": True, "lastEventId": mint_broker.event_id(mint_broker.head), "events": []})
+    if events:
+        cursor = events[-1][0]
+    return jsonify({"ok": True, "reset": False, "lastEventId": mint_broker.event_id(cursor),
+                    "events": [{"id": mint_broker.event_id(c), "mint": json.loads(data)} for c, data in events]})
+
+@app.route('/traits')
+def traits():
+    """Query cats by trait.
+
+    Each category (background, body, hat, traits, eyes) may be given one or
+    more times (or comma separated); values OR within a category and AND
+    across categories (`mode=any` ORs everything). `minted=1` restricts to
+    minted cats and includes their mint records. Returns matching image
+    files (`limit`/`offset`), the total and per-category facet counts.
+    """
+    try:
+        args = request.args
+        where = {}
+        for cat in TRAIT_CATEGORIES:
+            values = [v.strip() for raw in args.getlist(cat) for v in raw.split(",") if v.strip()]
+            if values:
+                where[cat] = values
+        mode = args.get("mode", "all")
+        if mode not in ("all", "any"):
+            raise ValueError("mode must be 'all' or 'any'")
+        limit = min(_int_arg(args, "limit") or 100, MINTS_MAX_LIMIT)
+        offset = _int_arg(args, "offset") or 0
+        if limit < 1 or offset < 0:
+            raise ValueError("limit must be >= 1 and offset >= 0")
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"bad query: {e}"}), 400
+    try:
+        index = get_trait_index()
+        within = None
+        by_image = None
+        if args.get("minted") in ("1", "true"):
+            within, by_image = _minted_trait_bits(index)
+        bits = index.query(where, mode=mode, within=within)
+        files = index.names_for(bits, offset=offset, limit=limit)
+        payload = {"ok": True, "total": bits.bit_count(), "offset": offset, "limit": limit,
+                   "files": files, "facets": index.facets(bits)}
+        if by_image is not None:
+            payload["mints"] = [m for f in files for m in by_image.get(f, [])]
+        return jsonify(payload)
+    except Exception as e:
+        logger.error(f"[Traits] Error serving traits: {e}")
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+@app.route('/traits/counts')
+def trait_counts():
+    """Collection-wide trait counts per category (rarity)."""
+    try:
+        index = get_trait_index()
+        return jsonify({"ok": True, "total": len(index), "counts": index.counts()})
+    except Exception as e:
+        logger.error(f"[Traits] Error serving trait counts: {e}")
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+@app.route('/atlas/<path:name>')
+def atlas(name):
+    """Sprite atlas sheets (content-hashed names, cached for a year) and their manifest."""
+    if name == ATLAS_MANIFEST:
+        resp = send_from_directory(ATLAS_DIR, name, max_age=0)
+        resp.cache_control.no_cache = True
+        return resp
+    if not (name.startswith("atlas-") and name.endswith(".png")):
+        abort(404)
+    resp = send_from_directory(ATLAS_DIR, name, max_age=ATLAS_MAX_AGE)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+@app.route('/history')
+def history():
+    """Mint history page (newest first), paged with ?limit=&offset= and rendered from cached row fragments."""
+    try:
+        limit = min(_int_arg(request.args, "limit") or HISTORY_PAGE_SIZE, MINTS_MAX_LIMIT)
+        offset = _int_arg(request.args, "offset") or 0
+        if limit < 1 or offset < 0:
+            raise ValueError("limit must be >= 1 and offset >= 0")
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"bad query: {e}"}), 400
+    try:
+        snapshot = mint_store.all()
+        page = snapshot[offset:offset + limit]
+        return render_template("mints_history.html", mints=page, fragments=mint_fragments.render(page),
+                               total=len(snapshot), offset=offset, limit=limit)
+    except Exception as e:
+        logger.error(f"[History] Error rendering history: {e}")
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of the scanner counters, stage timers and gauges."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/metrics/scans')
+def metrics_scans():
+    """The last per-scan summary records, newest first."""
+    return jsonify({"ok": True, "scans": list(reversed(scan_summaries))})
+
 @app.route('/debug')
 def debug():
     try:
-        m = get_jsonbin()
+        m = mint_store.all()
         return jsonify({
             "total_mints": len(m),
             "sample_mint": m[0] if m else None,
-            "jsonbin_status": "updated" if m else "empty"
+            "jsonbin_status": ("updated" if mint_store.stats()["jsonbin_version"] == mint_store.version else "pending") if m else "empty",
+            "mint_store": mint_store.stats(),
+            "singles_index": singles_index.stats(),
+            "atlas": atlas_manifest.stats(),
+            "inscription_cache": inscription_cache.stats(),
+            "content_hosts": content_hosts.stats(),
+            "watcher": mempool_watcher.stats(),
+            "checkpoint": scan_checkpoint.stats(),
+            "scanner_lease": scanner_lease.stats(),
+            "mints_response_cache": mints_response_cache.stats(),
+            "mint_fragments": mint_fragments.stats(),
+            "mint_events": mint_broker.stats(),
+            "last_scan": scan_summaries[-1] if scan_summaries else None
         })
     except Exception as e:
         logger.error(f"[Debug] Error: {e}")
@@ -486,4 +3534,14 @@ if __name__ == '__main__':
     if not BITCOIN_ADDRESS or not BLOCKCHAIR_API_KEY:
         logger.error("Missing BITCOIN_ADDRESS or BLOCKCHAIR_API_KEY environment variables")
         exit(1)
+    if "--scanner" in sys.argv[1:]:
+        # Scanner-only process next to SCANNER_ROLE=web workers (still lease-guarded, so a spare is harmless)
+        if SCANNER_ROLE != "auto":
+            logger.error("--scanner needs SCANNER_ROLE=auto")
+            exit(1)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        exit(0)
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,370 @@
+"""Ordinals envelope parsing from reveal-tx witnesses, plus an offline check.
+
+    python ord_envelope.py                 # check the saved txs and a synthetic reveal
+    python ord_envelope.py --strict        # ... and fail unless a real multi-push PNG reveal is saved
+    python ord_envelope.py --fetch TXID    # save a real reveal tx (needs network)
+    python ord_envelope.py --fetch 6fb976ab49dcec017f1e201e84395983204ae1a7c2abf7ced0a85d692e442799
+                                           # inscription 0: a PNG whose body spans two pushes
+
+mints_scanner reads inscription bodies straight from the reveal tx with
+inscriptions_from_reveal_tx(), so a parsing slip here silently loses
+mints. The check decodes every tx saved in ord_envelope_txs.json and
+compares the txid (double SHA-256 of the non-witness serialization, so the
+expected value is independent of this parser) and each envelope's content
+type and body hash against what was recorded when the tx was fetched; the
+body hash at fetch time is taken from a content host, not from this parser.
+Until at least one real (not synthetic) PNG reveal with a body longer
+than one push is saved, the check warns about it; --strict makes that a
+failure, since it is the case the scanner depends on.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+SAVED_TXS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ord_envelope_txs.json")
+SINGLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "Singles")
+MAX_PUSH = 520  # consensus limit per script element
+
+# ---------------------------
+# Ordinals envelopes (reveal tx witness)
+# ---------------------------
+OP_0 = 0x00
+OP_PUSHDATA1, OP_PUSHDATA2, OP_PUSHDATA4 = 0x4c, 0x4d, 0x4e
+OP_1NEGATE = 0x4f
+OP_1, OP_16 = 0x51, 0x60
+OP_IF, OP_ENDIF = 0x63, 0x68
+_ORD_TAG_CONTENT_TYPE = 1
+_ORD_TAG_CONTENT_ENCODING = 9
+
+def _script_ops(script):
+    """Yield (opcode, push_data_or_None) for a script; stops quietly on truncation."""
+    off, n = 0, len(script)
+    while off < n:
+        op = script[off]
+        off += 1
+        if op == OP_0:
+            yield op, b""
+            continue
+        if op <= 0x4b:
+            size = op
+        elif op == OP_PUSHDATA1:
+            if off + 1 > n:
+                return
+            size = script[off]; off += 1
+        elif op == OP_PUSHDATA2:
+            if off + 2 > n:
+                return
+            size = int.from_bytes(script[off:off+2], "little"); off += 2
+        elif op == OP_PUSHDATA4:
+            if off + 4 > n:
+                return
+            size = int.from_bytes(script[off:off+4], "little"); off += 4
+        elif op == OP_1NEGATE:
+            yield op, b"\x81"
+            continue
+        elif OP_1 <= op <= OP_16:
+            yield op, bytes([op - OP_1 + 1])
+            continue
+        else:
+            yield op, None
+            continue
+        if off + size > n:
+            return
+        yield op, script[off:off+size]
+        off += size
+
+def _tapscript(witness):
+    """Return the tapscript of a script-path spend witness (hex items), or None."""
+    items = [bytes.fromhex(w) for w in (witness or []) if isinstance(w, str)]
+    if len(items) >= 2 and items[-1][:1] == b"\x50":
+        items = items[:-1]  # drop annex
+    if len(items) < 2:
+        return None
+    return items[-2]
+
+def parse_inscription_envelopes(script):
+    """Parse `OP_FALSE OP_IF "ord" ... OP_ENDIF` envelopes from one tapscript.
+
+    Returns a list of dicts with `content_type` (str or None), `content_encoding`
+    (str or None), `body` (all body pushes concatenated) and `fields`
+    (tag -> first value) in script order.
+    """
+    ops = list(_script_ops(script))
+    envelopes = []
+    i = 0
+    while i + 2 < len(ops):
+        if not (ops[i] == (OP_0, b"") and ops[i+1][0] == OP_IF and ops[i+2][1] == b"ord"):
+            i += 1
+            continue
+        i += 3
+        fields = {}
+        body = []
+        in_body = False
+        closed = False
+        while i < len(ops):
+            op, data = ops[i]
+            if op == OP_ENDIF:
+                closed = True
+                i += 1
+                break
+            if data is None:
+                break  # non-push opcode inside an envelope: invalid
+            if in_body:
+                body.append(data)
+                i += 1
+                continue
+            if op == OP_0:
+                in_body = True
+                i += 1
+                continue
+            if i + 1 >= len(ops) or ops[i+1][1] is None or ops[i+1][0] == OP_ENDIF:
+                break
+            tag = int.from_bytes(data, "little") if data else 0
+            fields.setdefault(tag, ops[i+1][1])
+            i += 2
+        if not closed:
+            continue
+        ct = fields.get(_ORD_TAG_CONTENT_TYPE)
+        ce = fields.get(_ORD_TAG_CONTENT_ENCODING)
+        envelopes.append({
+            "content_type": ct.decode("utf-8", "replace") if ct is not None else None,
+            "content_encoding": ce.decode("utf-8", "replace") if ce is not None else None,
+            "body": b"".join(body),
+            "fields": fields,
+        })
+    return envelopes
+
+def inscriptions_from_reveal_tx(tx):
+    """List every envelope in a reveal tx as a dict (`id`, `content_type`, `content_encoding`, `body`).
+
+    Returns None if `tx` lacks witness data. Inscription indices count
+    envelopes across inputs in order, as ord does. `tx` is mempool.space
+    tx JSON or the output of parse_raw_tx.
+    """
+    if not isinstance(tx, dict) or not tx.get("txid"):
+        return None
+    vins = tx.get("vin") or []
+    if not any(v.get("witness") for v in vins if isinstance(v, dict)):
+        return None
+    found = []
+    for vin in vins:
+        script = _tapscript(vin.get("witness") if isinstance(vin, dict) else None)
+        if not script:
+            continue
+        try:
+            envelopes = parse_inscription_envelopes(script)
+        except Exception as e:
+            logger.warning(f"[Envelope] Cannot parse witness in {tx['txid']}: {e}")
+            continue
+        for env in envelopes:
+            found.append({
+                "id": f"{tx['txid']}i{len(found)}",
+                "content_type": env["content_type"],
+                "content_encoding": env["content_encoding"],
+                "body": env["body"],
+            })
+    return found
+
+def _read_varint(raw, off):
+    first = raw[off]
+    if first < 0xfd:
+        return first, off + 1
+    size = {0xfd: 2, 0xfe: 4, 0xff: 8}[first]
+    if off + 1 + size > len(raw):
+        raise ValueError("truncated varint")
+    return int.from_bytes(raw[off+1:off+1+size], "little"), off + 1 + size
+
+def parse_raw_tx(raw_hex):
+    """Decode a raw (segwit) tx hex into the mempool.space-shaped subset used here: txid and vin witnesses."""
+    raw = bytes.fromhex(raw_hex.strip())
+    off = 4
+    segwit = raw[off] == 0 and raw[off+1] != 0
+    if segwit:
+        off += 2
+    body_start = off
+    n_in, off = _read_varint(raw, off)
+    vin = []
+    for _ in range(n_in):
+        prev = raw[off:off+32][::-1].hex()
+        vout = int.from_bytes(raw[off+32:off+36], "little")
+        off += 36
+        slen, off = _read_varint(raw, off)
+        off += slen + 4  # scriptSig + sequence
+        vin.append({"txid": prev, "vout": vout, "witness": []})
+    n_out, off = _read_varint(raw, off)
+    for _ in range(n_out):
+        off += 8
+        slen, off = _read_varint(raw, off)
+        off += slen
+    outputs_end = off
+    if segwit:
+        for v in vin:
+            n_items, off = _read_varint(raw, off)
+            for _ in range(n_items):
+                ilen, off = _read_varint(raw, off)
+                if off + ilen > len(raw):
+                    raise ValueError("truncated witness")
+                v["witness"].append(raw[off:off+ilen].hex())
+                off += ilen
+    locktime = raw[off:off+4]
+    if len(locktime) != 4:
+        raise ValueError("truncated tx")
+    stripped = raw[:4] + raw[body_start:outputs_end] + locktime
+    txid = hashlib.sha256(hashlib.sha256(stripped).digest()).digest()[::-1].hex()
+    return {"txid": txid, "vin": vin}
+
+# ---------------------------
+# Offline check
+# ---------------------------
+def _push(data):
+    if len(data) <= 0x4b:
+        return bytes([len(data)]) + data
+    if len(data) <= 0xff:
+        return bytes([OP_PUSHDATA1, len(data)]) + data
+    return bytes([OP_PUSHDATA2]) + len(data).to_bytes(2, "little") + data
+
+def _varint(n):
+    if n < 0xfd:
+        return bytes([n])
+    if n <= 0xffff:
+        return b"\xfd" + n.to_bytes(2, "little")
+    return b"\xfe" + n.to_bytes(4, "little")
+
+def _envelope(content_type, body):
+    out = bytes([OP_0, OP_IF]) + _push(b"ord") + _push(bytes([_ORD_TAG_CONTENT_TYPE])) + _push(content_type.encode())
+    out += bytes([OP_0])
+    for i in range(0, len(body), MAX_PUSH):
+        out += _push(body[i:i + MAX_PUSH])
+    return out + bytes([OP_ENDIF])
+
+def reveal_witness(inscriptions):
+    """Witness items (signature, tapscript, control block) of a script-path spend carrying `inscriptions`.
+
+    `inscriptions` is [(content_type, body)]; bodies are split into
+    MAX_PUSH-sized pushes as ord does. Returned as bytes; hex them for
+    mempool.space-shaped tx JSON.
+    """
+    tapscript = _push(b"\x02" * 32) + b"\xac" + b"".join(_envelope(ct, body) for ct, body in inscriptions)
+    return [bytes(64), tapscript, b"\xc0" + bytes(32)]
+
+def synthetic_reveal(inscriptions):
+    """(raw hex, txid) of a one-input reveal tx carrying `inscriptions` [(content_type, body)] in its tapscript.
+
+    The txid is hashed from a legacy serialization built here, not from the
+    segwit hex, so it checks parse_raw_tx's witness stripping.
+    """
+    version, locktime = (2).to_bytes(4, "little"), bytes(4)
+    vin = _varint(1) + hashlib.sha256(b"commit").digest() + bytes(4) + _varint(0) + b"\xfd\xff\xff\xff"
+    vout = _varint(1) + (546).to_bytes(8, "little") + _push(b"\x51\x20" + bytes(32))
+    witness = _varint(3) + b"".join(_varint(len(w)) + w for w in reveal_witness(inscriptions))
+    legacy = version + vin + vout + locktime
+    txid = hashlib.sha256(hashlib.sha256(legacy).digest()).digest()[::-1].hex()
+    return (version + b"\x00\x01" + vin + vout + witness + locktime).hex(), txid
+
+def _describe(found):
+    if found is None:
+        return None
+    return [{"id": ins["id"], "content_type": ins["content_type"], "content_encoding": ins["content_encoding"],
+             "body_bytes": len(ins["body"]), "body_sha256": hashlib.sha256(ins["body"]).hexdigest()} for ins in found]
+
+def check_tx(entry):
+    """Problems (list of str) decoding one saved tx against its recorded txid and inscriptions."""
+    try:
+        tx = parse_raw_tx(entry["hex"])
+    except Exception as e:
+        return [f"parse_raw_tx failed: {e}"]
+    problems = []
+    if tx["txid"] != entry["txid"]:
+        problems.append(f"txid {tx['txid']} != {entry['txid']}")
+    got = _describe(inscriptions_from_reveal_tx(tx))
+    if got != entry.get("inscriptions"):
+        problems.append(f"inscriptions {got} != {entry.get('inscriptions')}")
+    return problems
+
+def fetch_tx(txid, mempool, content):
+    """Saved-tx entry for `txid`: raw hex from mempool.space, body hashes from the content host."""
+    r = requests.get(f"{mempool}/tx/{txid}/hex", timeout=30)
+    r.raise_for_status()
+    raw_hex = r.text.strip()
+    found = inscriptions_from_reveal_tx(parse_raw_tx(raw_hex))
+    expected = None
+    if found is not None:
+        expected = []
+        for ins in found:
+            # Body hash from the content host, so the check is not parse_inscription_envelopes grading itself
+            c = requests.get(f"{content}/{ins['id']}", timeout=30, headers={"Accept-Encoding": "identity"})
+            c.raise_for_status()
+            body = c.content if not ins["content_encoding"] else ins["body"]
+            expected.append({"id": ins["id"], "content_type": ins["content_type"],
+                             "content_encoding": ins["content_encoding"], "body_bytes": len(body),
+                             "body_sha256": hashlib.sha256(body).hexdigest()})
+    return {"txid": txid, "hex": raw_hex, "inscriptions": expected}
+
+def _multi_push_png(entry):
+    """True when a saved tx has a PNG inscription whose body needed more than one push."""
+    return any((ins["content_type"] or "").split(";")[0].strip().lower() == "image/png"
+               and (ins.get("body_bytes") or 0) > MAX_PUSH for ins in entry.get("inscriptions") or [])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the envelope parser against saved reveal txs.")
+    parser.add_argument("--saved", default=SAVED_TXS)
+    parser.add_argument("--fetch", metavar="TXID", action="append", default=[], help="download and save a reveal tx")
+    parser.add_argument("--mempool", default=os.getenv("MEMPOOL_API", "https://mempool.space/api"))
+    parser.add_argument("--content", default="https://ordinals.com/content")
+    parser.add_argument("--strict", action="store_true", help="fail unless a real multi-push PNG reveal is saved")
+    args = parser.parse_args(argv)
+
+    with open(args.saved, "r", encoding="utf-8") as f:
+        saved = json.load(f)
+    if args.fetch:
+        known = {e["txid"] for e in saved}
+        for txid in args.fetch:
+            if txid not in known:
+                saved.append(fetch_tx(txid, args.mempool, args.content))
+        with open(args.saved, "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=1)
+            f.write("\n")
+
+    failed = 0
+    for entry in saved:
+        problems = check_tx(entry)
+        failed += bool(problems)
+        n = len(entry.get("inscriptions") or [])
+        print(f"  {entry['txid'][:16]}  {n} inscription(s)  {entry.get('note', '')}  {'FAIL' if problems else 'OK'}")
+        for p in problems:
+            print(f"      {p}")
+
+    if not any(_multi_push_png(e) for e in saved):
+        failed += args.strict
+        print(f"  {'MISSING' if args.strict else 'WARNING'}  no real PNG reveal with a multi-push body is saved; "
+              "add one with --fetch TXID")
+
+    pngs = sorted(f for f in os.listdir(SINGLES_DIR) if f.lower().endswith(".png"))[:2]
+    bodies = []
+    for name in pngs:
+        with open(os.path.join(SINGLES_DIR, name), "rb") as fh:
+            bodies.append(("image/png", fh.read()))
+    bodies.append(("text/plain;charset=utf-8", b"x" * (MAX_PUSH * 2 + 1)))
+    raw_hex, txid = synthetic_reveal(bodies)
+    entry = {"txid": txid, "hex": raw_hex, "inscriptions": [
+        {"id": f"{txid}i{i}", "content_type": ct, "content_encoding": None, "body_bytes": len(b),
+         "body_sha256": hashlib.sha256(b).hexdigest()}
+        for i, (ct, b) in enumerate(bodies)]}
+    problems = check_tx(entry)
+    failed += bool(problems)
+    print(f"  {txid[:16]}  {len(bodies)} inscription(s)  synthetic reveal, bodies of "
+          f"{', '.join(str(len(b)) for _, b in bodies)} bytes  {'FAIL' if problems else 'OK'}")
+    for p in problems:
+        print(f"      {p}")
+    print("PASS" if not failed else "FAIL")
+    return 0 if not failed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+import zlib
+from functools import partial
+from multiprocessing import Pool
+
+from png_chunks import PNG_SIG, TEXT_TYPES, chunk_crc_ok, decode_text_chunk, iter_chunks
+
+SINGLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'Singles')
+
+def audit_file(path, check_idat=True):
+    """Audit one PNG: signature, chunk layout, CRCs, IDAT stream, text chunks and serial key."""
+    name = os.path.basename(path)
+    rec = {"file": name, "size": 0, "ok": False, "chunks": [], "crc_errors": [], "text": {},
+           "serial": None, "serial_matches_name": None, "errors": []}
+    try:
+        with open(path, "rb") as f:
+            rec["size"] = os.fstat(f.fileno()).st_size
+            if not rec["size"]:
+                rec["errors"].append("empty file")
+                return rec
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as e:
+        rec["errors"].append(f"open: {e}")
+        return rec
+    view = memoryview(mm)
+    try:
+        if view[:8] != PNG_SIG:
+            rec["errors"].append("bad signature")
+            return rec
+        inflater = zlib.decompressobj() if check_idat else None
+        end = 8
+        for type_chunk, start, length in iter_chunks(mm):
+            rec["chunks"].append(type_chunk)
+            end = start + length + 4
+            if type_chunk == "IDAT" and not check_idat:
+                continue
+            if type_chunk == "IDAT" and inflater is not None:
+                try:
+                    # memoryview slice: fed to zlib without copying the chunk body
+                    inflater.decompress(view[start:start + length])
+                except zlib.error as e:
+                    # Stop inflating; CRCs of the remaining IDAT chunks are still checked
+                    rec["errors"].append(f"IDAT decode: {e}")
+                    inflater = None
+            if not chunk_crc_ok(mm, start, length):
+                rec["crc_errors"].append(type_chunk)
+            if type_chunk in TEXT_TYPES:
+                decode_text_chunk(type_chunk, view[start:start + length], rec["text"])
+        chunks = rec["chunks"]
+        if not chunks or chunks[0] != "IHDR":
+            rec["errors"].append("first chunk is not IHDR")
+        if "IEND" not in chunks:
+            rec["errors"].append("truncated (no IEND)")
+        elif end < rec["size"]:
+            rec["errors"].append(f"{rec['size'] - end} trailing bytes after IEND")
+        if "IDAT" not in chunks:
+            rec["errors"].append("no IDAT")
+        elif inflater is not None and not inflater.eof:
+            rec["errors"].append("IDAT decode: incomplete zlib stream")
+        for k, v in rec["text"].items():
+            if isinstance(v, str) and v.startswith(("<zTXt", "<iTXt")):
+                rec["errors"].append(f"text {k}: {v}")
+        serial = next((v for k, v in rec["text"].items() if k.lower() == "serial"), None)
+        rec["serial"] = serial
+        if serial is not None:
+            rec["serial_matches_name"] = serial == os.path.splitext(name)[0]
+        rec["ok"] = not rec["errors"] and not rec["crc_errors"] and bool(rec["text"])
+        return rec
+    finally:
+        view.release()
+        mm.close()
+
+def _summarize(results):
+    return {
+        "ok": sum(1 for r in results if r["ok"]),
+        "with_errors": sum(1 for r in results if r["errors"]),
+        "crc_errors": sum(1 for r in results if r["crc_errors"]),
+        "no_text": sum(1 for r in results if not r["text"]),
+        "no_serial": sum(1 for r in results if r["serial"] is None),
+        "serial_mismatch": sum(1 for r in results if r["serial_matches_name"] is False),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit PNG metadata (text chunks, serials, CRCs) in parallel.")
+    parser.add_argument("--dir", default=SINGLES_DIR)
+    parser.add_argument("--out", default="png_audit_report.json", help="JSON report path ('-' for stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--skip-idat", action="store_true", help="do not CRC/inflate IDAT bodies")
+    parser.add_argument("--limit", type=int, default=None, help="audit only the first N files")
+    args = parser.parse_args(argv)
+
+    files = sorted(f for f in os.listdir(args.dir) if f.lower().endswith(".png"))[:args.limit]
+    paths = [os.path.join(args.dir, f) for f in files]
+    worker = partial(audit_file, check_idat=not args.skip_idat)
+    results = []
+    t0 = time.perf_counter()
+    last = 0.0
+    with Pool(max(1, args.workers)) as pool:
+        for rec in pool.imap_unordered(worker, paths, chunksize=64):
+            results.append(rec)
+            now = time.perf_counter()
+            if now - last >= 0.5 or len(results) == len(paths):
+                last = now
+                rate = len(results) / max(now - t0, 1e-9)
+                print(f"\r[audit] {len(results)}/{len(paths)} files  {rate:,.0f} files/s", end="", file=sys.stderr)
+    elapsed = time.perf_counter() - t0
+    print(file=sys.stderr)
+
+    results.sort(key=lambda r: r["file"])
+    report = {
+        "dir": args.dir,
+        "generated_at": int(time.time()),
+        "files": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "files_per_sec": round(len(results) / elapsed, 1) if elapsed else None,
+        "workers": args.workers,
+        "summary": _summarize(results),
+        "results": results,
+    }
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"[audit] {report['summary']} in {elapsed:.2f}s ({report['files_per_sec']} files/s) -> {args.out}",
+          file=sys.stderr)
+    return 0 if report["summary"]["ok"] == len(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
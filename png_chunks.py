@@ -0,0 +1,328 @@
+import argparse
+import os
+import struct
+import sys
+import time
+import tracemalloc
+import zlib
+
+PNG_SIG = b'\x89PNG\r\n\x1a\n'
+TEXT_TYPES = ("tEXt", "zTXt", "iTXt")
+_TEXT_TYPES_B = (b"tEXt", b"zTXt", b"iTXt")
+_CHUNK_HEAD = struct.Struct(">I4s")
+
+# Bounds for untrusted input (inscriptions are attacker-controlled)
+MAX_CHUNK_LENGTH = 0x7fffffff  # PNG spec limit
+MAX_CHUNKS = 100_000
+MAX_KEYWORD = 79               # PNG spec limit
+MAX_TEXT_VALUE = 1024 * 1024   # decompressed zTXt/iTXt cap
+
+def iter_chunks(buf, max_chunks=MAX_CHUNKS):
+    """Yield (type, data_offset, length) for each complete chunk after the signature.
+
+    Works on bytes, bytearray, memoryview or mmap without copying: only the
+    8-byte headers are unpacked in place and bodies are addressed by offset
+    (see chunk_crc_ok / decode_text_chunk). Stops at IEND, at the first
+    truncated or malformed chunk, or after `max_chunks`, so the work done is
+    bounded by the buffer size whatever the input.
+    """
+    off = 8
+    n = len(buf)
+    count = 0
+    while off + 8 <= n and count < max_chunks:
+        length, ctype = _CHUNK_HEAD.unpack_from(buf, off)
+        if length > MAX_CHUNK_LENGTH or not ctype.isalpha():
+            break
+        type_chunk = ctype.decode("latin1")
+        start = off + 8
+        if start + length > n:
+            break
+        yield type_chunk, start, length
+        count += 1
+        off = start + length + 4  # skip CRC
+        if type_chunk == "IEND":
+            break
+
+def chunk_crc_ok(buf, data_offset, length):
+    """True if the stored CRC matches type + data (computed in place, no copy for memoryview/mmap input)."""
+    end = data_offset + length
+    if end + 4 > len(buf):
+        return False
+    view = memoryview(buf)
+    try:
+        crc = zlib.crc32(view[data_offset - 4:end])
+        return crc == struct.unpack_from(">I", buf, end)[0]
+    finally:
+        view.release()
+
+def png_chunk(type_chunk, data):
+    """Serialize one chunk (length, type, data, CRC); for writers and synthetic test images."""
+    return struct.pack(">I", len(data)) + type_chunk + data + struct.pack(">I", zlib.crc32(type_chunk + data))
+
+def _find_nul(view, start, end):
+    """Index of the first NUL in view[start:end], scanning small windows; -1 if none."""
+    pos = start
+    while pos < end:
+        stop = min(end, pos + 256)
+        i = bytes(view[pos:stop]).find(b'\x00')
+        if i >= 0:
+            return pos + i
+        pos = stop
+    return -1
+
+def _inflate(data):
+    d = zlib.decompressobj()
+    out = d.decompress(data, MAX_TEXT_VALUE)
+    if d.unconsumed_tail:
+        raise ValueError(f"decompressed text exceeds {MAX_TEXT_VALUE} bytes")
+    return out
+
+def _decode_value(type_chunk, v, pos, end):
+    """Value of a text chunk whose keyword ended at `pos` - 1; `v` is bytes or a memoryview."""
+    if type_chunk == "tEXt":
+        return str(v[pos:end], "latin1")
+    if type_chunk == "zTXt":
+        if pos >= end or v[pos] != 0:
+            return None
+        try:
+            return _inflate(v[pos + 1:end]).decode("utf-8")
+        except Exception as e:
+            return f"<zTXt decompress error: {e}>"
+    # iTXt: comp_flag comp_method lang \0 translated_keyword \0 text
+    if pos + 2 > end:
+        return None
+    comp_flag = v[pos]
+    lang_end = v.find(b'\x00', pos + 2, end) if isinstance(v, bytes) else _find_nul(v, pos + 2, end)
+    if lang_end < 0:
+        return None
+    trans_end = v.find(b'\x00', lang_end + 1, end) if isinstance(v, bytes) else _find_nul(v, lang_end + 1, end)
+    if trans_end < 0:
+        return None
+    payload = v[trans_end + 1:end]
+    try:
+        return _inflate(payload).decode("utf-8") if comp_flag == 1 else str(payload, "utf-8")
+    except Exception as e:
+        return f"<iTXt error: {e}>"
+
+def _decode_text(type_chunk, buf, start, end, is_bytes):
+    """(keyword, value) of the text chunk body at buf[start:end], or None when it is malformed."""
+    limit = min(end, start + MAX_KEYWORD + 1)
+    zero = buf.find(b'\x00', start, limit) if is_bytes else _find_nul(buf, start, limit)
+    if zero < 0:
+        return None
+    value = _decode_value(type_chunk, buf, zero + 1, end)
+    return None if value is None else (str(buf[start:zero], "latin1"), value)
+
+def decode_text_chunk(type_chunk, data, text):
+    """Decode one tEXt/zTXt/iTXt chunk body (bytes or memoryview) into `text`; other types are ignored."""
+    if type_chunk not in TEXT_TYPES:
+        return
+    entry = _decode_text(type_chunk, data, 0, len(data), isinstance(data, bytes))
+    if entry is not None:
+        text[entry[0]] = entry[1]
+
+def parse_png_text(buf):
+    """{"ok": bool, "text": {key: value}} from the text chunks of a PNG buffer.
+
+    A plain loop over the chunk headers (no generator, no TextChunk objects):
+    this runs once per inscription, most of them a few hundred bytes. On
+    bytes input only text chunk bodies are searched; IDAT is skipped by
+    offset. Bounds are the same as iter_chunks.
+    """
+    is_bytes = isinstance(buf, bytes)
+    if not is_bytes:
+        buf = memoryview(buf)
+    if buf[:8] != PNG_SIG:
+        return {"ok": False, "text": None}
+    text = {}
+    unpack = _CHUNK_HEAD.unpack_from
+    off = 8
+    n = len(buf)
+    count = 0
+    while off + 8 <= n and count < MAX_CHUNKS:
+        length, ctype = unpack(buf, off)
+        if length > MAX_CHUNK_LENGTH or not ctype.isalpha():
+            break
+        start = off + 8
+        end = start + length
+        if end > n:
+            break
+        if ctype in _TEXT_TYPES_B:
+            entry = _decode_text(ctype.decode("latin1"), buf, start, end, is_bytes)
+            if entry is not None:
+                text[entry[0]] = entry[1]
+        elif ctype == b"IEND":
+            break
+        count += 1
+        off = end + 4
+    return {"ok": bool(text), "text": text}
+
+# ---------------------------
+# Micro-benchmark
+# ---------------------------
+# What this module replaced, for comparison: parse_png_text from the original mints_scanner.py
+# and parse_chunks from the original static/Singles/aaaaa.py, both kept verbatim
+def _orig_parse_png_text(buf):
+    if not buf.startswith(PNG_SIG):
+        return {"ok": False, "text": None}
+    text = {}
+    off = 8
+    while off + 8 <= len(buf):
+        len_chunk = int.from_bytes(buf[off:off+4], "big")
+        off += 4
+        type_chunk = buf[off:off+4].decode("latin1")
+        off += 4
+        if off + len_chunk > len(buf):
+            break
+        data = buf[off:off+len_chunk]
+        off += len_chunk
+        off += 4  # Skip CRC
+
+        if type_chunk == "tEXt":
+            zero = data.find(b'\x00')
+            if zero >= 0:
+                k = data[:zero].decode("latin1")
+                v = data[zero+1:].decode("latin1")
+                text[k] = v
+        elif type_chunk == "zTXt":
+            zero = data.find(b'\x00')
+            if zero >= 0:
+                k = data[:zero].decode("latin1")
+                comp_method = data[zero+1]
+                comp_data = data[zero+2:]
+                if comp_method == 0:
+                    try:
+                        v = zlib.decompress(comp_data).decode("utf-8")
+                        text[k] = v
+                    except Exception as e:
+                        text[k] = f"<zTXt decompress error: {e}>"
+        elif type_chunk == "iTXt":
+            parts = data.split(b'\x00', 5)
+            if len(parts) >= 5:
+                k, comp_flag, comp_method, _, _, payload = parts[:5]
+                try:
+                    v = zlib.decompress(payload).decode("utf-8") if comp_flag == b'\x01' else payload.decode("utf-8")
+                    text[k.decode("latin1")] = v
+                except Exception as e:
+                    text[k.decode("latin1")] = f"<iTXt error: {e}>"
+
+        if type_chunk == "IEND":
+            break
+    return {"ok": bool(text), "text": text}
+
+def _orig_read_uint32(b, off):
+    return (b[off] << 24) | (b[off+1] << 16) | (b[off+2] << 8) | b[off+3]
+
+def _orig_parse_chunks(data: bytes):
+    """Return (chunk_types, text_map)"""
+    chunks = []
+    text_map = {}
+    if not (len(data) >= 8 and data[:8] == PNG_SIG):
+        return chunks, text_map
+
+    off = 8
+    n = len(data)
+    while off + 12 <= n:
+        ln = _orig_read_uint32(data, off); off += 4
+        ctype = bytes(data[off:off+4]); off += 4
+        start = off
+        end = off + ln
+        if end > n: break
+        chunk_type = ctype.decode("latin-1", errors="replace")
+        chunk_data = data[start:end]
+        off = end + 4  # skip CRC
+        chunks.append(chunk_type)
+
+        if chunk_type == "tEXt":
+            try:
+                null = chunk_data.index(0)
+                k = chunk_data[:null].decode("latin-1", errors="replace")
+                v = chunk_data[null+1:].decode("latin-1", errors="replace")
+                text_map[k] = v
+            except Exception:
+                pass
+        elif chunk_type == "zTXt":
+            try:
+                null = chunk_data.index(0)
+                k = chunk_data[:null].decode("latin-1", errors="replace")
+                compd = chunk_data[null+2:]
+                v = zlib.decompress(compd).decode("latin-1", errors="replace")
+                text_map[k] = v
+            except Exception:
+                pass
+        elif chunk_type == "iTXt":
+            parts = chunk_data.split(b"\x00", 5)
+            if len(parts) == 6:
+                k, comp_flag, comp_method, lang, trans, txt = parts
+                try:
+                    if comp_flag == b"\x01":
+                        v = zlib.decompress(txt).decode("utf-8", errors="replace")
+                    else:
+                        v = txt.decode("utf-8", errors="replace")
+                    text_map[k.decode("latin-1", errors="replace")] = v
+                except Exception:
+                    pass
+
+        if chunk_type == "IEND":
+            break
+
+    return chunks, text_map
+
+def _chunks_and_text(buf):
+    # parse_chunks' output (chunk types, text map) through iter_chunks + decode_text_chunk, as aaaaa.py now does
+    # Only text chunk bodies are sliced (a few dozen bytes); IDAT is skipped by offset
+    chunks, text = [], {}
+    if buf[:8] != PNG_SIG:
+        return chunks, text
+    for type_chunk, start, length in iter_chunks(buf):
+        chunks.append(type_chunk)
+        if type_chunk in TEXT_TYPES:
+            decode_text_chunk(type_chunk, buf[start:start + length], text)
+    return chunks, text
+
+def _bench(label, fn, bufs, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for b in bufs:
+            fn(b)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    for b in bufs:
+        fn(b)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<28} {best / len(bufs) * 1e6:9.2f} us/file   peak alloc {peak / 1024:9.1f} KiB")
+
+def main(argv=None):
+    singles = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'Singles')
+    parser = argparse.ArgumentParser(description="Micro-benchmark the chunk parser against the code it replaced.")
+    parser.add_argument("--dir", default=singles)
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--idat-bytes", type=int, default=1024 * 1024, help="IDAT size for the synthetic large PNG")
+    args = parser.parse_args(argv)
+
+    files = sorted(f for f in os.listdir(args.dir) if f.lower().endswith(".png"))[:args.limit]
+    bufs = []
+    for f in files:
+        with open(os.path.join(args.dir, f), "rb") as fh:
+            bufs.append(fh.read())
+    big = (PNG_SIG + png_chunk(b"IHDR", b"\x00" * 13) + png_chunk(b"tEXt", b"serial\x00ABCDEFGHIJKLMNO")
+           + png_chunk(b"IDAT", os.urandom(args.idat_bytes)) + png_chunk(b"IEND", b""))
+
+    mismatches = sum(1 for b in bufs + [big] if parse_png_text(b) != _orig_parse_png_text(b))
+    mismatches += sum(1 for b in bufs + [big] if _chunks_and_text(b) != _orig_parse_chunks(b))
+    print(f"Singles: {len(bufs)} files, avg {sum(map(len, bufs)) / max(len(bufs), 1):.0f} bytes, "
+          f"{mismatches} result mismatches")
+    for label, sample in (("Singles", bufs), (f"1 file with a {args.idat_bytes}-byte IDAT", [big] * 20)):
+        print(f"{label}:")
+        _bench("original parse_png_text", _orig_parse_png_text, sample, args.repeat)
+        _bench("parse_png_text", parse_png_text, sample, args.repeat)
+        _bench("original aaaaa.parse_chunks", _orig_parse_chunks, sample, args.repeat)
+        _bench("iter_chunks + decode", _chunks_and_text, sample, args.repeat)
+    return 0 if not mismatches else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
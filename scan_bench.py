@@ -0,0 +1,575 @@
+"""End-to-end scan benchmark on a local fake upstream or on recorded fixtures.
+
+    python scan_bench.py --txs 300 --latency-ms 40                  # fake upstream
+    python scan_bench.py --rate-429 0.05 --error-rate 0.02          # with fault injection
+    python scan_bench.py --initial --rate-429 0.05                  # chain catch-up: Blockchair + JSONBin too
+    python scan_bench.py --initial --txs 2000 --prefetch 1,3 --page-latency-ms 400   # Blockchair paging
+    python scan_bench.py --workers 4,8,16                           # compare pipeline widths
+    python scan_bench.py --engines threads,async                    # compare SCAN_ENGINE values
+    python scan_bench.py --record fixtures/                         # capture the fake run
+    python scan_bench.py --replay fixtures/                         # offline, no server
+    python scan_bench.py --live --record fixtures/                  # capture real upstreams
+    python scan_bench.py --live --replay fixtures/ --replay-speed 1 # replay them at recorded latency
+
+In fake mode every run scans the same synthetic commit txs, handed in as
+pushed txs. With --initial they are instead listed by the fake Blockchair
+(dashboards/address and outputs, paged) and the run does what the
+scheduler does on an empty store: bootstrap from the fake JSONBin, chain
+scan, then one JSONBin sync (segment POSTs + manifest PUT). Reveal txs
+carry the PNG in their witness; a share of them (--probe-ratio) come back
+without witness data so the content-host fallback is exercised too.
+Injected 429s (with Retry-After) and 503s hit every route. Live mode runs
+scan_transactions() itself (mempool, or the chain with --initial) and
+needs the usual BITCOIN_ADDRESS / BLOCKCHAIR_API_KEY environment.
+
+Each --engines x --workers x --prefetch (BLOCKCHAIR_PREFETCH) combination
+runs in its own process with a fresh CACHE_DIR, so caches never
+carry over between runs. Reported: mints/s, HTTP calls per mint (as seen by
+the session or the async engine's client, and as served upstream including
+retries) and p50/p99 latency
+of each scan stage; with --initial also the Blockchair pages fetched and
+when the first tx detail was requested (hydration starts while later
+pages are still in flight).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from ord_envelope import reveal_witness
+from png_chunks import PNG_SIG, png_chunk
+
+SINGLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'Singles')
+FAKE_ADDRESS = "bc1qscanbenchfakeaddress000000000000000000"
+FAKE_HEIGHT = 900000
+
+# ---------------------------
+# Synthetic chain data
+# ---------------------------
+def _txid(*parts):
+    return hashlib.sha256(":".join(parts).encode()).hexdigest()
+
+def make_png(serial):
+    ihdr = struct.pack(">IIBBBBB", 1, 1, 8, 6, 0, 0, 0)
+    return (PNG_SIG + png_chunk(b"IHDR", ihdr) + png_chunk(b"tEXt", b"Serial\x00" + serial.encode())
+            + png_chunk(b"IDAT", zlib.compress(b"\x00\x00\x00\x00\x00")) + png_chunk(b"IEND", b""))
+
+def envelope_witness(body, content_type="image/png"):
+    """Witness (hex items) for a script-path spend carrying one ord envelope, built by ord_envelope itself."""
+    return [w.hex() for w in reveal_witness([(content_type, body)])]
+
+class FakeChain:
+    """Deterministic commit -> reveal -> PNG data for txids minted by `commit_txs`."""
+
+    def __init__(self, serials, probe_ratio):
+        self.serials = serials
+        self.probe_ratio = probe_ratio
+        self.reveals = {}  # reveal txid -> (serial, has_witness)
+        self.commits = {}  # commit txid -> reveal txid
+        self.commit_txs_by_id = {}
+        self.listing = []  # Blockchair rows of the address, newest first
+        self.mempool = []  # served as the address's unconfirmed txs
+        self._lock = threading.Lock()
+
+    def commit_txs(self, tag, count):
+        rng = random.Random(tag)
+        txs = []
+        with self._lock:
+            for i in range(count):
+                commit = _txid(tag, "commit", str(i))
+                reveal = _txid(tag, "reveal", str(i))
+                self.commits[commit] = reveal
+                self.reveals[reveal] = (rng.choice(self.serials), rng.random() >= self.probe_ratio)
+                tx = {"txid": commit, "vout": [{"scriptpubkey_address": f"bc1qbench{i:032d}"}],
+                      "status": {"confirmed": True, "block_height": FAKE_HEIGHT + i, "block_time": 1760000000 + i}}
+                self.commit_txs_by_id[commit] = tx
+                self.listing.insert(0, {"hash": commit, "block_id": FAKE_HEIGHT + i, "time": datetime.fromtimestamp(
+                    1760000000 + i, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")})
+                txs.append(tx)
+        return txs
+
+    def page(self, limit, offset):
+        with self._lock:
+            return self.listing[offset:offset + limit], len(self.listing)
+
+    def outspends(self, commit):
+        reveal = self.commits.get(commit)
+        return None if reveal is None else [{"spent": True, "txid": reveal, "vin": 0}]
+
+    def tx(self, txid):
+        return self.commit_txs_by_id.get(txid) or self.reveal_tx(txid)
+
+    def reveal_tx(self, reveal):
+        entry = self.reveals.get(reveal)
+        if entry is None:
+            return None
+        serial, has_witness = entry
+        vin = {"txid": "00" * 32, "vout": 0}
+        if has_witness:
+            vin["witness"] = envelope_witness(make_png(serial))
+        return {"txid": reveal, "vin": [vin], "vout": [{"value": 546}], "status": {"confirmed": True}}
+
+    def content(self, inscription_id):
+        m = re.match(r"^([0-9a-f]{64})i(\d+)$", inscription_id)
+        entry = self.reveals.get(m.group(1)) if m else None
+        if entry is None or m.group(2) != "0":
+            return None
+        return make_png(entry[0])
+
+# ---------------------------
+# Fake upstream server
+# ---------------------------
+class FakeUpstream:
+    """ThreadingHTTPServer standing in for every upstream the scanner talks to.
+
+    /api/...      mempool.space: tx, outspends, hex (404), address mempool txs
+    /content/<id> content host
+    /bitcoin/...  Blockchair: dashboards/address/<addr> and outputs, paged by limit/offset
+    /v3/b/...     JSONBin: GET <id>/latest, PUT <id>, POST (create), kept in `bins`
+
+    Every request waits `latency_ms` plus an exponential `jitter_ms` (Blockchair
+    pages `page_latency_ms` more: they are the slow ones upstream); a share
+    `rate_429` is answered 429 with Retry-After and a share `error_rate` 503.
+    Which requests get a fault depends only on (method, path, attempt) and
+    `seed`, so every engine scanning the same txs meets the same faults.
+    """
+
+    def __init__(self, chain, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_429=0.0, retry_after=1,
+                 page_latency_ms=0.0, host="127.0.0.1", port=0, seed=0):
+        self.chain = chain
+        self.latency = latency_ms / 1000.0
+        self.page_latency = page_latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.seed = seed
+        self._attempts = {}  # (method, path) -> requests seen
+        self.requests = 0
+        self.by_route = {}
+        self.injected = {"429": 0, "503": 0}
+        self.bins = {}
+        self._lock = threading.Lock()
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_PUT(self):
+                self._serve("PUT")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def _serve(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                data = self.rfile.read(length) if length else b""
+                route, status, body, ctype = upstream.route(self.path, method, data)
+                extra = {}
+                with upstream._lock:
+                    attempt = upstream._attempts.get((method, self.path), 0)
+                    upstream._attempts[(method, self.path)] = attempt + 1
+                    roll = upstream.fault_roll(method, self.path, attempt)
+                    upstream.requests += 1
+                    upstream.by_route[route] = upstream.by_route.get(route, 0) + 1
+                    if roll < upstream.rate_429:
+                        status, body, ctype = 429, b"rate limited", "text/plain"
+                        extra["Retry-After"] = str(upstream.retry_after)
+                        upstream.injected["429"] += 1
+                    elif roll < upstream.rate_429 + upstream.error_rate:
+                        status, body, ctype = 503, b"unavailable", "text/plain"
+                        upstream.injected["503"] += 1
+                delay = upstream.latency + (random.expovariate(1 / upstream.jitter) if upstream.jitter else 0)
+                if route.startswith("blockchair"):
+                    delay += upstream.page_latency
+                if delay:
+                    time.sleep(delay)
+                self.send_response(status)
+                for k, v in extra.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-upstream", daemon=True)
+
+    def fault_roll(self, method, path, attempt):
+        digest = hashlib.sha256(f"{self.seed} {method} {path} {attempt}".encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def route(self, path, method="GET", data=b""):
+        parts = urlsplit(path)
+        path, query = parts.path, parse_qs(parts.query)
+        if path.startswith("/v3/"):
+            return self._jsonbin(path, method, data)
+        if path.startswith("/bitcoin/"):
+            return self._blockchair(path, query)
+        m = re.match(r"^/api/address/[^/]+/txs/mempool$", path)
+        if m:
+            return "mempool_txs", *self._json(list(self.chain.mempool))
+        m = re.match(r"^/api/tx/([0-9a-f]{64})/outspends$", path)
+        if m:
+            data = self.chain.outspends(m.group(1))
+            return "outspends", *self._json(data)
+        m = re.match(r"^/api/tx/([0-9a-f]{64})/hex$", path)
+        if m:
+            return "tx_hex", 404, b"Transaction not found", "text/plain"
+        m = re.match(r"^/api/tx/([0-9a-f]{64})$", path)
+        if m:
+            return "tx", *self._json(self.chain.tx(m.group(1)))
+        m = re.match(r"^/content/([0-9a-f]{64}i\d+)$", path)
+        if m:
+            png = self.chain.content(m.group(1))
+            if png is None:
+                return "content", 404, b"not found", "text/plain"
+            return "content", 200, png, "image/png"
+        return "other", 404, b"not found", "text/plain"
+
+    def _blockchair(self, path, query):
+        limit = int(query.get("limit", ["100"])[0])
+        offset = int(query.get("offset", ["0"])[0])
+        rows, total = self.chain.page(limit, offset)
+        m = re.match(r"^/bitcoin/dashboards/address/([^/]+)$", path)
+        if m:
+            return "blockchair_dashboards", *self._json({"data": {m.group(1): {
+                "address": {"transaction_count": total}, "transactions": rows}}})
+        if path == "/bitcoin/outputs":
+            return "blockchair_outputs", *self._json({"data": [
+                {"transaction_hash": r["hash"], "block_id": r["block_id"], "time": r["time"]} for r in rows],
+                "context": {"total_rows": total}})
+        return "other", 404, b"not found", "text/plain"
+
+    def _jsonbin(self, path, method, data):
+        m = re.match(r"^/v3/b/([0-9A-Za-z]+)/latest$", path)
+        if m and method == "GET":
+            with self._lock:
+                record = self.bins.get(m.group(1))
+            return "jsonbin_get", *self._json(None if record is None else {"record": record,
+                                                                            "metadata": {"id": m.group(1)}})
+        m = re.match(r"^/v3/b/([0-9A-Za-z]+)$", path)
+        if m and method == "PUT":
+            with self._lock:
+                self.bins[m.group(1)] = json.loads(data)
+            return "jsonbin_put", *self._json({"record": {}, "metadata": {"parentId": m.group(1)}})
+        if path == "/v3/b" and method == "POST":
+            with self._lock:
+                bin_id = f"{len(self.bins) + 1:024x}"
+                self.bins[bin_id] = json.loads(data)
+            return "jsonbin_post", *self._json({"record": {}, "metadata": {"id": bin_id}})
+        return "other", 404, b"not found", "text/plain"
+
+    @staticmethod
+    def _json(data):
+        if data is None:
+            return 404, b"not found", "text/plain"
+        return 200, json.dumps(data).encode(), "application/json"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# ---------------------------
+# Benchmark
+# ---------------------------
+BENCH_TAG = "bench"
+RESULT_PREFIX = "BENCH_RESULT "
+META_FILE = "bench_meta.json"
+
+def _quantile(sorted_ms, q):
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))]
+
+class StageTimer:
+    """Wraps scanner functions (looked up by name at call time) to record per-call latency.
+
+    Like mints_stage_seconds, a stage's latency leaves out the time it spent
+    queued for an upstream slot or token; that time is the upstream_wait row.
+    """
+
+    STAGES = (
+        ("fetch_mempool_txs", "mempool_txs"),
+        ("fetch_chain_txs", "chain_txs"),
+        ("_blockchair_dashboards_page", "bc_page"),
+        ("_blockchair_outputs_page", "bc_page"),
+        ("get_jsonbin", "jsonbin_read"),
+        ("update_jsonbin", "jsonbin_sync"),
+        ("get_outspends", "outspends"),
+        ("fetch_tx_detail_mempool", "tx_detail"),
+        ("fetch_png_text", "content"),
+        ("_serial_from_inscriptions", "inscription"),
+        # SCAN_ENGINE=async
+        ("fetch_mempool_txs_async", "mempool_txs"),
+        ("get_outspends_async", "outspends"),
+        ("fetch_tx_detail_mempool_async", "tx_detail"),
+        ("fetch_png_text_async", "content"),
+        ("_serial_from_inscriptions_async", "inscription"),
+    )
+
+    def __init__(self, module):
+        self.samples = {}
+        self.first = {}  # stage -> perf_counter() of its first call
+        self.t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._waits = module._stage_waits
+        for attr, stage in self.STAGES:
+            setattr(module, attr, self._wrap(getattr(module, attr), stage))
+        waited = module.metrics.waited
+
+        def timed_wait(seconds):
+            with self._lock:
+                self.first.setdefault("upstream_wait", time.perf_counter() - seconds)
+            self._add("upstream_wait", seconds * 1000)
+            waited(seconds)
+        module.metrics.waited = timed_wait
+
+    def _add(self, stage, ms):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(ms)
+
+    def _start(self, stage):
+        t0 = time.perf_counter()
+        with self._lock:
+            self.first.setdefault(stage, t0)
+        waits = [0.0]
+        return t0, waits, self._waits.set(waits)
+
+    def _done(self, stage, t0, waits, token):
+        self._waits.reset(token)
+        outer = self._waits.get()
+        if outer is not None:
+            outer[0] += waits[0]
+        self._add(stage, max(0.0, time.perf_counter() - t0 - waits[0]) * 1000)
+
+    def _wrap(self, fn, stage):
+        if asyncio.iscoroutinefunction(fn):
+            async def timed_async(*args, **kwargs):
+                t0, waits, token = self._start(stage)
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self._done(stage, t0, waits, token)
+            return timed_async
+
+        def timed(*args, **kwargs):
+            t0, waits, token = self._start(stage)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._done(stage, t0, waits, token)
+        return timed
+
+    def summary(self):
+        out = {}
+        for stage, samples in self.samples.items():
+            ms = sorted(samples)
+            out[stage] = {"count": len(ms), "p50_ms": round(_quantile(ms, 0.50), 1),
+                          "p99_ms": round(_quantile(ms, 0.99), 1), "total_ms": round(sum(ms), 1),
+                          "first_ms": round((self.first[stage] - self.t0) * 1000, 1)}
+        return out
+
+def _run_child(args):
+    """Child process: one SCAN_ENGINE:PIPELINE_WORKERS:BLOCKCHAIR_PREFETCH combination, fresh state;
+    prints one RESULT_PREFIX json line."""
+    fixtures_dir = args.record or args.replay
+    engine, workers, prefetch = args.child.split(":")
+    env = {
+        "CACHE_DIR": tempfile.mkdtemp(prefix="scan_bench_"),
+        "MINTS_WATCH_MODE": "poll",
+        "SCAN_ENGINE": engine,
+        "PIPELINE_WORKERS": workers,
+        "BLOCKCHAIR_PREFETCH": prefetch,
+        "MEMPOOL_MAX_CONCURRENCY": str(args.mempool_concurrency),
+        "MEMPOOL_RATE_PER_SEC": str(args.mempool_rate),
+        "HTTP_FIXTURES_MODE": "record" if args.record else "replay" if args.replay else "off",
+        "HTTP_FIXTURES_SPEED": str(args.replay_speed),
+    }
+    if fixtures_dir:
+        env["HTTP_FIXTURES_DIR"] = fixtures_dir
+    upstream = None
+    txs = None
+    expected = None
+    if not args.live:
+        serials = sorted(f[:-4] for f in os.listdir(SINGLES_DIR) if f.endswith(".png"))[:2000] or ["BENCHSERIAL0001"]
+        chain = FakeChain(serials, args.probe_ratio)
+        txs = chain.commit_txs(BENCH_TAG, args.txs)
+        expected = len(txs)
+        if args.replay:
+            with open(os.path.join(args.replay, META_FILE), "r", encoding="utf-8") as f:
+                url = json.load(f)["url"]
+        else:
+            upstream = FakeUpstream(chain, args.latency_ms, args.jitter_ms, args.error_rate, args.rate_429,
+                                    args.retry_after, args.page_latency_ms, seed=args.seed).start()
+            url = upstream.url
+            if args.record:
+                os.makedirs(args.record, exist_ok=True)
+                with open(os.path.join(args.record, META_FILE), "w", encoding="utf-8") as f:
+                    json.dump({"source": "fake", "url": url, "txs": args.txs, "probe_ratio": args.probe_ratio}, f)
+        env.update({"MEMPOOL_API": f"{url}/api", "CONTENT_HOSTS": f"{url}/content"})
+        os.environ.pop("BITCOIN_ADDRESS", None)
+        if args.initial:
+            env.update({"BITCOIN_ADDRESS": FAKE_ADDRESS, "BLOCKCHAIR_API": f"{url}/bitcoin", "JSONBIN_API": f"{url}/v3"})
+            os.environ.pop("BLOCKCHAIR_API_KEY", None)
+            txs = None
+    os.environ.update(env)
+
+    import logging
+    logging.disable(logging.WARNING if not os.getenv("SCAN_BENCH_VERBOSE") else logging.NOTSET)
+    import mints_scanner
+    mints_scanner.scheduler.shutdown(wait=False)
+    # Build the Singles index and rarity table up front so the timed run doesn't pay for them
+    mints_scanner._attach_rarity({"imageFile": mints_scanner.singles_index.lookup("0")})
+
+    timer = StageTimer(mints_scanner)
+    calls = []
+    mints_scanner.session.hooks["response"].append(lambda r, *a, **kw: calls.append(r.status_code))
+    mints_scanner.async_upstream.hooks.append(lambda r: calls.append(r.status_code))
+    fake_initial = args.initial and not args.live
+    if fake_initial and upstream is not None:
+        # An empty replica, as after the first deploy
+        upstream.bins[mints_scanner.JSONBIN_BIN_ID] = {"format": "segments", "count": 0, "segments": []}
+    t0 = timer.t0 = time.perf_counter()
+    if txs is not None:
+        mints_scanner.scan_transactions(txs=txs)
+    elif fake_initial:
+        if not mints_scanner.bootstrap_mint_store():
+            return 1
+        mints_scanner.scan_transactions(initial=True)
+        mints_scanner.update_jsonbin(mints_scanner.mint_store.rows())
+    else:
+        mints_scanner.scan_transactions(initial=args.initial)
+    elapsed = time.perf_counter() - t0
+    mints = mints_scanner.mint_store.count()
+
+    result = {
+        "engine": engine,
+        "workers": int(workers),
+        "prefetch": int(prefetch),
+        "elapsed_s": round(elapsed, 3),
+        "mints": mints,
+        "txs": expected,
+        "mints_per_s": round(mints / elapsed, 1) if elapsed else 0.0,
+        "http_calls": len(calls),
+        "http_calls_per_mint": round(len(calls) / mints, 2) if mints else None,
+        "http_429": calls.count(429),
+        # 429s that paused a host's token bucket; should track the injected 429s for every engine
+        "limiter_pauses": sum(lim.bucket.penalties for lim in mints_scanner._host_limiters.values()),
+        "stages": timer.summary(),
+    }
+    if upstream is not None:
+        result["upstream"] = {"requests": upstream.requests, "injected": upstream.injected, "routes": upstream.by_route}
+        if fake_initial:
+            manifest = upstream.bins.get(mints_scanner.JSONBIN_BIN_ID) or {}
+            result["jsonbin"] = {"manifest_count": manifest.get("count"), "segments": len(manifest.get("segments") or [])}
+        upstream.stop()
+    if mints_scanner.http_fixture_store is not None:
+        result["fixtures"] = mints_scanner.http_fixture_store.stats()
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    return 0
+
+def _print_result(r):
+    upstream = r.get("upstream")
+    served = f"  upstream {upstream['requests']} req (injected {upstream['injected']})" if upstream else ""
+    fixtures = f"  fixtures {r['fixtures']}" if r.get("fixtures") else ""
+    print(f"  {r['engine']:<7} {r['workers']:>2} workers, prefetch {r['prefetch']} {r['elapsed_s']:7.2f}s {r['mints_per_s']:8.1f} mints/s  "
+          f"{r['mints']}{'/' + str(r['txs']) if r['txs'] is not None else ''} mints  "
+          f"{r['http_calls']} http calls ({r['http_calls_per_mint']}/mint, {r['http_429']} x 429, "
+          f"{r['limiter_pauses']} limiter pauses){served}{fixtures}")
+    pages = {k: v for k, v in (upstream or {}).get("routes", {}).items() if k.startswith("blockchair")}
+    if pages:
+        first = r["stages"].get("tx_detail", {}).get("first_ms")
+        print(f"      pages        {sum(pages.values())} Blockchair requests {pages}, first tx detail at {first} ms")
+    if r.get("jsonbin"):
+        print(f"      jsonbin      manifest lists {r['jsonbin']['manifest_count']} mints in {r['jsonbin']['segments']} segments")
+    for stage, st in sorted(r["stages"].items()):
+        print(f"      {stage:<13} n={st['count']:<5} p50 {st['p50_ms']:8.1f} ms   p99 {st['p99_ms']:8.1f} ms")
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    parser = argparse.ArgumentParser(description="End-to-end scan benchmark (fake upstream, live, record/replay).")
+    parser.add_argument("--txs", type=int, default=200, help="commit txs in the fake run")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="added latency per upstream request")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="mean of an extra exponential delay (stragglers)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--seed", type=int, default=0, help="picks which requests get injected faults")
+    parser.add_argument("--probe-ratio", type=float, default=0.2, help="share of reveal txs served without witness")
+    parser.add_argument("--engines", default="threads", help="SCAN_ENGINE; a comma-separated list runs each in turn")
+    parser.add_argument("--workers", default="8", help="PIPELINE_WORKERS; a comma-separated list runs each in turn")
+    parser.add_argument("--prefetch", default="3", help="BLOCKCHAIR_PREFETCH; a comma-separated list runs each in turn")
+    parser.add_argument("--page-latency-ms", type=float, default=0.0, help="extra latency per Blockchair page (fake)")
+    parser.add_argument("--mempool-concurrency", type=int, default=8)
+    parser.add_argument("--mempool-rate", type=float, default=1000.0)
+    parser.add_argument("--live", action="store_true", help="scan the real upstreams (or their fixtures) instead of the fake")
+    parser.add_argument("--initial", action="store_true",
+                        help="chain catch-up scan (Blockchair + JSONBin) instead of pushed txs / mempool")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="DIR", help="record every upstream response into DIR")
+    group.add_argument("--replay", metavar="DIR", help="serve upstream responses from DIR (no network)")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="replay at recorded latency x this (0 = instant)")
+    parser.add_argument("--json", action="store_true", help="print raw result json")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return _run_child(args)
+
+    source = "live upstreams" if args.live else "fake upstream"
+    if args.replay:
+        source = f"fixtures in {args.replay}"
+    elif not args.live:
+        source += (f" ({args.latency_ms:g} ms + {args.jitter_ms:g} ms jitter, {args.rate_429:.0%} 429, "
+                   f"{args.error_rate:.0%} 503, {args.probe_ratio:.0%} without witness)")
+    print(f"Scan benchmark on {source}" + ("" if args.live else f", {args.txs} commit txs"))
+    rc = 0
+    runs = [(e.strip(), w.strip(), p.strip()) for e in args.engines.split(",") if e.strip()
+            for w in args.workers.split(",") if w.strip() for p in args.prefetch.split(",") if p.strip()]
+    for engine, workers, prefetch in runs:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__)] + argv
+                              + ["--child", f"{engine}:{workers}:{prefetch}"], stdout=subprocess.PIPE, text=True)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith(RESULT_PREFIX)]
+        if proc.returncode or not lines:
+            print(f"  {engine:<7} {workers:>2} workers, prefetch {prefetch} failed (exit {proc.returncode})")
+            rc = 1
+            continue
+        result = json.loads(lines[-1][len(RESULT_PREFIX):])
+        if args.json:
+            print(json.dumps(result))
+        _print_result(result)
+        if result["txs"] is not None and result["mints"] != result["txs"]:
+            rc = 1
+        if result.get("jsonbin") and result["jsonbin"]["manifest_count"] != result["mints"]:
+            rc = 1
+    return rc
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from multiprocessing import Pool
+
+from png_chunks import PNG_SIG, iter_chunks, png_chunk
+
+logger = logging.getLogger(__name__)
+
+SINGLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'Singles')
+ATLAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'atlas')
+ATLAS_MANIFEST = "manifest.json"
+ATLAS_URL_PREFIX = "/atlas/"
+TILE_SIZE = 32
+ATLAS_COLUMNS = 32  # 32x32 tiles -> 1024x1024 px, 1024 cats per atlas
+ATLAS_ROWS = 32
+MANIFEST_CHECK_SECS = 5
+
+# ---------------------------
+# Minimal PNG codec (8-bit RGBA / RGB, non-interlaced: what the Singles use)
+# ---------------------------
+def _unfilter(raw, width, height, bpp):
+    stride = width * bpp
+    out = bytearray(stride * height)
+    prev = bytearray(stride)
+    pos = 0
+    for y in range(height):
+        ftype = raw[pos]
+        line = bytearray(raw[pos + 1:pos + 1 + stride])
+        pos += 1 + stride
+        if ftype == 1:
+            for i in range(bpp, stride):
+                line[i] = (line[i] + line[i - bpp]) & 0xff
+        elif ftype == 2:
+            for i in range(stride):
+                line[i] = (line[i] + prev[i]) & 0xff
+        elif ftype == 3:
+            for i in range(stride):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xff
+        elif ftype == 4:
+            for i in range(stride):
+                a = line[i - bpp] if i >= bpp else 0
+                b = prev[i]
+                c = prev[i - bpp] if i >= bpp else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                line[i] = (line[i] + (a if pa <= pb and pa <= pc else b if pb <= pc else c)) & 0xff
+        elif ftype != 0:
+            raise ValueError(f"bad filter type {ftype}")
+        out[y * stride:(y + 1) * stride] = line
+        prev = line
+    return out
+
+def decode_rgba(buf):
+    """(width, height, RGBA bytes) for an 8-bit RGBA/RGB non-interlaced PNG; ValueError otherwise."""
+    if bytes(buf[:8]) != PNG_SIG:
+        raise ValueError("not a PNG")
+    view = memoryview(buf)
+    header = None
+    idat = []
+    for type_chunk, start, length in iter_chunks(view):
+        if type_chunk == "IHDR":
+            header = struct.unpack(">IIBBBBB", view[start:start + 13])
+        elif type_chunk == "IDAT":
+            idat.append(view[start:start + length])
+    if header is None or not idat:
+        raise ValueError("missing IHDR/IDAT")
+    width, height, depth, color, _, _, interlace = header
+    if depth != 8 or color not in (2, 6) or interlace:
+        raise ValueError(f"unsupported PNG (depth={depth}, color={color}, interlace={interlace})")
+    bpp = 4 if color == 6 else 3
+    inflater = zlib.decompressobj()
+    raw = b"".join(inflater.decompress(part) for part in idat)
+    if len(raw) < (width * bpp + 1) * height:
+        raise ValueError("truncated image data")
+    pixels = _unfilter(raw, width, height, bpp)
+    if bpp == 3:
+        rgba = bytearray(width * height * 4)
+        rgba[0::4], rgba[1::4], rgba[2::4] = pixels[0::3], pixels[1::3], pixels[2::3]
+        rgba[3::4] = b"\xff" * (width * height)
+        pixels = rgba
+    return width, height, bytes(pixels)
+
+def encode_rgba(width, height, pixels):
+    """RGBA bytes -> PNG (filter None on every row; the flat-colour pixel art compresses well without it)."""
+    stride = width * 4
+    raw = bytearray()
+    for y in range(height):
+        raw.append(0)
+        raw += pixels[y * stride:(y + 1) * stride]
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return PNG_SIG + png_chunk(b"IHDR", ihdr) + png_chunk(b"IDAT", zlib.compress(bytes(raw), 9)) + png_chunk(b"IEND", b"")
+
+# ---------------------------
+# Builder
+# ---------------------------
+def _load_tile(path):
+    try:
+        with open(path, "rb") as f:
+            width, height, pixels = decode_rgba(f.read())
+    except (OSError, ValueError, zlib.error) as e:
+        return os.path.basename(path), None, str(e)
+    if (width, height) != (TILE_SIZE, TILE_SIZE):
+        return os.path.basename(path), None, f"size {width}x{height}"
+    return os.path.basename(path), pixels, None
+
+def build_atlases(src=SINGLES_DIR, out=ATLAS_DIR, columns=ATLAS_COLUMNS, rows=ATLAS_ROWS, workers=None):
+    """Pack every tile-sized PNG in `src` into atlas sheets under `out` and write the manifest.
+
+    Atlas files are named by content hash so they can be served as immutable;
+    sheets left over from a previous build are removed once the new manifest
+    is in place.
+    """
+    names = sorted(f for f in os.listdir(src) if f.lower().endswith(".png"))
+    per_atlas = columns * rows
+    tiles = {}
+    skipped = {}
+    atlases = []
+    os.makedirs(out, exist_ok=True)
+
+    with Pool(workers or os.cpu_count()) as pool:
+        loaded = pool.imap(_load_tile, (os.path.join(src, n) for n in names), chunksize=64)
+        sheet = None
+        count = 0
+
+        def flush():
+            data = encode_rgba(columns * TILE_SIZE, rows * TILE_SIZE, sheet)
+            name = f"atlas-{len(atlases):03d}-{hashlib.sha1(data).hexdigest()[:10]}.png"
+            with open(os.path.join(out, name), "wb") as f:
+                f.write(data)
+            atlases.append({"file": name, "width": columns * TILE_SIZE, "height": rows * TILE_SIZE,
+                            "count": count, "bytes": len(data)})
+
+        stride = columns * TILE_SIZE * 4
+        for name, pixels, error in loaded:
+            if pixels is None:
+                skipped[name] = error
+                continue
+            if sheet is None:
+                sheet = bytearray(stride * rows * TILE_SIZE)
+                count = 0
+            col, row = count % columns, count // columns
+            base = row * TILE_SIZE * stride + col * TILE_SIZE * 4
+            for y in range(TILE_SIZE):
+                sheet[base + y * stride:base + y * stride + TILE_SIZE * 4] = pixels[y * TILE_SIZE * 4:(y + 1) * TILE_SIZE * 4]
+            tiles[name] = [len(atlases), col * TILE_SIZE, row * TILE_SIZE]
+            count += 1
+            if count == per_atlas:
+                flush()
+                sheet = None
+        if sheet is not None:
+            flush()
+
+    manifest = {"version": 1, "tile": TILE_SIZE, "atlases": atlases, "tiles": tiles, "skipped": skipped}
+    tmp = os.path.join(out, ATLAS_MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp, os.path.join(out, ATLAS_MANIFEST))
+
+    keep = {a["file"] for a in atlases}
+    for f in os.listdir(out):
+        if f.startswith("atlas-") and f.endswith(".png") and f not in keep:
+            os.remove(os.path.join(out, f))
+    return manifest
+
+# ---------------------------
+# Manifest lookup (used by the templates)
+# ---------------------------
+class AtlasManifest:
+    """Filename -> atlas tile lookup; reloads when manifest.json changes on disk."""
+
+    def __init__(self, path=os.path.join(ATLAS_DIR, ATLAS_MANIFEST)):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self._tiles = {}
+        self._atlases = []
+        self._tile = TILE_SIZE
+
+    def _refresh(self):
+        now = time.time()
+        if now - self._checked < MANIFEST_CHECK_SECS:
+            return
+        with self._lock:
+            if now - self._checked < MANIFEST_CHECK_SECS:
+                return
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                self._mtime, self._tiles, self._atlases = None, {}, []
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"[Atlas] Could not read {self.path}: {e}")
+                return
+            self._tiles = manifest.get("tiles", {})
+            self._atlases = manifest.get("atlases", [])
+            self._tile = manifest.get("tile", TILE_SIZE)
+            self._mtime = mtime
+            logger.info(f"[Atlas] Loaded {len(self._tiles)} tiles in {len(self._atlases)} atlases")
+
+    def tile(self, filename):
+        """{"url", "x", "y", "width", "height", "tile"} for a Singles filename, or None."""
+        self._refresh()
+        entry = self._tiles.get(filename) if filename else None
+        if entry is None:
+            return None
+        atlas = self._atlases[entry[0]]
+        return {"url": ATLAS_URL_PREFIX + atlas["file"], "x": entry[1], "y": entry[2],
+                "width": atlas["width"], "height": atlas["height"], "tile": self._tile}
+
+    def style(self, filename, size=TILE_SIZE):
+        """Inline CSS drawing the tile at `size` px, or "" when the file is not in an atlas."""
+        t = self.tile(filename)
+        if t is None:
+            return ""
+        scale = size / t["tile"]
+        return (f"background-image:url({t['url']});background-repeat:no-repeat;"
+                f"background-size:{t['width'] * scale:g}px {t['height'] * scale:g}px;"
+                f"background-position:-{t['x'] * scale:g}px -{t['y'] * scale:g}px;"
+                f"width:{size}px;height:{size}px;image-rendering:pixelated")
+
+    @property
+    def version(self):
+        """mtime of the loaded manifest (None when there is none); changes on every rebuild."""
+        self._refresh()
+        return self._mtime
+
+    def stats(self):
+        self._refresh()
+        return {"tiles": len(self._tiles), "atlases": len(self._atlases), "path": self.path}
+
+atlas_manifest = AtlasManifest()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the 32x32 Singles into sprite atlases + manifest.json.")
+    parser.add_argument("--src", default=SINGLES_DIR)
+    parser.add_argument("--out", default=ATLAS_DIR)
+    parser.add_argument("--columns", type=int, default=ATLAS_COLUMNS)
+    parser.add_argument("--rows", type=int, default=ATLAS_ROWS)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    manifest = build_atlases(args.src, args.out, args.columns, args.rows, args.workers)
+    total = sum(a["bytes"] for a in manifest["atlases"])
+    source = sum(os.path.getsize(os.path.join(args.src, n)) for n in manifest["tiles"])
+    print(f"Packed {len(manifest['tiles'])} tiles into {len(manifest['atlases'])} atlases in "
+          f"{time.perf_counter() - t0:.1f}s: {source} -> {total} bytes ({len(manifest['skipped'])} skipped)")
+    for name, error in sorted(manifest["skipped"].items())[:10]:
+        print(f"  skipped {name}: {error}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
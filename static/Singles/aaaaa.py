@@ -2,16 +2,14 @@
 # Run this in the same folder as your PNGs.
 # It will sample up to 20 PNGs and print their metadata status.
 
-import os, random, zlib
+import os, random, sys
 
-PNG_SIG = b"\x89PNG\r\n\x1a\n"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from png_chunks import PNG_SIG, TEXT_TYPES, decode_text_chunk, iter_chunks
 
 def is_png_signature(data: bytes) -> bool:
     return len(data) >= 8 and data[:8] == PNG_SIG
 
-def read_uint32(b, off):
-    return (b[off] << 24) | (b[off+1] << 16) | (b[off+2] << 8) | b[off+3]
-
 def parse_chunks(data: bytes):
     """Return (chunk_types, text_map)"""
     chunks = []
@@ -19,51 +17,10 @@ def parse_chunks(data: bytes):
     if not is_png_signature(data):
         return chunks, text_map
 
-    off = 8
-    n = len(data)
-    while off + 12 <= n:
-        ln = read_uint32(data, off); off += 4
-        ctype = bytes(data[off:off+4]); off += 4
-        start = off
-        end = off + ln
-        if end > n: break
-        chunk_type = ctype.decode("latin-1", errors="replace")
-        chunk_data = data[start:end]
-        off = end + 4  # skip CRC
+    for chunk_type, start, length in iter_chunks(data):
         chunks.append(chunk_type)
-
-        if chunk_type == "tEXt":
-            try:
-                null = chunk_data.index(0)
-                k = chunk_data[:null].decode("latin-1", errors="replace")
-                v = chunk_data[null+1:].decode("latin-1", errors="replace")
-                text_map[k] = v
-            except Exception:
-                pass
-        elif chunk_type == "zTXt":
-            try:
-                null = chunk_data.index(0)
-                k = chunk_data[:null].decode("latin-1", errors="replace")
-                compd = chunk_data[null+2:]
-                v = zlib.decompress(compd).decode("latin-1", errors="replace")
-                text_map[k] = v
-            except Exception:
-                pass
-        elif chunk_type == "iTXt":
-            parts = chunk_data.split(b"\x00", 5)
-            if len(parts) == 6:
-                k, comp_flag, comp_method, lang, trans, txt = parts
-                try:
-                    if comp_flag == b"\x01":
-                        v = zlib.decompress(txt).decode("utf-8", errors="replace")
-                    else:
-                        v = txt.decode("utf-8", errors="replace")
-                    text_map[k.decode("latin-1", errors="replace")] = v
-                except Exception:
-                    pass
-
-        if chunk_type == "IEND":
-            break
+        if chunk_type in TEXT_TYPES:
+            decode_text_chunk(chunk_type, data[start:start + length], text_map)
 
     return chunks, text_map
 
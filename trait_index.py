@@ -0,0 +1,500 @@
+import argparse
+import array
+import ast
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+SINGLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'Singles')
+CAT_TRAITS_FILE = os.path.join(SINGLES_DIR, 'cat_traits.json')
+TRAIT_MAPPING_SOURCE = os.path.join(SINGLES_DIR, 'zzzzzz.py')
+CAT_TRAITS_PACKED = os.path.join(SINGLES_DIR, 'cat_traits.bin')
+CATEGORIES = ('background', 'body', 'hat', 'traits', 'eyes')
+# Order of the 3-char codes inside a Singles filename
+FILENAME_ORDER = ('background', 'body', 'traits', 'hat', 'eyes')
+CODE_LEN = 3
+
+# ---------------------------
+# Trait mapping (3-char filename codes)
+# ---------------------------
+def load_trait_mapping(path=TRAIT_MAPPING_SOURCE):
+    """Read the `trait_mapping` literal from the trait manager script without importing it (it needs tkinter/PIL)."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "trait_mapping" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"trait_mapping not found in {path}")
+
+def traits_from_code(code, mapping):
+    """Decode a filename stem made of 3-char codes into {category: trait}; None unless every category is covered."""
+    if len(code) % CODE_LEN:
+        return None
+    traits = {}
+    for i in range(0, len(code), CODE_LEN):
+        t = mapping.get(code[i:i+CODE_LEN])
+        if t is None:
+            return None
+        traits[t["folder"]] = t["name"]
+    return traits if len(traits) == len(CATEGORIES) else None
+
+def load_records(path=CAT_TRAITS_FILE, mapping=None):
+    """Return {filename: {category: trait}} from cat_traits.json, filling empty entries from their filename codes."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    records = {}
+    for fname, entry in data.items():
+        traits = (entry or {}).get("traits") or {}
+        if not traits and mapping:
+            traits = traits_from_code(os.path.splitext(fname)[0], mapping) or {}
+        if traits:
+            records[fname] = traits
+    return records
+
+# ---------------------------
+# Packed columnar encoding
+# ---------------------------
+PACKED_MAGIC = b"NKTR"
+PACKED_VERSION = 1
+_PACKED_HEADER = struct.Struct("<4sHHII")  # magic, version, reserved, rows, header json length
+NO_TRAIT = 255
+
+def pack_cat_traits(data, mapping, path=CAT_TRAITS_PACKED):
+    """Write cat_traits.json `data` as one uint8 column per category.
+
+    Each cell is an index into that category's (code, trait) vocabulary, so a
+    cat's filename and traits are both recovered from its row. Entries whose
+    filename does not decode to exactly their stored traits (the handful of
+    one-offs) are kept verbatim in the header's `exceptions`.
+    """
+    names = sorted(data)
+    vocab = {cat: [] for cat in CATEGORIES}
+    slot = {cat: {} for cat in CATEGORIES}
+    for code, t in sorted(mapping.items()):
+        cat = t["folder"]
+        if cat in slot and code not in slot[cat]:
+            slot[cat][code] = len(vocab[cat])
+            vocab[cat].append([code, t["name"]])
+    if any(len(v) >= NO_TRAIT for v in vocab.values()):
+        raise ValueError("too many traits in one category for a uint8 column")
+    columns = {cat: array.array("B", [NO_TRAIT]) * len(names) for cat in CATEGORIES}
+    exceptions = {}
+    for row, fname in enumerate(names):
+        entry = data[fname]
+        stem, ext = os.path.splitext(fname)
+        traits = traits_from_code(stem, mapping)
+        codes = [stem[i:i+CODE_LEN] for i in range(0, len(stem), CODE_LEN)]
+        exact = (traits is not None and ext == ".png" and entry == {"name": stem, "traits": traits}
+                 and [mapping[c]["folder"] for c in codes] == list(FILENAME_ORDER))
+        if not exact:
+            exceptions[str(row)] = {"file": fname, "entry": entry}
+            continue
+        for code in codes:
+            cat = mapping[code]["folder"]
+            columns[cat][row] = slot[cat][code]
+    header = json.dumps({
+        "categories": list(CATEGORIES),
+        "filename_order": list(FILENAME_ORDER),
+        "vocab": vocab,
+        "exceptions": exceptions,
+    }).encode("utf-8")
+    pad = (-(_PACKED_HEADER.size + len(header))) % 8
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, 0, len(names), len(header) + pad))
+        f.write(header + b" " * pad)
+        for cat in CATEGORIES:
+            columns[cat].tofile(f)
+    os.replace(tmp, path)
+    return len(names), len(exceptions)
+
+class PackedTraits:
+    """Read-only view over a packed trait file; columns are memoryviews into an mmap (no copies)."""
+
+    def __init__(self, path=CAT_TRAITS_PACKED):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, rows, header_len = _PACKED_HEADER.unpack_from(self._mm, 0)
+        if magic != PACKED_MAGIC or version != PACKED_VERSION:
+            raise ValueError(f"{path}: not a packed trait file (v{PACKED_VERSION})")
+        start = _PACKED_HEADER.size
+        header = json.loads(bytes(self._mm[start:start + header_len]))
+        self.rows = rows
+        self.categories = tuple(header["categories"])
+        self.filename_order = tuple(header["filename_order"])
+        self.vocab = {cat: [tuple(v) for v in vals] for cat, vals in header["vocab"].items()}
+        self.exceptions = {int(k): v for k, v in header["exceptions"].items()}
+        base = start + header_len
+        view = memoryview(self._mm)
+        self.columns = {cat: view[base + i * rows: base + (i + 1) * rows] for i, cat in enumerate(self.categories)}
+        self._name_parts = [([v[0] for v in self.vocab[cat]], self.columns[cat]) for cat in self.filename_order]
+
+    def __len__(self):
+        return self.rows
+
+    def codes(self, row):
+        """{category: 3-char code} for a row (None for exception rows)."""
+        if row in self.exceptions:
+            return None
+        return {cat: self.vocab[cat][self.columns[cat][row]][0] for cat in self.categories}
+
+    def filename(self, row):
+        exc = self.exceptions.get(row)
+        if exc is not None:
+            return exc["file"]
+        return "".join(codes[col[row]] for codes, col in self._name_parts) + ".png"
+
+    def entry(self, row):
+        """The cat_traits.json entry for a row, reconstructed losslessly."""
+        exc = self.exceptions.get(row)
+        if exc is not None:
+            return exc["entry"]
+        traits = {cat: self.vocab[cat][self.columns[cat][row]][1] for cat in self.filename_order}
+        return {"name": os.path.splitext(self.filename(row))[0], "traits": traits}
+
+    def to_dict(self):
+        return {self.filename(r): self.entry(r) for r in range(self.rows)}
+
+    def records(self):
+        """{filename: {category: trait}} in the shape load_records() returns."""
+        out = {}
+        for r in range(self.rows):
+            traits = self.entry(r).get("traits") or {}
+            if traits:
+                out[self.filename(r)] = traits
+        return out
+
+    def close(self):
+        for col in self.columns.values():
+            col.release()
+        self.columns = {}
+        self._name_parts = []
+        self._mm.close()
+
+def _packed_is_fresh(packed=CAT_TRAITS_PACKED, source=CAT_TRAITS_FILE):
+    try:
+        return os.stat(packed).st_mtime >= os.stat(source).st_mtime
+    except OSError:
+        return False
+
+# ---------------------------
+# Trait index
+# ---------------------------
+def _iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+class TraitIndex:
+    """Per-category inverted indexes over the collection.
+
+    Every cat gets a dense integer ID (filenames sorted); each (category, trait)
+    posting list is a Python int used as a bitset, so AND/OR/popcount run in C
+    over ~20k bits.
+    """
+
+    def __init__(self, records):
+        names = sorted(records)
+        ids = {cat: {} for cat in CATEGORIES}
+        for i, name in enumerate(names):
+            for cat, value in records[name].items():
+                if cat in ids and value:
+                    ids[cat].setdefault(value, []).append(i)
+        self._build(names, ids)
+
+    @classmethod
+    def from_packed(cls, packed):
+        """Build straight from PackedTraits columns (rows are already sorted by filename)."""
+        names = []
+        id_of_row = {}
+        for r in range(len(packed)):
+            exc = packed.exceptions.get(r)
+            if exc is not None and not (exc["entry"] or {}).get("traits"):
+                continue
+            id_of_row[r] = len(names)
+            names.append(packed.filename(r))
+        ids = {cat: {} for cat in CATEGORIES}
+        for cat in CATEGORIES:
+            vocab = packed.vocab.get(cat, [])
+            col = packed.columns.get(cat)
+            if col is None:
+                continue
+            for r, v in enumerate(col):
+                if v != NO_TRAIT:
+                    ids[cat].setdefault(vocab[v][1], []).append(id_of_row[r])
+        for r, exc in packed.exceptions.items():
+            for cat, value in ((exc["entry"] or {}).get("traits") or {}).items():
+                if cat in ids and value and r in id_of_row:
+                    ids[cat].setdefault(value, []).append(id_of_row[r])
+        index = cls.__new__(cls)
+        index._build(names, ids)
+        return index
+
+    def _build(self, names, ids):
+        self.names = names
+        self.id_by_name = {n: i for i, n in enumerate(names)}
+        self.all_bits = (1 << len(names)) - 1
+        self.postings = {cat: {} for cat in CATEGORIES}
+        self._lower = {cat: {} for cat in CATEGORIES}
+        nbytes = (len(names) + 7) // 8
+        for cat, values in ids.items():
+            for value, positions in values.items():
+                bitmap = bytearray(nbytes)
+                for i in positions:
+                    bitmap[i >> 3] |= 1 << (i & 7)
+                self.postings[cat][value] = int.from_bytes(bitmap, "little")
+                self._lower[cat][value.lower()] = value
+
+    def __len__(self):
+        return len(self.names)
+
+    def posting(self, category, value):
+        """Bitset of cats with `category` == `value` (case-insensitive)."""
+        canonical = self._lower.get(category, {}).get(str(value).lower())
+        return self.postings[category].get(canonical, 0) if canonical else 0
+
+    def bits_for_names(self, names):
+        bits = 0
+        for n in names:
+            i = self.id_by_name.get(n)
+            if i is not None:
+                bits |= 1 << i
+        return bits
+
+    def query(self, where=None, mode="all", within=None):
+        """Bitset of cats matching `where` ({category: [values]}).
+
+        Values within a category are OR-ed; categories are AND-ed with
+        mode="all" or OR-ed with mode="any". `within` restricts the result.
+        """
+        where = {c: v for c, v in (where or {}).items() if c in self.postings and v}
+        if not where:
+            bits = self.all_bits
+        else:
+            per_cat = []
+            for cat, values in where.items():
+                b = 0
+                for v in ([values] if isinstance(values, str) else values):
+                    b |= self.posting(cat, v)
+                per_cat.append(b)
+            bits = per_cat[0]
+            for b in per_cat[1:]:
+                bits = bits & b if mode == "all" else bits | b
+        if within is not None:
+            bits &= within
+        return bits
+
+    def names_for(self, bits, offset=0, limit=None):
+        out = []
+        for n, i in enumerate(_iter_bits(bits)):
+            if n < offset:
+                continue
+            if limit is not None and len(out) >= limit:
+                break
+            out.append(self.names[i])
+        return out
+
+    def counts(self):
+        """Collection-wide rarity counts: {category: {trait: count}}."""
+        return {cat: {v: b.bit_count() for v, b in vals.items()} for cat, vals in self.postings.items()}
+
+    def facets(self, bits):
+        """{category: {trait: count}} restricted to `bits` (zero counts omitted)."""
+        out = {}
+        for cat, vals in self.postings.items():
+            counts = {}
+            for v, b in vals.items():
+                c = (b & bits).bit_count()
+                if c:
+                    counts[v] = c
+            out[cat] = counts
+        return out
+
+# ---------------------------
+# Rarity
+# ---------------------------
+def compute_rarity(index):
+    """Score and rank every cat in one pass over the posting bitsets.
+
+    score = sum over categories of N / count(trait), the usual statistical
+    rarity; rank 1 is the rarest, ties share a rank.
+
+    Plain Python rather than a NumPy batch job: the work is one add per set
+    bit (cats x categories, ~100k for 10k cats), which takes about 0.1-0.2 s
+    and runs only when cat_traits changes, so NumPy would be a new
+    dependency for no measurable gain.
+    """
+    n = len(index)
+    scores = array.array("d", bytes(8 * n))
+    frequencies = {}
+    for cat, values in index.postings.items():
+        frequencies[cat] = {}
+        for value, bits in values.items():
+            count = bits.bit_count()
+            frequencies[cat][value] = count
+            weight = n / count
+            for i in _iter_bits(bits):
+                scores[i] += weight
+    order = sorted(range(n), key=lambda i: (-scores[i], index.names[i]))
+    table = {}
+    rank = 0
+    prev = None
+    for pos, i in enumerate(order):
+        score = round(scores[i], 4)
+        if score != prev:
+            rank = pos + 1
+            prev = score
+        table[index.names[i]] = [score, rank]
+    return {"total": n, "frequencies": frequencies, "scores": table, "generated_at": int(time.time())}
+
+def write_rarity_table(path, index=None):
+    table = compute_rarity(index or get_trait_index())
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return table
+
+_rarity = None
+_rarity_lock = threading.Lock()
+
+def get_rarity_table(path):
+    """Rarity table persisted at `path`, (re)built when missing or older than cat_traits.json."""
+    global _rarity
+    if _rarity is None:
+        with _rarity_lock:
+            if _rarity is None:
+                table = None
+                try:
+                    if os.stat(path).st_mtime >= os.stat(CAT_TRAITS_FILE).st_mtime:
+                        with open(path, "r", encoding="utf-8") as f:
+                            table = json.load(f)
+                except (OSError, ValueError):
+                    table = None
+                if table is None:
+                    t0 = time.perf_counter()
+                    table = write_rarity_table(path)
+                    logger.info(f"[Rarity] Built rarity table for {table['total']} cats in "
+                                f"{(time.perf_counter() - t0) * 1000:.0f}ms")
+                _rarity = table
+    return _rarity
+
+def rarity_for(path, filename):
+    """{"score", "rank", "of"} for an image filename, or None if it is not in the table."""
+    table = get_rarity_table(path)
+    hit = table["scores"].get(filename) if filename else None
+    if hit is None:
+        return None
+    return {"score": hit[0], "rank": hit[1], "of": table["total"]}
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_trait_index():
+    """Shared TraitIndex, built on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if _packed_is_fresh():
+                    try:
+                        _index = TraitIndex.from_packed(PackedTraits())
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"[TraitIndex] Ignoring packed traits: {e}")
+                if _index is None:
+                    try:
+                        mapping = load_trait_mapping()
+                    except (OSError, ValueError, SyntaxError) as e:
+                        logger.warning(f"[TraitIndex] No trait mapping ({e}); using cat_traits.json only")
+                        mapping = None
+                    _index = TraitIndex(load_records(mapping=mapping))
+                logger.info(f"[TraitIndex] Indexed {len(_index)} cats")
+    return _index
+
+# ---------------------------
+# CLI: converter + benchmark
+# ---------------------------
+def _rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * (os.sysconf("SC_PAGE_SIZE") // 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _measure(label, fn, repeat):
+    # Time without tracemalloc (it slows allocation down a lot), then trace one run for memory
+    elapsed = min(_timed(fn) for _ in range(repeat))
+    rss0 = _rss_kb()
+    tracemalloc.start()
+    obj = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss1 = _rss_kb()
+    del obj
+    rss = f"{rss1 - rss0}" if rss0 is not None and rss1 is not None else "?"
+    print(f"{label:<28} load {elapsed * 1000:8.2f} ms   retained {current / 1024:9.1f} KiB   "
+          f"peak {peak / 1024:9.1f} KiB   rss +{rss} KiB")
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trait data tools: pack/bench the columnar file, build the rarity table.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_pack = sub.add_parser("pack", help="convert cat_traits.json -> cat_traits.bin")
+    p_pack.add_argument("--src", default=CAT_TRAITS_FILE)
+    p_pack.add_argument("--out", default=CAT_TRAITS_PACKED)
+    p_rarity = sub.add_parser("rarity", help="compute the rarity score / rank table")
+    p_rarity.add_argument("--out", required=True)
+    p_bench = sub.add_parser("bench", help="compare load time / memory of JSON vs packed")
+    p_bench.add_argument("--src", default=CAT_TRAITS_FILE)
+    p_bench.add_argument("--packed", default=CAT_TRAITS_PACKED)
+    p_bench.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "rarity":
+        t0 = time.perf_counter()
+        table = write_rarity_table(args.out)
+        rarest = min(table["scores"].items(), key=lambda kv: kv[1][1])
+        print(f"Scored {table['total']} cats in {(time.perf_counter() - t0) * 1000:.0f} ms -> {args.out} "
+              f"(rank 1: {rarest[0]} score {rarest[1][0]})")
+        return 0
+
+    if args.cmd == "pack":
+        with open(args.src, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rows, exceptions = pack_cat_traits(data, load_trait_mapping(), args.out)
+        packed = PackedTraits(args.out)
+        ok = packed.to_dict() == data
+        packed.close()
+        print(f"Packed {rows} cats ({exceptions} verbatim) into {args.out}: "
+              f"{os.path.getsize(args.src)} -> {os.path.getsize(args.out)} bytes, round-trip {'OK' if ok else 'MISMATCH'}")
+        return 0 if ok else 1
+
+    def load_json():
+        with open(args.src, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    print(f"JSON   {args.src}: {os.path.getsize(args.src)} bytes")
+    print(f"Packed {args.packed}: {os.path.getsize(args.packed)} bytes")
+    _measure("json.load", load_json, args.repeat)
+    _measure("PackedTraits (mmap)", lambda: PackedTraits(args.packed), args.repeat)
+    _measure("PackedTraits.to_dict()", lambda: PackedTraits(args.packed).to_dict(), args.repeat)
+    _measure("TraitIndex from JSON", lambda: TraitIndex(load_records(args.src)), args.repeat)
+    _measure("TraitIndex from packed", lambda: TraitIndex.from_packed(PackedTraits(args.packed)), args.repeat)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""Check the mempool websocket watcher against a stand-in `track-address` server.
+
+    python watcher_check.py                 # push -> scan, drop -> polling, reconnect
+    python watcher_check.py --down 6        # keep the socket down longer
+
+TrackAddressServer speaks just enough RFC 6455 (handshake, masked client
+frames, text/ping/close) to stand in for mempool.space's /api/v1/ws: it
+records `track-address` subscriptions and pushes `address-transactions`
+messages to them. It can drop every connection and refuse new ones
+(HTTP 503) for a while, as an outage would.
+
+The scanner runs in this process with SCANNER_ROLE=auto and
+MINTS_WATCH_MODE=websocket, against the scan_bench fake upstream for
+mempool, Blockchair, JSONBin and content, so the real scheduler jobs,
+lease and watcher wiring are exercised. Pass criteria:
+
+  push      txs pushed over the socket become mints, with no mempool polls
+  drop      while the socket is down, the mempool poll picks up new txs
+  catch-up  txs that enter the mempool after the last poll and before the
+            reconnect are never pushed; with the scheduler paused, the
+            watcher's own mempool scan after resubscribing finds them
+  reconnect the watcher reconnects on its own; pushes are scanned again
+            and polling stops
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from scan_bench import FAKE_ADDRESS, SINGLES_DIR, FakeChain, FakeUpstream
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# ---------------------------
+# Stand-in websocket server
+# ---------------------------
+def _read_exact(sock, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("client closed")
+        buf += chunk
+    return buf
+
+def _read_frame(sock):
+    """(opcode, payload) of one client frame (clients always mask)."""
+    b0, b1 = _read_exact(sock, 2)
+    size = b1 & 0x7f
+    if size == 126:
+        size = struct.unpack(">H", _read_exact(sock, 2))[0]
+    elif size == 127:
+        size = struct.unpack(">Q", _read_exact(sock, 8))[0]
+    mask = _read_exact(sock, 4) if b1 & 0x80 else b"\x00" * 4
+    data = _read_exact(sock, size)
+    return b0 & 0x0f, bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+
+def _frame(opcode, payload):
+    n = len(payload)
+    if n < 126:
+        head = struct.pack(">BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        head = struct.pack(">BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+    return head + payload
+
+class TrackAddressServer:
+    """Minimal websocket server answering `track-address` subscriptions like mempool.space."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.down = False
+        self.connections = {}  # socket -> tracked address (None until subscribed)
+        self.handshakes = 0
+        self.refused = 0
+        self.pings = 0
+        self._lock = threading.Lock()
+        ws = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                ws._serve(self.request)
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"ws://{host}:{self.server.server_address[1]}/api/v1/ws"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="track-address", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.drop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _serve(self, sock):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return
+            request += chunk
+        headers = {}
+        for line in request.split(b"\r\n")[1:]:
+            if b":" in line:
+                k, v = line.split(b":", 1)
+                headers[k.strip().lower().decode()] = v.strip().decode()
+        if self.down or "sec-websocket-key" not in headers:
+            with self._lock:
+                self.refused += 1
+            sock.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            return
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()).decode()
+        sock.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        with self._lock:
+            self.handshakes += 1
+            self.connections[sock] = None
+        try:
+            while True:
+                opcode, payload = _read_frame(sock)
+                if opcode == 0x8:  # close
+                    self._send(sock, 0x8, payload[:2])
+                    return
+                if opcode == 0x9:
+                    self._send(sock, 0xa, payload)
+                    continue
+                if opcode != 0x1:
+                    continue
+                msg = json.loads(payload)
+                if msg.get("action") == "ping":
+                    with self._lock:
+                        self.pings += 1
+                    self._send(sock, 0x1, b'{"pong":true}')
+                elif "track-address" in msg:
+                    with self._lock:
+                        self.connections[sock] = msg["track-address"]
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self.connections.pop(sock, None)
+
+    def _send(self, sock, opcode, payload):
+        sock.sendall(_frame(opcode, payload))
+
+    def subscribers(self, address):
+        with self._lock:
+            return [s for s, a in self.connections.items() if a == address]
+
+    def push(self, address, txs):
+        """Send an `address-transactions` message to every subscriber of `address`; return how many got it."""
+        body = json.dumps({"address-transactions": txs}).encode()
+        sent = 0
+        for sock in self.subscribers(address):
+            try:
+                self._send(sock, 0x1, body)
+                sent += 1
+            except OSError:
+                pass
+        return sent
+
+    def drop(self):
+        """Cut every open connection without a close frame, as a network failure would."""
+        with self._lock:
+            socks = list(self.connections)
+        for sock in socks:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+# ---------------------------
+# Check
+# ---------------------------
+def _wait_for(cond, timeout, step=0.1):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if cond():
+            return True
+        time.sleep(step)
+    return cond()
+
+def _report(label, ok, detail):
+    print(f"  {label:<10} {detail}  {'OK' if ok else 'FAIL'}")
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check push -> scan, polling fallback and reconnect of the mempool watcher.")
+    parser.add_argument("--interval", type=float, default=1.0, help="SCAN_INTERVAL_SECS")
+    parser.add_argument("--down", type=float, default=4.0, help="seconds the socket stays down")
+    parser.add_argument("--txs", type=int, default=5, help="txs per phase")
+    args = parser.parse_args(argv)
+
+    serials = sorted(f[:-4] for f in os.listdir(SINGLES_DIR) if f.endswith(".png"))[:200] or ["CHECKSERIAL0001"]
+    chain = FakeChain(serials, probe_ratio=0.0)
+    chain.commit_txs("history", args.txs)
+    upstream = FakeUpstream(chain).start()
+    ws = TrackAddressServer().start()
+    cache_dir = tempfile.mkdtemp(prefix="watcher_check_")
+    os.environ.update({
+        "CACHE_DIR": cache_dir, "SCANNER_ROLE": "auto", "MINTS_WATCH_MODE": "websocket",
+        "SCAN_INTERVAL_SECS": str(args.interval), "SCANNER_LEASE_SECS": "30", "JSONBIN_SYNC_DEBOUNCE_SECS": "3600",
+        "BITCOIN_ADDRESS": FAKE_ADDRESS, "MEMPOOL_WS": ws.url, "MEMPOOL_API": f"{upstream.url}/api",
+        "BLOCKCHAIR_API": f"{upstream.url}/bitcoin", "JSONBIN_API": f"{upstream.url}/v3",
+        "CONTENT_HOSTS": f"{upstream.url}/content",
+    })
+    os.environ.pop("BLOCKCHAIR_API_KEY", None)
+    print(f"Watcher check: scan every {args.interval:g}s, socket down for {args.down:g}s, store in {cache_dir}")
+
+    import logging
+    logging.disable(logging.WARNING if not os.getenv("WATCHER_CHECK_VERBOSE") else logging.NOTSET)
+    import mints_scanner
+    upstream.bins[mints_scanner.JSONBIN_BIN_ID] = {"format": "segments", "count": 0, "segments": []}
+    watcher = mints_scanner.mempool_watcher
+    store = mints_scanner.mint_store
+
+    def polls():
+        return upstream.by_route.get("mempool_txs", 0)
+
+    ok = True
+    try:
+        ok &= _report("startup", _wait_for(lambda: watcher.connected and ws.subscribers(FAKE_ADDRESS), 10)
+                      and _wait_for(lambda: store.count() == args.txs, 20) and _wait_for(lambda: watcher.live, 10),
+                      f"connected={watcher.connected}, live={watcher.live}, "
+                      f"{store.count()}/{args.txs} mints from the chain scan")
+
+        # push -> scan, and no polling while the socket is up
+        before_polls, before = polls(), store.count()
+        pushed = chain.commit_txs("push", args.txs)
+        t0 = time.time()
+        sent = ws.push(FAKE_ADDRESS, pushed)
+        found = _wait_for(lambda: store.count() == before + args.txs, 10)
+        latency = time.time() - t0
+        time.sleep(2 * args.interval)
+        ok &= _report("push", sent == 1 and found and polls() == before_polls,
+                      f"{store.count() - before}/{args.txs} mints {latency:.2f}s after the push, "
+                      f"{polls() - before_polls} mempool polls")
+
+        # drop -> polling fallback
+        ws.down = True
+        down_at = time.time()
+        ws.drop()
+        _wait_for(lambda: not watcher.connected, 5)
+        before_polls, before = polls(), store.count()
+        chain.mempool = chain.commit_txs("mempool", args.txs)
+        found = _wait_for(lambda: store.count() == before + args.txs, args.down + 5 * args.interval)
+        ok &= _report("drop", not watcher.connected and found and polls() > before_polls,
+                      f"connected={watcher.connected}, {polls() - before_polls} mempool polls, "
+                      f"{store.count() - before}/{args.txs} mints from them")
+        time.sleep(max(0.0, args.down - (time.time() - down_at)))
+
+        # catch-up: no more polls, new mempool txs, then the socket comes back
+        mints_scanner.scheduler.pause()
+        time.sleep(args.interval)  # let a poll already running finish
+        before_polls, before = polls(), store.count()
+        chain.mempool = chain.mempool + chain.commit_txs("gap", args.txs)
+        ws.down = False
+        handshakes = ws.handshakes
+        t0 = time.time()
+        back = _wait_for(lambda: watcher.connected and ws.subscribers(FAKE_ADDRESS), watcher.MAX_BACKOFF + 5)
+        took = time.time() - t0
+        found = _wait_for(lambda: store.count() == before + args.txs and watcher.live, 10)
+        ok &= _report("catch-up", back and found and polls() - before_polls == 1,
+                      f"{store.count() - before}/{args.txs} mints from {polls() - before_polls} mempool scan "
+                      f"by the watcher (scheduler paused), live={watcher.live}")
+        mints_scanner.scheduler.resume()
+
+        # reconnect -> pushes again, polling stops
+        before = store.count()
+        sent = ws.push(FAKE_ADDRESS, chain.commit_txs("after", args.txs))
+        found = _wait_for(lambda: store.count() == before + args.txs, 10)
+        time.sleep(args.interval)
+        settled = polls()
+        time.sleep(3 * args.interval)
+        ok &= _report("reconnect", back and ws.handshakes > handshakes and found and polls() == settled,
+                      f"reconnected {took:.2f}s after the server came back ({ws.refused} attempts refused "
+                      f"while down), "
+                      f"{store.count() - before}/{args.txs} pushed mints, {polls() - settled} polls since")
+    finally:
+        watcher.stop()
+        mints_scanner.scheduler.shutdown(wait=False)
+        ws.stop()
+        upstream.stop()
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())